@@ -32,6 +32,14 @@ async def update_config(data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/proxies", dependencies=[Depends(verify_app_key)])
+async def get_proxy_stats():
+    """出口代理池健康状态"""
+    from app.services.reverse.utils.proxy_pool import get_proxy_pool
+
+    return {"proxies": get_proxy_pool().stats()}
+
+
 @router.get("/storage", dependencies=[Depends(verify_app_key)])
 async def get_storage():
     """获取当前存储模式"""
@@ -23,17 +23,24 @@ async def get_tokens():
     return tokens or {}
 
 
+@router.get("/tokens/flush/stats", dependencies=[Depends(verify_app_key)])
+async def get_token_flush_stats():
+    """Token 落盘引擎指标（积压、写入耗时、失败重试）"""
+    mgr = await get_token_manager()
+    return mgr.flush_stats()
+
+
 @router.post("/tokens", dependencies=[Depends(verify_app_key)])
 async def update_tokens(data: dict):
     """更新 Token 信息"""
     storage = get_storage()
     try:
-        from app.services.token.models import TokenInfo
+        from app.services.token.models import TokenRecord
 
         async with storage.acquire_lock("tokens_save", timeout=10):
             existing = await storage.load_tokens() or {}
             normalized = {}
-            allowed_fields = set(TokenInfo.model_fields.keys())
+            allowed_fields = set(TokenRecord.model_fields.keys())
             existing_map = {}
             for pool_name, tokens in existing.items():
                 if not isinstance(tokens, list):
@@ -79,7 +86,7 @@ async def update_tokens(data: dict):
 
                     filtered = {k: v for k, v in merged.items() if k in allowed_fields}
                     try:
-                        info = TokenInfo(**filtered)
+                        info = TokenRecord(**filtered)
                         pool_list.append(info.model_dump())
                     except Exception as e:
                         logger.warning(f"Skip invalid token in pool '{pool_name}': {e}")
@@ -173,7 +180,7 @@ async def refresh_tokens_async(data: dict):
                     fail_count += 1
                     results[token] = False
 
-            await mgr._save(force=True)
+            await mgr.flush()
 
             result = {
                 "status": "success",
@@ -397,7 +404,7 @@ async def enable_nsfw_async(data: dict):
                     fail_count += 1
                     results[masked] = res.get("data") or {"error": res.get("error")}
 
-            await mgr._save(force=True)
+            await mgr.flush()
 
             result = {
                 "status": "success",
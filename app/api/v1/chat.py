@@ -16,9 +16,10 @@ from app.services.grok.services.image import ImageGenerationService
 from app.services.grok.services.image_edit import ImageEditService
 from app.services.grok.services.model import ModelService
 from app.services.grok.services.video import VideoService
+from app.services.grok.utils.retry import no_available_token, pick_token
 from app.services.token import get_token_manager
 from app.core.config import get_config
-from app.core.exceptions import ValidationException, AppException, ErrorType
+from app.core.exceptions import ValidationException
 
 
 class MessageItem(BaseModel):
@@ -53,6 +54,9 @@ class ChatCompletionRequest(BaseModel):
     reasoning_effort: Optional[str] = Field(None, description="推理强度: none/minimal/low/medium/high/xhigh")
     temperature: Optional[float] = Field(0.8, description="采样温度: 0-2")
     top_p: Optional[float] = Field(0.95, description="nucleus 采样: 0-1")
+    stream_coalesce: Optional[bool] = Field(
+        None, description="流式输出是否合并小块（默认取 chat.stream_coalesce）"
+    )
     # 视频生成配置
     video_config: Optional[VideoConfig] = Field(None, description="视频生成参数")
     # 图片生成配置
@@ -534,19 +538,10 @@ async def chat_completions(request: ChatCompletionRequest):
         token_mgr = await get_token_manager()
         await token_mgr.reload_if_stale()
 
-        token = None
-        for pool_name in ModelService.pool_candidates_for_model(request.model):
-            token = token_mgr.get_token(pool_name)
-            if token:
-                break
+        token = await pick_token(token_mgr, request.model, set())
 
         if not token:
-            raise AppException(
-                message="No available tokens. Please try again later.",
-                error_type=ErrorType.RATE_LIMIT.value,
-                code="rate_limit_exceeded",
-                status_code=429,
-            )
+            raise no_available_token(token_mgr)
 
         result = await ImageEditService().edit(
             token_mgr=token_mgr,
@@ -601,19 +596,10 @@ async def chat_completions(request: ChatCompletionRequest):
         token_mgr = await get_token_manager()
         await token_mgr.reload_if_stale()
 
-        token = None
-        for pool_name in ModelService.pool_candidates_for_model(request.model):
-            token = token_mgr.get_token(pool_name)
-            if token:
-                break
+        token = await pick_token(token_mgr, request.model, set())
 
         if not token:
-            raise AppException(
-                message="No available tokens. Please try again later.",
-                error_type=ErrorType.RATE_LIMIT.value,
-                code="rate_limit_exceeded",
-                status_code=429,
-            )
+            raise no_available_token(token_mgr)
 
         result = await ImageGenerationService().generate(
             token_mgr=token_mgr,
@@ -671,6 +657,7 @@ async def chat_completions(request: ChatCompletionRequest):
             reasoning_effort=request.reasoning_effort,
             temperature=request.temperature,
             top_p=request.top_p,
+            coalesce=request.stream_coalesce,
         )
 
     if isinstance(result, dict):
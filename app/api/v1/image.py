@@ -14,8 +14,9 @@ from pydantic import BaseModel, Field, ValidationError
 from app.services.grok.services.image import ImageGenerationService
 from app.services.grok.services.image_edit import ImageEditService
 from app.services.grok.services.model import ModelService
+from app.services.grok.utils.retry import no_available_token, pick_token
 from app.services.token import get_token_manager
-from app.core.exceptions import ValidationException, AppException, ErrorType
+from app.core.exceptions import ValidationException
 from app.core.config import get_config
 
 
@@ -228,19 +229,10 @@ async def _get_token(model: str):
     token_mgr = await get_token_manager()
     await token_mgr.reload_if_stale()
 
-    token = None
-    for pool_name in ModelService.pool_candidates_for_model(model):
-        token = token_mgr.get_token(pool_name)
-        if token:
-            break
+    token = await pick_token(token_mgr, model, set())
 
     if not token:
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_available_token(token_mgr)
 
     return token_mgr, token
 
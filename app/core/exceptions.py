@@ -2,7 +2,7 @@
 全局异常处理 - OpenAI 兼容错误格式
 """
 
-from typing import Any
+from typing import Any, Dict, Optional
 from enum import Enum
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
@@ -54,12 +54,14 @@ class AppException(Exception):
         code: str = None,
         param: str = None,
         status_code: int = 500,
+        headers: Optional[Dict[str, str]] = None,
     ):
         self.message = message
         self.error_type = error_type
         self.code = code
         self.param = param
         self.status_code = status_code
+        self.headers = headers
         super().__init__(message)
 
 
@@ -124,6 +126,7 @@ async def app_exception_handler(request: Request, exc: AppException) -> JSONResp
             param=exc.param,
             code=exc.code,
         ),
+        headers=exc.headers,
     )
 
 
@@ -0,0 +1,137 @@
+"""
+应用生命周期: 停机排空
+
+uvicorn 收到 SIGTERM/SIGINT 后先关闭监听（新连接直接被拒绝）并关闭空闲连接，
+再等待在途请求结束，超过 timeout_graceful_shutdown 后取消剩余请求，最后才发送
+lifespan shutdown。排空因此交给 uvicorn 完成：
+- install_shutdown_drain() 在启动时把 app.shutdown_drain_timeout_sec 设为运行中
+  uvicorn Server 的 timeout_graceful_shutdown（命令行显式指定时保持不变），
+  并在收到停机信号时记录在途流数量
+- lifespan shutdown 中 wait_for_streams() 只需等待被取消的流完成收尾（记录用量），
+  随后做最后一次 Token 落盘并关闭存储
+"""
+
+import asyncio
+import signal
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+from app.core.logger import logger
+
+
+DEFAULT_DRAIN_TIMEOUT_SEC = 30
+
+# uvicorn Server.capture_signals 接管的信号
+_EXIT_SIGNALS = tuple(
+    sig for sig in (getattr(signal, "SIGINT", None), getattr(signal, "SIGTERM", None))
+    if sig is not None
+)
+
+
+class _DrainState:
+    def __init__(self):
+        self.active = 0
+        self._idle: Optional[asyncio.Event] = None
+
+    def idle_event(self) -> asyncio.Event:
+        if self._idle is None:
+            self._idle = asyncio.Event()
+            if self.active == 0:
+                self._idle.set()
+        return self._idle
+
+
+_state = _DrainState()
+
+
+def active_streams() -> int:
+    """在途流式响应数量"""
+    return _state.active
+
+
+@asynccontextmanager
+async def track_stream():
+    """登记一个在途流式响应，结束（含取消）时注销"""
+    _state.active += 1
+    _state.idle_event().clear()
+    try:
+        yield
+    finally:
+        _state.active -= 1
+        if _state.active == 0:
+            _state.idle_event().set()
+
+
+async def wait_for_streams(timeout: float) -> bool:
+    """
+    等待在途流式响应结束
+
+    Returns:
+        是否在超时前全部结束
+    """
+    if _state.active == 0:
+        return True
+    try:
+        await asyncio.wait_for(_state.idle_event().wait(), max(0.0, timeout))
+        return True
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"Drain timeout after {timeout}s, {_state.active} stream(s) still active"
+        )
+        return False
+
+
+def _running_server() -> Any:
+    """从 uvicorn 安装的信号处理器（Server.handle_exit）找到当前 Server"""
+    for sig in _EXIT_SIGNALS:
+        server = getattr(signal.getsignal(sig), "__self__", None)
+        if server is not None and hasattr(
+            getattr(server, "config", None), "timeout_graceful_shutdown"
+        ):
+            return server
+    return None
+
+
+def install_shutdown_drain(timeout: float) -> bool:
+    """
+    将排空截止时间交给运行中的 uvicorn Server
+
+    需在 lifespan 启动阶段调用（此时 uvicorn 已接管停机信号）。
+
+    Returns:
+        是否找到 uvicorn Server；未找到时（其他 ASGI 服务器）停机排空依赖服务器自身行为
+    """
+    server = _running_server()
+    if server is None:
+        logger.debug("Shutdown drain: uvicorn server not found, using server defaults")
+        return False
+
+    if server.config.timeout_graceful_shutdown is None:
+        server.config.timeout_graceful_shutdown = timeout
+    logger.info(
+        f"Shutdown drain: waiting up to {server.config.timeout_graceful_shutdown}s "
+        "for in-flight requests"
+    )
+
+    for sig in _EXIT_SIGNALS:
+        handler = signal.getsignal(sig)
+        if getattr(handler, "__self__", None) is not server:
+            continue
+
+        def _on_exit(signum, frame, _handler=handler):
+            if not server.should_exit:
+                logger.info(f"Draining: {_state.active} active stream(s)")
+            _handler(signum, frame)
+
+        # capture_signals 退出时会恢复其保存的原始处理器
+        signal.signal(sig, _on_exit)
+    return True
+
+
+__all__ = [
+    "DEFAULT_DRAIN_TIMEOUT_SEC",
+    "active_streams",
+    "install_shutdown_drain",
+    "track_stream",
+    "wait_for_streams",
+]
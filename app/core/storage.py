@@ -1,6 +1,6 @@
 """
 统一存储服务 (Professional Storage Service)
-支持 Local (TOML), Redis, MySQL, PostgreSQL
+支持 Local (TOML), Redis, MySQL, PostgreSQL, SQLite
 
 特性:
 - 全异步 I/O (Async I/O)
@@ -13,9 +13,12 @@ import abc
 import os
 import asyncio
 import hashlib
+import re
 import time
 import tomllib
-from typing import Any, Dict, Optional
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 from enum import Enum
 
@@ -36,7 +39,63 @@ DATA_DIR = Path(os.getenv("DATA_DIR", str(DEFAULT_DATA_DIR))).expanduser()
 # 配置文件路径
 CONFIG_FILE = DATA_DIR / "config.toml"
 TOKEN_FILE = DATA_DIR / "token.json"
+# Token 增量日志（JSONL，追加写入，定期压缩进 token.json）
+TOKEN_JOURNAL_FILE = DATA_DIR / "token.journal.jsonl"
 LOCK_DIR = DATA_DIR / ".locks"
+# SQLite 存储默认数据库文件
+SQLITE_DB_FILE = DATA_DIR / "grok2api.db"
+
+# 日志超过该大小且超过快照大小时触发压缩
+LOCAL_JOURNAL_COMPACT_BYTES = 4 * 1024 * 1024
+# token.json 中的快照代号字段（写在首位），日志头部记录所属代号
+TOKEN_GENERATION_KEY = "_generation"
+_GENERATION_HEAD_RE = re.compile(rb'^\s*\{\s*"_generation"\s*:\s*"([0-9a-f]*)"')
+
+
+# 用量类变更（_update_kind="usage"）涉及的字段，后端可只写入这些字段
+TOKEN_USAGE_FIELDS = (
+    "status",
+    "quota",
+    "use_count",
+    "last_used_at",
+    "fail_count",
+    "last_fail_at",
+    "last_fail_reason",
+    "last_sync_at",
+)
+
+
+_TOML_BARE_KEY_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _toml_value(val: Any) -> str:
+    """序列化为 TOML 值（列表中的字典写为内联表，JSON 的 {"k": v} 不是合法 TOML）"""
+    if isinstance(val, bool):
+        return "true" if val else "false"
+    if isinstance(val, str):
+        escaped = (
+            val.replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+            .replace("\t", "\\t")
+        )
+        return f'"{escaped}"'
+    if isinstance(val, (int, float)):
+        return str(val)
+    if isinstance(val, (list, tuple)):
+        return "[" + ", ".join(_toml_value(item) for item in val) + "]"
+    if isinstance(val, dict):
+        pairs = []
+        for key, item in val.items():
+            if item is None:
+                continue
+            key = str(key)
+            if not _TOML_BARE_KEY_RE.match(key):
+                key = _toml_value(key)
+            pairs.append(f"{key} = {_toml_value(item)}")
+        return "{" + ", ".join(pairs) + "}"
+    return _toml_value(str(val))
 
 
 # JSON 序列化优化助手函数
@@ -58,6 +117,81 @@ class StorageError(Exception):
     pass
 
 
+@dataclass
+class TokenChanges:
+    """
+    Token 变更集（增量同步）
+
+    version: 应用本变更集后的版本水位，下次增量同步时传回
+    upserts: [(pool_name, token_data)]
+    deleted: 被删除的 token 列表
+    """
+
+    version: Any
+    upserts: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.upserts or self.deleted)
+
+
+def _token_key(item: Any) -> Optional[str]:
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        return item.get("token")
+    return None
+
+
+def merge_token_delta(
+    existing: Dict[str, Any],
+    updated: Optional[list[Dict[str, Any]]],
+    deleted: Optional[list[str]] = None,
+) -> Dict[str, Any]:
+    """
+    将增量变更就地合并到 {pool_name: [token, ...]} 数据中
+
+    每个池只建一次 token -> 下标索引，删除与更新各单次遍历，
+    保持原有顺序，新 Token 追加到池尾。
+    """
+    deleted_set = set(deleted or [])
+    if deleted_set:
+        for pool_name, tokens in list(existing.items()):
+            if not isinstance(tokens, list):
+                continue
+            existing[pool_name] = [
+                item for item in tokens if _token_key(item) not in deleted_set
+            ]
+
+    index: Dict[str, Dict[str, int]] = {}
+    for item in updated or []:
+        if not isinstance(item, dict):
+            continue
+        pool_name = item.get("pool_name")
+        token_str = item.get("token")
+        if not pool_name or not token_str:
+            continue
+        pool_list = existing.setdefault(pool_name, [])
+        pos = index.get(pool_name)
+        if pos is None:
+            pos = {}
+            for idx, current in enumerate(pool_list):
+                key = _token_key(current)
+                if key is not None:
+                    pos.setdefault(key, idx)
+            index[pool_name] = pos
+        normalized = {
+            k: v for k, v in item.items() if k not in ("pool_name", "_update_kind")
+        }
+        idx = pos.get(token_str)
+        if idx is None:
+            pos[token_str] = len(pool_list)
+            pool_list.append(normalized)
+        else:
+            pool_list[idx] = normalized
+    return existing
+
+
 class BaseStorage(abc.ABC):
     """存储基类"""
 
@@ -86,53 +220,29 @@ class BaseStorage(abc.ABC):
     ):
         """增量保存 Token（默认回退到全量保存）"""
         existing = await self.load_tokens() or {}
+        merge_token_delta(existing, updated, deleted)
+        await self.save_tokens(existing)
 
-        deleted_set = set(deleted or [])
-        if deleted_set:
-            for pool_name, tokens in list(existing.items()):
-                if not isinstance(tokens, list):
-                    continue
-                filtered = []
-                for item in tokens:
-                    if isinstance(item, str):
-                        token_str = item
-                    elif isinstance(item, dict):
-                        token_str = item.get("token")
-                    else:
-                        token_str = None
-                    if token_str and token_str in deleted_set:
-                        continue
-                    filtered.append(item)
-                existing[pool_name] = filtered
+    async def token_version(self) -> Any:
+        """当前 Token 数据的版本水位（不支持增量同步时返回 None）"""
+        return None
 
-        for item in updated or []:
-            if not isinstance(item, dict):
-                continue
-            pool_name = item.get("pool_name")
-            token_str = item.get("token")
-            if not pool_name or not token_str:
-                continue
-            pool_list = existing.setdefault(pool_name, [])
-            normalized = {
-                k: v
-                for k, v in item.items()
-                if k not in ("pool_name", "_update_kind")
-            }
-            replaced = False
-            for idx, current in enumerate(pool_list):
-                if isinstance(current, str):
-                    if current == token_str:
-                        pool_list[idx] = normalized
-                        replaced = True
-                        break
-                elif isinstance(current, dict) and current.get("token") == token_str:
-                    pool_list[idx] = normalized
-                    replaced = True
-                    break
-            if not replaced:
-                pool_list.append(normalized)
+    async def load_token_changes(self, since: Any) -> Optional[TokenChanges]:
+        """
+        加载自 since 版本以来的 Token 变更
 
-        await self.save_tokens(existing)
+        Returns:
+            TokenChanges；无法提供增量时返回 None（调用方回退到全量加载）
+        """
+        return None
+
+    async def wait_token_changes(self):
+        """
+        阻塞直到收到其他 worker 发布的 Token 变更通知
+
+        不支持推送的后端抛出 NotImplementedError，调用方继续使用周期轮询。
+        """
+        raise NotImplementedError
 
     @abc.abstractmethod
     async def close(self):
@@ -163,10 +273,13 @@ class LocalStorage(BaseStorage):
     - 使用 aiofiles 进行异步 I/O
     - 使用 asyncio.Lock 进行进程内并发控制
     - 如果需要多进程安全，需要系统级文件锁 (fcntl)
+    - Token 增量写入追加到 JSONL 日志，超过阈值后压缩进 token.json 快照
     """
 
     def __init__(self):
         self._lock = asyncio.Lock()
+        # (快照 inode, mtime, 大小) -> 快照代号，避免每次读取代号都解析快照
+        self._generation_cache: Tuple[Tuple[int, int, int], str] = ((0, 0, 0), "")
 
     @asynccontextmanager
     async def acquire_lock(self, name: str, timeout: int = 10):
@@ -233,18 +346,7 @@ class LocalStorage(BaseStorage):
                     continue
                 lines.append(f"[{section}]")
                 for key, val in items.items():
-                    if isinstance(val, bool):
-                        val_str = "true" if val else "false"
-                    elif isinstance(val, str):
-                        escaped = val.replace('"', '\\"')
-                        val_str = f'"{escaped}"'
-                    elif isinstance(val, (int, float)):
-                        val_str = str(val)
-                    elif isinstance(val, (list, dict)):
-                        val_str = json_dumps(val)
-                    else:
-                        val_str = f'"{str(val)}"'
-                    lines.append(f"{key} = {val_str}")
+                    lines.append(f"{key} = {_toml_value(val)}")
                 lines.append("")
 
             content = "\n".join(lines)
@@ -257,42 +359,384 @@ class LocalStorage(BaseStorage):
             raise StorageError(f"保存配置失败: {e}")
 
     async def load_tokens(self) -> Dict[str, Any]:
-        if not TOKEN_FILE.exists():
-            return {}
+        """加载快照并重放增量日志"""
+        data = {}
+        if TOKEN_FILE.exists():
+            try:
+                async with aiofiles.open(TOKEN_FILE, "rb") as f:
+                    content = await f.read()
+                    data = json_loads(content)
+            except Exception as e:
+                logger.error(f"LocalStorage: 加载 Token 失败: {e}")
+                return {}
+            if isinstance(data, dict):
+                data.pop(TOKEN_GENERATION_KEY, None)
         try:
-            async with aiofiles.open(TOKEN_FILE, "rb") as f:
-                content = await f.read()
-                return json_loads(content)
+            entries, _ = await asyncio.to_thread(self._read_journal, 0)
         except Exception as e:
-            logger.error(f"LocalStorage: 加载 Token 失败: {e}")
-            return {}
+            logger.warning(f"LocalStorage: 读取 Token 日志失败: {e}")
+            entries = []
+        if entries:
+            self._replay_journal(data, entries)
+        return data
 
     async def save_tokens(self, data: Dict[str, Any]):
         try:
             TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
             temp_path = TOKEN_FILE.with_suffix(".tmp")
 
+            # 每次全量写入生成新的快照代号（放在首位，读取代号时只需读文件头）
+            snapshot = {TOKEN_GENERATION_KEY: uuid.uuid4().hex}
+            snapshot.update(
+                (k, v) for k, v in data.items() if k != TOKEN_GENERATION_KEY
+            )
+
             # 原子写操作: 写入临时文件 -> 重命名
             async with aiofiles.open(temp_path, "wb") as f:
-                await f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+                await f.write(orjson.dumps(snapshot, option=orjson.OPT_INDENT_2))
 
             # 使用 os.replace 保证原子性
             os.replace(temp_path, TOKEN_FILE)
+            # 快照已包含全部数据，旧日志作废（即使删除失败，头部代号也不再匹配）
+            TOKEN_JOURNAL_FILE.unlink(missing_ok=True)
 
         except Exception as e:
             logger.error(f"LocalStorage: 保存 Token 失败: {e}")
             raise StorageError(f"保存 Token 失败: {e}")
 
+    async def save_tokens_delta(
+        self, updated: list[Dict[str, Any]], deleted: Optional[list[str]] = None
+    ):
+        """
+        增量保存：追加写入日志，开销只与变更数量相关
+
+        删除与状态类变更写入后 fsync，高频的用量类变更只 flush。
+        """
+        lines = []
+        deleted_set = set(deleted or [])
+        durable = bool(deleted_set)
+        for token_str in deleted_set:
+            lines.append(orjson.dumps({"op": "delete", "token": token_str}))
+        for item in updated or []:
+            if not isinstance(item, dict):
+                continue
+            pool_name = item.get("pool_name")
+            token_str = item.get("token")
+            if not pool_name or not token_str or token_str in deleted_set:
+                continue
+            if item.get("_update_kind") != "usage":
+                durable = True
+            token_data = {
+                k: v for k, v in item.items() if k not in ("pool_name", "_update_kind")
+            }
+            lines.append(
+                orjson.dumps({"op": "upsert", "pool": pool_name, "token": token_data})
+            )
+        if not lines:
+            return
+        try:
+            journal_size = await asyncio.to_thread(
+                self._append_journal, lines, durable
+            )
+        except Exception as e:
+            logger.error(f"LocalStorage: 写入 Token 日志失败: {e}")
+            raise StorageError(f"保存 Token 失败: {e}")
+
+        try:
+            snapshot_size = TOKEN_FILE.stat().st_size
+        except FileNotFoundError:
+            snapshot_size = 0
+        if journal_size > max(LOCAL_JOURNAL_COMPACT_BYTES, snapshot_size):
+            await self.compact_tokens()
+
+    async def compact_tokens(self):
+        """将日志合并进快照"""
+        data = await self.load_tokens()
+        await self.save_tokens(data)
+        logger.info("LocalStorage: Token 日志已压缩")
+
+    # ========== 增量日志 ==========
+
+    def _snapshot_generation(self) -> str:
+        """
+        当前快照代号（save_tokens 写入 token.json）
+
+        日志只在代号一致时重放，快照被复制、恢复或迁移导致 mtime 变化不影响日志；
+        没有代号的旧快照视为代号 ""。
+        """
+        try:
+            stat = TOKEN_FILE.stat()
+        except FileNotFoundError:
+            return ""
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached_key, generation = self._generation_cache
+        if cached_key == key:
+            return generation
+        try:
+            with open(TOKEN_FILE, "rb") as f:
+                match = _GENERATION_HEAD_RE.match(f.read(256))
+                if match:
+                    generation = match.group(1).decode()
+                else:
+                    # 代号不在文件头（如被手工重新排版）时解析整个快照
+                    f.seek(0)
+                    data = json_loads(f.read())
+                    value = data.get(TOKEN_GENERATION_KEY) if isinstance(data, dict) else None
+                    generation = value if isinstance(value, str) else ""
+        except FileNotFoundError:
+            return ""
+        except Exception as e:
+            logger.warning(f"LocalStorage: 读取 Token 快照代号失败: {e}")
+            generation = ""
+        self._generation_cache = (key, generation)
+        return generation
+
+    def _journal_header(self) -> bytes:
+        return orjson.dumps({"generation": self._snapshot_generation()}) + b"\n"
+
+    def _append_journal(self, lines: List[bytes], durable: bool = False) -> int:
+        """追加日志记录，返回日志大小；日志属于旧快照时重新开始，durable 时 fsync"""
+        TOKEN_JOURNAL_FILE.parent.mkdir(parents=True, exist_ok=True)
+        header = self._journal_header()
+        payload = b"\n".join(lines) + b"\n"
+        try:
+            with open(TOKEN_JOURNAL_FILE, "rb") as f:
+                first = f.readline()
+        except FileNotFoundError:
+            first = None
+        if first != header:
+            # 新建文件（新 inode），读者据此识别日志已重置
+            TOKEN_JOURNAL_FILE.unlink(missing_ok=True)
+            payload = header + payload
+        with open(TOKEN_JOURNAL_FILE, "ab+") as f:
+            if first == header:
+                # 上次写入被截断时补齐换行，避免与新记录粘连
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    payload = b"\n" + payload
+            f.write(payload)
+            f.flush()
+            if durable:
+                os.fsync(f.fileno())
+            return f.tell()
+
+    def _read_journal(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        读取 offset 之后的日志记录
+
+        Returns:
+            (记录列表, 已读取到的偏移)；日志不属于当前快照时返回空列表
+        """
+        try:
+            with open(TOKEN_JOURNAL_FILE, "rb") as f:
+                first = f.readline()
+                if first != self._journal_header():
+                    if offset == 0 and first:
+                        logger.warning(
+                            "LocalStorage: Token 日志不属于当前快照代号，已忽略"
+                        )
+                    return [], 0
+                if offset > len(first):
+                    f.seek(offset)
+                content = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        # 只消费完整的行，末尾未写完的记录留到下次读取
+        end = content.rfind(b"\n") + 1
+        entries = []
+        for line in content[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entry = json_loads(line)
+            except Exception:
+                continue
+            if isinstance(entry, dict):
+                entries.append(entry)
+        return entries, max(offset, len(first)) + end
+
+    @staticmethod
+    def _replay_journal(data: Dict[str, Any], entries: List[Dict[str, Any]]):
+        """按顺序将日志应用到快照数据（每个池按 token 建索引，单次遍历）"""
+        index: Dict[str, Dict[str, int]] = {}
+        for pool_name, tokens in data.items():
+            if not isinstance(tokens, list):
+                continue
+            pos = {}
+            for idx, item in enumerate(tokens):
+                token_str = item.get("token") if isinstance(item, dict) else item
+                if isinstance(token_str, str):
+                    pos[token_str] = idx
+            index[pool_name] = pos
+
+        removed = False
+        for entry in entries:
+            op = entry.get("op")
+            if op == "delete":
+                token_str = entry.get("token")
+                for pool_name, pos in index.items():
+                    idx = pos.pop(token_str, None)
+                    if idx is not None:
+                        data[pool_name][idx] = None
+                        removed = True
+            elif op == "upsert":
+                pool_name = entry.get("pool")
+                token_data = entry.get("token")
+                if not pool_name or not isinstance(token_data, dict):
+                    continue
+                token_str = token_data.get("token")
+                pool_list = data.setdefault(pool_name, [])
+                pos = index.setdefault(pool_name, {})
+                idx = pos.get(token_str)
+                if idx is None:
+                    pos[token_str] = len(pool_list)
+                    pool_list.append(token_data)
+                else:
+                    pool_list[idx] = token_data
+
+        if removed:
+            for pool_name, tokens in data.items():
+                if isinstance(tokens, list):
+                    data[pool_name] = [t for t in tokens if t is not None]
+
+    async def token_version(self) -> Any:
+        """(快照代号, 日志 inode, 日志大小)"""
+        try:
+            stat = TOKEN_JOURNAL_FILE.stat()
+            journal = (stat.st_ino, stat.st_size)
+        except FileNotFoundError:
+            journal = (0, 0)
+        generation = await asyncio.to_thread(self._snapshot_generation)
+        return (generation, *journal)
+
+    async def load_token_changes(self, since: Any) -> Optional[TokenChanges]:
+        """快照未变化时从日志偏移处读取增量，快照被重写（压缩或全量保存）时需要全量加载"""
+        if not isinstance(since, tuple) or len(since) != 3:
+            return None
+        version = await self.token_version()
+        if version == since:
+            return TokenChanges(version=version)
+        if version[0] != since[0]:
+            return None
+        if since[1] and (version[1] != since[1] or version[2] < since[2]):
+            return None
+
+        entries, offset = await asyncio.to_thread(self._read_journal, since[2])
+        latest: Dict[str, Tuple[str, Any]] = {}
+        for entry in entries:
+            op = entry.get("op")
+            if op == "delete" and isinstance(entry.get("token"), str):
+                latest[entry["token"]] = ("delete", None)
+            elif op == "upsert" and isinstance(entry.get("token"), dict):
+                token_str = entry["token"].get("token")
+                if isinstance(token_str, str):
+                    latest[token_str] = ("upsert", (entry.get("pool"), entry["token"]))
+
+        changes = TokenChanges(version=(*version[:2], offset or since[2]))
+        for token_str, (op, payload) in latest.items():
+            if op == "delete":
+                changes.deleted.append(token_str)
+            else:
+                changes.upserts.append(payload)
+        return changes
+
     async def close(self):
         pass
 
 
+# Redis Token Hash 中的整数字段
+REDIS_TOKEN_INT_FIELDS = (
+    "quota",
+    "created_at",
+    "use_count",
+    "fail_count",
+    "last_used_at",
+    "last_fail_at",
+    "last_sync_at",
+)
+
+# Token 变更流最大长度（近似裁剪）
+REDIS_CHANGE_STREAM_MAXLEN = 10000
+# 单次增量同步读取的最大变更条数
+REDIS_CHANGE_BATCH = 1000
+
+
+def _stream_id_key(stream_id: str) -> Tuple[int, int]:
+    ms, _, seq = str(stream_id).partition("-")
+    return int(ms or 0), int(seq or 0)
+
+
+# 原子扣减配额: KEYS = [token_hash, pool_quota_zset]; ARGV = [cost, now_ms, token]
+# 返回 {quota, status, actual_cost, use_count}，Token 不存在时返回 nil
+REDIS_CONSUME_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local cost = tonumber(ARGV[1])
+local quota = tonumber(redis.call('HGET', KEYS[1], 'quota')) or 0
+local actual = math.min(cost, quota)
+quota = quota - actual
+local use_count = redis.call('HINCRBY', KEYS[1], 'use_count', actual)
+local status = redis.call('HGET', KEYS[1], 'status') or 'active'
+if quota == 0 then
+    status = 'cooling'
+elseif status == 'cooling' then
+    status = 'active'
+end
+redis.call('HSET', KEYS[1], 'quota', quota, 'status', status, 'last_used_at', ARGV[2])
+if status == 'active' and quota > 0 then
+    redis.call('ZADD', KEYS[2], quota, ARGV[3])
+else
+    redis.call('ZREM', KEYS[2], ARGV[3])
+end
+return {quota, status, actual, use_count}
+"""
+
+# 原子更新字段并同步配额索引: KEYS = [token_hash, pool_quota_zset];
+# ARGV = [token, n, incr_field1, delta1, ...(共 n 对), field1, value1, ...]
+# 前 n 对字段 HINCRBY，其余 HSET；返回 {quota, status, use_count}，Token 不存在时返回 nil
+REDIS_UPDATE_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return nil
+end
+local n = tonumber(ARGV[2])
+for i = 3, 2 + n * 2, 2 do
+    redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+if #ARGV > 2 + n * 2 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 3 + n * 2))
+end
+local quota = tonumber(redis.call('HGET', KEYS[1], 'quota')) or 0
+local status = redis.call('HGET', KEYS[1], 'status') or 'active'
+local use_count = tonumber(redis.call('HGET', KEYS[1], 'use_count')) or 0
+if status == 'active' and quota > 0 then
+    redis.call('ZADD', KEYS[2], quota, ARGV[1])
+else
+    redis.call('ZREM', KEYS[2], ARGV[1])
+end
+return {quota, status, use_count}
+"""
+
+
+# 删除 Token: KEYS[1]=池集合 KEYS[2]=token hash; ARGV=[token, 池 Set 前缀, 池 ZSet 前缀]
+REDIS_DELETE_LUA = """
+redis.call('DEL', KEYS[2])
+for _, pool in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+    redis.call('SREM', ARGV[2] .. pool, ARGV[1])
+    redis.call('ZREM', ARGV[3] .. pool, ARGV[1])
+end
+return 1
+"""
+
+
 class RedisStorage(BaseStorage):
     """
     Redis 存储
     - 使用 redis-py 异步客户端 (自带连接池)
     - 支持分布式锁 (redis.lock)
     - 扁平化数据结构优化性能
+    - 每个池维护按配额排序的 ZSet，支持多 worker 共享状态（Lua 原子扣减）
     """
 
     def __init__(self, url: str):
@@ -310,7 +754,69 @@ class RedisStorage(BaseStorage):
         self.key_pools = "grok2api:pools"  # Set: pool_names
         self.prefix_pool_set = "grok2api:pool:"  # Set: pool -> token_ids
         self.prefix_token_hash = "grok2api:token:"  # Hash: token_id -> token_data
+        self.prefix_pool_quota = "grok2api:pool_quota:"  # ZSet: 可用 token_id -> quota
+        self.key_token_changes = "grok2api:token_changes"  # Stream: Token 变更流
+        self.channel_token_changes = "grok2api:token_notify"  # Pub/Sub: 变更通知
         self.lock_prefix = "grok2api:lock:"
+        self._consume_script = self.redis.register_script(REDIS_CONSUME_LUA)
+        self._update_script = self.redis.register_script(REDIS_UPDATE_LUA)
+        self._delete_script = self.redis.register_script(REDIS_DELETE_LUA)
+        # 本实例标识，订阅时忽略自己发布的通知
+        self._node_id = uuid.uuid4().hex
+        self._pubsub = None
+
+    @staticmethod
+    def _flatten_token(t: Dict[str, Any]) -> Dict[str, str]:
+        """Token dict -> Redis Hash 映射（全部转为字符串）"""
+        t_flat = t.copy()
+        if "tags" in t_flat:
+            t_flat["tags"] = json_dumps(t_flat["tags"])
+        status = t_flat.get("status")
+        if isinstance(status, str) and status.startswith("TokenStatus."):
+            t_flat["status"] = status.split(".", 1)[1].lower()
+        elif isinstance(status, Enum):
+            t_flat["status"] = status.value
+        return {k: str(v) for k, v in t_flat.items() if v is not None}
+
+    @staticmethod
+    def _parse_token_hash(t_data: Dict[str, str]) -> Dict[str, Any]:
+        """Redis Hash -> Token dict（恢复 tags 与整数字段）"""
+        if "tags" in t_data:
+            try:
+                t_data["tags"] = json_loads(t_data["tags"])
+            except Exception:
+                t_data["tags"] = []
+
+        # 类型转换 (Redis 返回全 string)
+        for int_field in REDIS_TOKEN_INT_FIELDS:
+            if t_data.get(int_field) and t_data[int_field] != "None":
+                try:
+                    t_data[int_field] = int(t_data[int_field])
+                except Exception:
+                    pass
+        return t_data
+
+    @staticmethod
+    def _is_available(t: Dict[str, Any]) -> bool:
+        status = t.get("status")
+        if isinstance(status, Enum):
+            status = status.value
+        try:
+            quota = int(t.get("quota") or 0)
+        except (TypeError, ValueError):
+            return False
+        return status in (None, "active") and quota > 0
+
+    def _queue_quota_index(self, pipe, pool_name: str, tokens: list):
+        """在 pipeline 中重建单个池的配额 ZSet"""
+        zkey = f"{self.prefix_pool_quota}{pool_name}"
+        pipe.delete(zkey)
+        scores = {}
+        for t in tokens:
+            if isinstance(t, dict) and t.get("token") and self._is_available(t):
+                scores[t["token"]] = int(t.get("quota") or 0)
+        if scores:
+            pipe.zadd(zkey, scores)
 
     @asynccontextmanager
     async def acquire_lock(self, name: str, timeout: int = 10):
@@ -419,31 +925,7 @@ class RedisStorage(BaseStorage):
                 t_data = token_data_list[i]
                 if not t_data:
                     continue
-
-                # 恢复 tags (JSON -> List)
-                if "tags" in t_data:
-                    try:
-                        t_data["tags"] = json_loads(t_data["tags"])
-                    except Exception:
-                        t_data["tags"] = []
-
-                # 类型转换 (Redis 返回全 string)
-                for int_field in [
-                    "quota",
-                    "created_at",
-                    "use_count",
-                    "fail_count",
-                    "last_used_at",
-                    "last_fail_at",
-                    "last_sync_at",
-                ]:
-                    if t_data.get(int_field) and t_data[int_field] != "None":
-                        try:
-                            t_data[int_field] = int(t_data[int_field])
-                        except Exception:
-                            pass
-
-                token_lookup[tid] = t_data
+                token_lookup[tid] = self._parse_token_hash(t_data)
 
             # 按 Pool 分组返回
             for pool_name in pool_names:
@@ -501,6 +983,7 @@ class RedisStorage(BaseStorage):
                 # Reset pool sets
                 for pool_name in all_pools:
                     pipe.delete(f"{self.prefix_pool_set}{pool_name}")
+                    pipe.delete(f"{self.prefix_pool_quota}{pool_name}")
                 for pool_name, tids_in_pool in pool_tokens_map.items():
                     if tids_in_pool:
                         pipe.sadd(f"{self.prefix_pool_set}{pool_name}", *tids_in_pool)
@@ -515,20 +998,15 @@ class RedisStorage(BaseStorage):
                         token_str = t.get("token")
                         if not token_str:
                             continue
-                        t_flat = t.copy()
-                        if "tags" in t_flat:
-                            t_flat["tags"] = json_dumps(t_flat["tags"])
-                        status = t_flat.get("status")
-                        if isinstance(status, str) and status.startswith(
-                            "TokenStatus."
-                        ):
-                            t_flat["status"] = status.split(".", 1)[1].lower()
-                        elif isinstance(status, Enum):
-                            t_flat["status"] = status.value
-                        t_flat = {k: str(v) for k, v in t_flat.items() if v is not None}
                         pipe.hset(
-                            f"{self.prefix_token_hash}{token_str}", mapping=t_flat
+                            f"{self.prefix_token_hash}{token_str}",
+                            mapping=self._flatten_token(t),
                         )
+                    self._queue_quota_index(pipe, pool_name, tokens)
+
+                # 全量覆盖：通知其他 worker 全量重载
+                self._queue_change(pipe, "reset")
+                pipe.publish(self.channel_token_changes, self._node_id)
 
                 await pipe.execute()
 
@@ -536,7 +1014,269 @@ class RedisStorage(BaseStorage):
             logger.error(f"RedisStorage: 保存 Token 失败: {e}")
             raise
 
+    def _queue_change(self, pipe, op: str, token: str = "", pool_name: str = ""):
+        """在 pipeline 中追加一条 Token 变更记录"""
+        pipe.xadd(
+            self.key_token_changes,
+            {"op": op, "token": token, "pool": pool_name},
+            maxlen=REDIS_CHANGE_STREAM_MAXLEN,
+            approximate=True,
+        )
+
+    async def save_tokens_delta(
+        self, updated: list[Dict[str, Any]], deleted: Optional[list[str]] = None
+    ):
+        """
+        增量保存 Token：整批变更在一个 pipeline 内完成（一次往返，与池大小无关）
+
+        - usage 变更只写入计数类字段，经 Lua 同步更新配额 ZSet，已删除的 Token 不会被复活
+        - fields 变更（共享状态模式）只写入负载中携带的字段，同样经 Lua 更新，
+          不会覆盖其他 worker 原子扣减的 quota/use_count
+        - state 变更写入完整 Hash 并维护池集合
+        - 删除在服务端遍历池集合完成
+        """
+        try:
+            deleted_set = set(deleted or [])
+            async with self.redis.pipeline() as pipe:
+                for token_str in deleted_set:
+                    await self._delete_script(
+                        keys=[self.key_pools, f"{self.prefix_token_hash}{token_str}"],
+                        args=[token_str, self.prefix_pool_set, self.prefix_pool_quota],
+                        client=pipe,
+                    )
+                    self._queue_change(pipe, "delete", token_str)
+
+                for item in updated or []:
+                    if not isinstance(item, dict):
+                        continue
+                    pool_name = item.get("pool_name")
+                    token_str = item.get("token")
+                    if not pool_name or not token_str or token_str in deleted_set:
+                        continue
+                    hash_key = f"{self.prefix_token_hash}{token_str}"
+                    zkey = f"{self.prefix_pool_quota}{pool_name}"
+                    update_kind = item.get("_update_kind")
+                    if update_kind == "usage":
+                        token_data = {
+                            k: item[k] for k in TOKEN_USAGE_FIELDS if k in item
+                        }
+                    elif update_kind == "fields":
+                        token_data = {
+                            k: v
+                            for k, v in item.items()
+                            if k not in ("token", "pool_name", "_update_kind")
+                        }
+                    else:
+                        token_data = {
+                            k: v
+                            for k, v in item.items()
+                            if k not in ("pool_name", "_update_kind")
+                        }
+                    flat = self._flatten_token(token_data)
+                    cleared = [k for k, v in token_data.items() if v is None]
+                    if cleared:
+                        pipe.hdel(hash_key, *cleared)
+
+                    if update_kind in ("usage", "fields"):
+                        args = [token_str, 0]
+                        for field_name, value in flat.items():
+                            args.extend((field_name, value))
+                        await self._update_script(
+                            keys=[hash_key, zkey], args=args, client=pipe
+                        )
+                    else:
+                        pipe.hset(hash_key, mapping=flat)
+                        pipe.sadd(self.key_pools, pool_name)
+                        pipe.sadd(f"{self.prefix_pool_set}{pool_name}", token_str)
+                        if self._is_available(token_data):
+                            pipe.zadd(zkey, {token_str: int(token_data.get("quota") or 0)})
+                        else:
+                            pipe.zrem(zkey, token_str)
+                    self._queue_change(pipe, "upsert", token_str, pool_name)
+
+                pipe.publish(self.channel_token_changes, self._node_id)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"RedisStorage: 增量保存 Token 失败: {e}")
+            raise
+
+    async def token_version(self) -> Any:
+        rows = await self.redis.xrevrange(self.key_token_changes, count=1)
+        return rows[0][0] if rows else "0-0"
+
+    async def load_token_changes(self, since: Any) -> Optional[TokenChanges]:
+        """
+        从变更流读取增量
+
+        since 早于流中最早的记录（可能已被裁剪）或遇到全量覆盖时返回 None。
+        """
+        if since is None:
+            return None
+        first = await self.redis.xrange(self.key_token_changes, count=1)
+        if not first:
+            return TokenChanges(version=since)
+        if _stream_id_key(first[0][0]) > _stream_id_key(since):
+            return None
+
+        rows = await self.redis.xrange(
+            self.key_token_changes, min=f"({since}", count=REDIS_CHANGE_BATCH
+        )
+        if not rows:
+            return TokenChanges(version=since)
+
+        # 同一 Token 只保留最后一次操作
+        latest: Dict[str, Tuple[str, str]] = {}
+        for _, fields in rows:
+            op = fields.get("op")
+            if op == "reset":
+                return None
+            token_str = fields.get("token")
+            if token_str:
+                latest[token_str] = (op, fields.get("pool", ""))
+
+        changes = TokenChanges(version=rows[-1][0])
+        upsert_keys = [t for t, (op, _) in latest.items() if op == "upsert"]
+        changes.deleted = [t for t, (op, _) in latest.items() if op == "delete"]
+        if upsert_keys:
+            async with self.redis.pipeline() as pipe:
+                for token_str in upsert_keys:
+                    pipe.hgetall(f"{self.prefix_token_hash}{token_str}")
+                results = await pipe.execute()
+            for token_str, t_data in zip(upsert_keys, results):
+                if not t_data:
+                    changes.deleted.append(token_str)
+                    continue
+                changes.upserts.append(
+                    (latest[token_str][1], self._parse_token_hash(t_data))
+                )
+        return changes
+
+    async def wait_token_changes(self):
+        if self._pubsub is None:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            await pubsub.subscribe(self.channel_token_changes)
+            self._pubsub = pubsub
+        try:
+            async for message in self._pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                if message.get("data") == self._node_id:
+                    continue
+                return
+        except Exception:
+            await self._close_pubsub()
+            raise
+        # 连接被关闭，交由调用方重试
+        await self._close_pubsub()
+        raise StorageError("RedisStorage: 变更订阅已断开")
+
+    async def _close_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+    # ========== 共享状态（多 worker） ==========
+
+    async def has_quota_index(self, pool_names) -> bool:
+        """所有池的配额 ZSet 是否已建立"""
+        pool_names = list(pool_names)
+        if not pool_names:
+            return True
+        keys = [f"{self.prefix_pool_quota}{name}" for name in pool_names]
+        return await self.redis.exists(*keys) == len(keys)
+
+    async def rebuild_quota_index(self, data: Dict[str, Any]):
+        """按 Token 数据重建各池的配额 ZSet"""
+        async with self.redis.pipeline() as pipe:
+            for pool_name, tokens in (data or {}).items():
+                self._queue_quota_index(pipe, pool_name, tokens or [])
+            await pipe.execute()
+
+    async def top_pool_tokens(self, pool_name: str, count: int) -> list:
+        """按配额从高到低返回池中前 count 个可用 Token: [(token, quota)]"""
+        rows = await self.redis.zrevrange(
+            f"{self.prefix_pool_quota}{pool_name}", 0, count - 1, withscores=True
+        )
+        return [(token, int(score)) for token, score in rows]
+
+    async def load_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """加载单个 Token"""
+        t_data = await self.redis.hgetall(f"{self.prefix_token_hash}{token}")
+        if not t_data:
+            return None
+        return self._parse_token_hash(t_data)
+
+    async def consume_token(
+        self, pool_name: str, token: str, cost: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        原子扣减配额
+
+        Returns:
+            {"quota", "status", "consumed", "use_count"}，Token 不存在时返回 None
+        """
+        now_ms = int(time.time() * 1000)
+        result = await self._consume_script(
+            keys=[
+                f"{self.prefix_token_hash}{token}",
+                f"{self.prefix_pool_quota}{pool_name}",
+            ],
+            args=[cost, now_ms, token],
+        )
+        if not result:
+            return None
+        quota, status, consumed, use_count = result
+        return {
+            "quota": int(quota),
+            "status": status,
+            "consumed": int(consumed),
+            "use_count": int(use_count),
+            "last_used_at": now_ms,
+        }
+
+    async def update_token_fields(
+        self,
+        pool_name: str,
+        token: str,
+        fields: Dict[str, Any],
+        increments: Optional[Dict[str, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        原子更新 Token 字段并同步配额 ZSet
+
+        Args:
+            fields: 直接写入的字段
+            increments: 原子累加的计数字段（如 use_count），不会覆盖其他 worker 的累加
+
+        Returns:
+            {"quota", "status", "use_count"}，Token 不存在时返回 None
+        """
+        increments = increments or {}
+        args = [token, len(increments)]
+        for key, delta in increments.items():
+            args.extend((key, int(delta)))
+        for key, value in self._flatten_token(fields).items():
+            args.extend((key, value))
+        hash_key = f"{self.prefix_token_hash}{token}"
+        keys = [hash_key, f"{self.prefix_pool_quota}{pool_name}"]
+        cleared = [k for k, v in fields.items() if v is None]
+        if cleared:
+            async with self.redis.pipeline() as pipe:
+                pipe.hdel(hash_key, *cleared)
+                await self._update_script(keys=keys, args=args, client=pipe)
+                result = (await pipe.execute())[-1]
+        else:
+            result = await self._update_script(keys=keys, args=args)
+        if not result:
+            return None
+        quota, status, use_count = result
+        return {"quota": int(quota), "status": status, "use_count": int(use_count)}
+
     async def close(self):
+        await self._close_pubsub()
         try:
             await self.redis.close()
         except (RuntimeError, asyncio.CancelledError, Exception):
@@ -544,12 +1284,44 @@ class RedisStorage(BaseStorage):
             pass
 
 
+SQL_TOKEN_SELECT = (
+    "SELECT token, pool_name, status, quota, created_at, "
+    "last_used_at, use_count, fail_count, last_fail_at, "
+    "last_fail_reason, last_sync_at, tags, note, "
+    "last_asset_clear_at, data"
+)
+# 增量同步的时钟偏差容忍（毫秒），多 worker 时钟不一致时避免漏读
+SQL_CHANGE_SKEW_MS = 5000
+# 删除墓碑保留时间（毫秒）
+SQL_TOMBSTONE_TTL_MS = 24 * 3600 * 1000
+SQL_USAGE_PG_TYPES = {
+    "token_id": "CHAR(64)",
+    "status": "VARCHAR(16)",
+    "quota": "INT",
+    "use_count": "INT",
+    "last_used_at": "BIGINT",
+    "fail_count": "INT",
+    "last_fail_at": "BIGINT",
+    "last_fail_reason": "TEXT",
+    "last_sync_at": "BIGINT",
+    "updated_at": "BIGINT",
+}
+# PostgreSQL UNNEST 单条语句的最大行数
+SQL_USAGE_BATCH_SIZE = 1000
+# SQLite 等待写锁的超时（秒）
+SQLITE_BUSY_TIMEOUT_SEC = 30
+# PostgreSQL LISTEN/NOTIFY 通道
+SQL_NOTIFY_CHANNEL = "grok2api_token_changes"
+_TOKEN_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
 class SQLStorage(BaseStorage):
     """
-    SQL 数据库存储 (MySQL/PgSQL)
+    SQL 数据库存储 (MySQL/PgSQL/SQLite)
     - 使用 SQLAlchemy 异步引擎
     - 自动 Schema 初始化
     - 内置连接池 (QueuePool)
+    - SQLite 启用 WAL，适合单机多 worker 部署
     """
 
     def __init__(self, url: str):
@@ -586,6 +1358,13 @@ class SQLStorage(BaseStorage):
             remaining_qs = urlencode(qs, doseq=True)
             url = urlunparse(parsed._replace(query=remaining_qs))
 
+        # SQLite: 等待写锁而不是立即报 database is locked
+        if self.dialect == "sqlite":
+            connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_SEC
+            db_path = url.split(":///", 1)[-1].split("?", 1)[0]
+            if db_path and db_path != ":memory:":
+                Path(db_path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+
         # Serverless 友好的连接池配置
         self.engine = create_async_engine(
             url,
@@ -599,6 +1378,32 @@ class SQLStorage(BaseStorage):
         )
         self.async_session = async_sessionmaker(self.engine, expire_on_commit=False)
         self._initialized = False
+        if self.dialect == "sqlite":
+            self._setup_sqlite_pragmas()
+        # 本实例标识，LISTEN 时忽略自己发布的通知
+        self._node_id = uuid.uuid4().hex
+        self._listen_conn = None
+        self._notify_queue: Optional[asyncio.Queue] = None
+
+    @property
+    def _is_pgsql(self) -> bool:
+        return self.dialect in ("postgres", "postgresql", "pgsql")
+
+    @property
+    def _is_sqlite(self) -> bool:
+        return self.dialect == "sqlite"
+
+    def _setup_sqlite_pragmas(self):
+        """每个新连接启用 WAL：读写互不阻塞，多进程共享同一数据库文件"""
+        from sqlalchemy import event
+
+        @event.listens_for(self.engine.sync_engine, "connect")
+        def _on_connect(dbapi_conn, _record):
+            cursor = dbapi_conn.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_SEC * 1000}")
+            cursor.close()
 
     async def _ensure_schema(self):
         """确保数据库表存在"""
@@ -634,6 +1439,29 @@ class SQLStorage(BaseStorage):
                 """)
                 )
 
+                # 删除墓碑（供其他 worker 增量同步删除）
+                await conn.execute(
+                    text("""
+                    CREATE TABLE IF NOT EXISTS token_tombstones (
+                        token_id CHAR(64) PRIMARY KEY,
+                        token TEXT,
+                        deleted_at BIGINT
+                    )
+                """)
+                )
+
+                # SQLite 跨进程锁（租约表）
+                if self._is_sqlite:
+                    await conn.execute(
+                        text("""
+                        CREATE TABLE IF NOT EXISTS app_locks (
+                            name VARCHAR(64) PRIMARY KEY,
+                            owner VARCHAR(64) NOT NULL,
+                            expires_at BIGINT NOT NULL
+                        )
+                    """)
+                    )
+
                 # 配置表
                 await conn.execute(
                     text("""
@@ -647,7 +1475,7 @@ class SQLStorage(BaseStorage):
                 )
 
                 # 索引
-                if self.dialect in ("postgres", "postgresql", "pgsql"):
+                if self._is_pgsql or self._is_sqlite:
                     await conn.execute(
                         text(
                             "CREATE INDEX IF NOT EXISTS idx_tokens_pool ON tokens (pool_name)"
@@ -698,6 +1526,23 @@ class SQLStorage(BaseStorage):
                         except Exception:
                             pass
 
+                # 增量同步水位索引（需在补齐 updated_at 字段之后）
+                if self._is_pgsql or self._is_sqlite:
+                    await conn.execute(
+                        text(
+                            "CREATE INDEX IF NOT EXISTS idx_tokens_updated_at ON tokens (updated_at)"
+                        )
+                    )
+                else:
+                    try:
+                        await conn.execute(
+                            text(
+                                "CREATE INDEX idx_tokens_updated_at ON tokens (updated_at)"
+                            )
+                        )
+                    except Exception:
+                        pass
+
                 # 尝试兼容旧表结构
                 try:
                     if self.dialect in ("mysql", "mariadb"):
@@ -839,9 +1684,115 @@ class SQLStorage(BaseStorage):
             "last_asset_clear_at": token_data.get("last_asset_clear_at"),
             "data": data_json,
             "data_hash": data_hash,
-            "updated_at": 0,
+            "updated_at": int(time.time() * 1000),
         }
 
+    def _row_to_token(self, row) -> Dict[str, Any]:
+        """将 SQL_TOKEN_SELECT 查询的一行还原为 Token 字典"""
+        (
+            token_str,
+            _pool_name,
+            status,
+            quota,
+            created_at,
+            last_used_at,
+            use_count,
+            fail_count,
+            last_fail_at,
+            last_fail_reason,
+            last_sync_at,
+            tags,
+            note,
+            last_asset_clear_at,
+            data_json,
+        ) = row
+        token_data = {}
+        if token_str:
+            token_data["token"] = token_str
+        if status is not None:
+            token_data["status"] = self._normalize_status(status)
+        if quota is not None:
+            token_data["quota"] = int(quota)
+        if created_at is not None:
+            token_data["created_at"] = int(created_at)
+        if last_used_at is not None:
+            token_data["last_used_at"] = int(last_used_at)
+        if use_count is not None:
+            token_data["use_count"] = int(use_count)
+        if fail_count is not None:
+            token_data["fail_count"] = int(fail_count)
+        if last_fail_at is not None:
+            token_data["last_fail_at"] = int(last_fail_at)
+        if last_fail_reason is not None:
+            token_data["last_fail_reason"] = last_fail_reason
+        if last_sync_at is not None:
+            token_data["last_sync_at"] = int(last_sync_at)
+        if tags is not None:
+            token_data["tags"] = self._parse_tags(tags)
+        if note is not None:
+            token_data["note"] = note
+        if last_asset_clear_at is not None:
+            token_data["last_asset_clear_at"] = int(last_asset_clear_at)
+
+        legacy_data = None
+        if data_json:
+            if isinstance(data_json, str):
+                legacy_data = json_loads(data_json)
+            else:
+                legacy_data = data_json
+        if isinstance(legacy_data, dict):
+            for key, val in legacy_data.items():
+                if key not in token_data or token_data[key] is None:
+                    token_data[key] = val
+        return token_data
+
+    def _token_to_usage_row(self, token_data: Dict[str, Any]) -> Dict[str, Any]:
+        """用量变更只包含计数类字段，不做 JSON 序列化与 data_hash 计算"""
+        token_str = token_data.get("token")
+        if isinstance(token_str, str) and token_str.startswith("sso="):
+            token_str = token_str[4:]
+        row = {col: token_data.get(col) for col in TOKEN_USAGE_FIELDS}
+        row["token_id"] = hashlib.sha256(token_str.encode("utf-8")).hexdigest()
+        row["status"] = self._normalize_status(row["status"])
+        row["updated_at"] = int(time.time() * 1000)
+        return row
+
+    async def _update_usage_rows(self, session, rows: List[Dict[str, Any]]):
+        """
+        用量快速路径：只更新计数类字段
+
+        PostgreSQL 使用 UNNEST 单语句批量更新，其他方言使用 executemany。
+        用量变更只针对已存在的 Token（新增 Token 总是走 state 全量 upsert）。
+        """
+        from sqlalchemy import text
+
+        cols = TOKEN_USAGE_FIELDS + ("updated_at",)
+        if self._is_pgsql:
+            assignments = ", ".join(f"{col}=u.{col}" for col in cols)
+            arrays = ", ".join(
+                f"CAST(:{col} AS {SQL_USAGE_PG_TYPES[col]}[])"
+                for col in ("token_id",) + cols
+            )
+            stmt = text(
+                f"UPDATE tokens AS t SET {assignments} "
+                f"FROM UNNEST({arrays}) AS u(token_id, {', '.join(cols)}) "
+                "WHERE t.token_id = u.token_id"
+            )
+            for i in range(0, len(rows), SQL_USAGE_BATCH_SIZE):
+                chunk = rows[i : i + SQL_USAGE_BATCH_SIZE]
+                await session.execute(
+                    stmt,
+                    {
+                        col: [row[col] for row in chunk]
+                        for col in ("token_id",) + cols
+                    },
+                )
+            return
+
+        assignments = ", ".join(f"{col}=:{col}" for col in cols)
+        stmt = text(f"UPDATE tokens SET {assignments} WHERE token_id=:token_id")
+        await session.execute(stmt, rows)
+
     async def _migrate_legacy_tokens(self):
         """将旧版 data JSON 回填到平铺字段"""
         from sqlalchemy import text
@@ -974,6 +1925,50 @@ class SQLStorage(BaseStorage):
                         await session.commit()
                     except Exception:
                         pass
+        elif self._is_sqlite:
+            await self._ensure_schema()
+            owner = uuid.uuid4().hex
+            ttl_ms = max(int(timeout), 1) * 1000
+            acquire_stmt = text(
+                "INSERT INTO app_locks (name, owner, expires_at) "
+                "VALUES (:name, :owner, :expires_at) "
+                "ON CONFLICT (name) DO UPDATE SET "
+                "owner=excluded.owner, expires_at=excluded.expires_at "
+                "WHERE app_locks.expires_at < :now"
+            )
+            start = time.monotonic()
+            while True:
+                now_ms = int(time.time() * 1000)
+                async with self.async_session() as session:
+                    res = await session.execute(
+                        acquire_stmt,
+                        {
+                            "name": lock_name,
+                            "owner": owner,
+                            "expires_at": now_ms + ttl_ms,
+                            "now": now_ms,
+                        },
+                    )
+                    await session.commit()
+                if res.rowcount == 1:
+                    break
+                if time.monotonic() - start >= timeout:
+                    raise StorageError(f"SQLStorage: 无法获取锁 '{name}'")
+                await asyncio.sleep(0.05)
+            try:
+                yield
+            finally:
+                try:
+                    async with self.async_session() as session:
+                        await session.execute(
+                            text(
+                                "DELETE FROM app_locks WHERE name=:name AND owner=:owner"
+                            ),
+                            {"name": lock_name, "owner": owner},
+                        )
+                        await session.commit()
+                except Exception:
+                    pass
         else:
             yield
 
@@ -1043,83 +2038,18 @@ class SQLStorage(BaseStorage):
 
         try:
             async with self.async_session() as session:
-                res = await session.execute(
-                    text(
-                        "SELECT token, pool_name, status, quota, created_at, "
-                        "last_used_at, use_count, fail_count, last_fail_at, "
-                        "last_fail_reason, last_sync_at, tags, note, "
-                        "last_asset_clear_at, data "
-                        "FROM tokens"
-                    )
-                )
+                res = await session.execute(text(f"{SQL_TOKEN_SELECT} FROM tokens"))
                 rows = res.fetchall()
                 if not rows:
                     return None
 
                 pools = {}
-                for (
-                    token_str,
-                    pool_name,
-                    status,
-                    quota,
-                    created_at,
-                    last_used_at,
-                    use_count,
-                    fail_count,
-                    last_fail_at,
-                    last_fail_reason,
-                    last_sync_at,
-                    tags,
-                    note,
-                    last_asset_clear_at,
-                    data_json,
-                ) in rows:
+                for row in rows:
+                    pool_name = row[1]
                     if pool_name not in pools:
                         pools[pool_name] = []
-
                     try:
-                        token_data = {}
-                        if token_str:
-                            token_data["token"] = token_str
-                        if status is not None:
-                            token_data["status"] = self._normalize_status(status)
-                        if quota is not None:
-                            token_data["quota"] = int(quota)
-                        if created_at is not None:
-                            token_data["created_at"] = int(created_at)
-                        if last_used_at is not None:
-                            token_data["last_used_at"] = int(last_used_at)
-                        if use_count is not None:
-                            token_data["use_count"] = int(use_count)
-                        if fail_count is not None:
-                            token_data["fail_count"] = int(fail_count)
-                        if last_fail_at is not None:
-                            token_data["last_fail_at"] = int(last_fail_at)
-                        if last_fail_reason is not None:
-                            token_data["last_fail_reason"] = last_fail_reason
-                        if last_sync_at is not None:
-                            token_data["last_sync_at"] = int(last_sync_at)
-                        if tags is not None:
-                            token_data["tags"] = self._parse_tags(tags)
-                        if note is not None:
-                            token_data["note"] = note
-                        if last_asset_clear_at is not None:
-                            token_data["last_asset_clear_at"] = int(
-                                last_asset_clear_at
-                            )
-
-                        legacy_data = None
-                        if data_json:
-                            if isinstance(data_json, str):
-                                legacy_data = json_loads(data_json)
-                            else:
-                                legacy_data = data_json
-                        if isinstance(legacy_data, dict):
-                            for key, val in legacy_data.items():
-                                if key not in token_data or token_data[key] is None:
-                                    token_data[key] = val
-
-                        pools[pool_name].append(token_data)
+                        pools[pool_name].append(self._row_to_token(row))
                     except Exception:
                         pass
                 return pools
@@ -1176,8 +2106,17 @@ class SQLStorage(BaseStorage):
 
         try:
             async with self.async_session() as session:
-                deleted_set = set(deleted or [])
+                deleted_set = {self._token_id(t) for t in deleted or [] if t}
                 if deleted_set:
+                    now_ms = int(time.time() * 1000)
+                    tombstone_stmt = text(
+                        "INSERT INTO token_tombstones (token_id, token, deleted_at) "
+                        "SELECT token_id, token, :now FROM tokens "
+                        "WHERE token_id IN :token_ids"
+                    ).bindparams(bindparam("token_ids", expanding=True))
+                    clear_stmt = text(
+                        "DELETE FROM token_tombstones WHERE token_id IN :token_ids"
+                    ).bindparams(bindparam("token_ids", expanding=True))
                     delete_stmt = text(
                         "DELETE FROM tokens WHERE token_id IN :token_ids"
                     ).bindparams(bindparam("token_ids", expanding=True))
@@ -1185,7 +2124,15 @@ class SQLStorage(BaseStorage):
                     deleted_list = list(deleted_set)
                     for i in range(0, len(deleted_list), chunk_size):
                         chunk = deleted_list[i : i + chunk_size]
+                        await session.execute(clear_stmt, {"token_ids": chunk})
+                        await session.execute(
+                            tombstone_stmt, {"token_ids": chunk, "now": now_ms}
+                        )
                         await session.execute(delete_stmt, {"token_ids": chunk})
+                    await session.execute(
+                        text("DELETE FROM token_tombstones WHERE deleted_at < :cutoff"),
+                        {"cutoff": now_ms - SQL_TOMBSTONE_TTL_MS},
+                    )
 
                 updates = []
                 usage_updates = []
@@ -1206,11 +2153,10 @@ class SQLStorage(BaseStorage):
                         for k, v in item.items()
                         if k not in ("pool_name", "_update_kind")
                     }
-                    row = self._token_to_row(token_data, pool_name)
                     if update_kind == "usage":
-                        usage_updates.append(row)
+                        usage_updates.append(self._token_to_usage_row(token_data))
                     else:
-                        updates.append(row)
+                        updates.append(self._token_to_row(token_data, pool_name))
 
                 if updates:
                     if self.dialect in ("mysql", "mariadb"):
@@ -1242,7 +2188,7 @@ class SQLStorage(BaseStorage):
                             "data_hash=VALUES(data_hash), "
                             "updated_at=VALUES(updated_at)"
                         )
-                    elif self.dialect in ("postgres", "postgresql", "pgsql"):
+                    elif self._is_pgsql or self._is_sqlite:
                         upsert_stmt = text(
                             "INSERT INTO tokens (token_id, token, pool_name, status, quota, created_at, "
                             "last_used_at, use_count, fail_count, last_fail_at, "
@@ -1285,70 +2231,133 @@ class SQLStorage(BaseStorage):
                     await session.execute(upsert_stmt, updates)
 
                 if usage_updates:
-                    if self.dialect in ("mysql", "mariadb"):
-                        usage_stmt = text(
-                            "INSERT INTO tokens (token_id, token, pool_name, status, quota, created_at, "
-                            "last_used_at, use_count, fail_count, last_fail_at, "
-                            "last_fail_reason, last_sync_at, tags, note, "
-                            "last_asset_clear_at, data, data_hash, updated_at) "
-                            "VALUES (:token_id, :token, :pool_name, :status, :quota, :created_at, "
-                            ":last_used_at, :use_count, :fail_count, :last_fail_at, "
-                            ":last_fail_reason, :last_sync_at, :tags, :note, "
-                            ":last_asset_clear_at, :data, :data_hash, :updated_at) "
-                            "ON DUPLICATE KEY UPDATE "
-                            "token=VALUES(token), "
-                            "pool_name=VALUES(pool_name), "
-                            "status=VALUES(status), "
-                            "quota=VALUES(quota), "
-                            "last_used_at=VALUES(last_used_at), "
-                            "use_count=VALUES(use_count), "
-                            "fail_count=VALUES(fail_count), "
-                            "last_fail_at=VALUES(last_fail_at), "
-                            "last_fail_reason=VALUES(last_fail_reason), "
-                            "last_sync_at=VALUES(last_sync_at), "
-                            "updated_at=VALUES(updated_at)"
-                        )
-                    elif self.dialect in ("postgres", "postgresql", "pgsql"):
-                        usage_stmt = text(
-                            "INSERT INTO tokens (token_id, token, pool_name, status, quota, created_at, "
-                            "last_used_at, use_count, fail_count, last_fail_at, "
-                            "last_fail_reason, last_sync_at, tags, note, "
-                            "last_asset_clear_at, data, data_hash, updated_at) "
-                            "VALUES (:token_id, :token, :pool_name, :status, :quota, :created_at, "
-                            ":last_used_at, :use_count, :fail_count, :last_fail_at, "
-                            ":last_fail_reason, :last_sync_at, :tags, :note, "
-                            ":last_asset_clear_at, :data, :data_hash, :updated_at) "
-                            "ON CONFLICT (token_id) DO UPDATE SET "
-                            "token=EXCLUDED.token, "
-                            "pool_name=EXCLUDED.pool_name, "
-                            "status=EXCLUDED.status, "
-                            "quota=EXCLUDED.quota, "
-                            "last_used_at=EXCLUDED.last_used_at, "
-                            "use_count=EXCLUDED.use_count, "
-                            "fail_count=EXCLUDED.fail_count, "
-                            "last_fail_at=EXCLUDED.last_fail_at, "
-                            "last_fail_reason=EXCLUDED.last_fail_reason, "
-                            "last_sync_at=EXCLUDED.last_sync_at, "
-                            "updated_at=EXCLUDED.updated_at"
-                        )
-                    else:
-                        usage_stmt = text(
-                            "INSERT INTO tokens (token_id, token, pool_name, status, quota, created_at, "
-                            "last_used_at, use_count, fail_count, last_fail_at, "
-                            "last_fail_reason, last_sync_at, tags, note, "
-                            "last_asset_clear_at, data, data_hash, updated_at) "
-                            "VALUES (:token_id, :token, :pool_name, :status, :quota, :created_at, "
-                            ":last_used_at, :use_count, :fail_count, :last_fail_at, "
-                            ":last_fail_reason, :last_sync_at, :tags, :note, "
-                            ":last_asset_clear_at, :data, :data_hash, :updated_at)"
-                        )
-                    await session.execute(usage_stmt, usage_updates)
+                    await self._update_usage_rows(session, usage_updates)
+
+                if self._is_pgsql and (deleted_set or updates or usage_updates):
+                    # NOTIFY 随事务提交投递
+                    await session.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": SQL_NOTIFY_CHANNEL, "payload": self._node_id},
+                    )
 
                 await session.commit()
         except Exception as e:
             logger.error(f"SQLStorage: 增量保存 Token 失败: {e}")
             raise
 
+    @staticmethod
+    def _token_id(value: str) -> str:
+        """删除列表兼容裸 token 与 token_id 两种形式"""
+        if _TOKEN_ID_RE.match(value):
+            return value
+        if value.startswith("sso="):
+            value = value[4:]
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    async def token_version(self) -> Any:
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        async with self.async_session() as session:
+            res = await session.execute(
+                text(
+                    "SELECT (SELECT MAX(updated_at) FROM tokens), "
+                    "(SELECT MAX(deleted_at) FROM token_tombstones)"
+                )
+            )
+            updated_at, deleted_at = res.first() or (None, None)
+        return max(int(updated_at or 0), int(deleted_at or 0))
+
+    async def load_token_changes(self, since: Any) -> Optional[TokenChanges]:
+        """按 updated_at 水位读取变更行，删除通过墓碑表同步"""
+        if since is None:
+            return None
+        await self._ensure_schema()
+        from sqlalchemy import text
+
+        # 回看一段时间以容忍各 worker 时钟偏差，重复应用同一行是幂等的
+        floor = int(since) - SQL_CHANGE_SKEW_MS
+        if floor <= 0:
+            return None
+        try:
+            async with self.async_session() as session:
+                res = await session.execute(
+                    text(f"{SQL_TOKEN_SELECT}, updated_at FROM tokens WHERE updated_at > :since"),
+                    {"since": floor},
+                )
+                rows = res.fetchall()
+                res = await session.execute(
+                    text(
+                        "SELECT token, deleted_at FROM token_tombstones "
+                        "WHERE deleted_at > :since AND token_id NOT IN "
+                        "(SELECT token_id FROM tokens)"
+                    ),
+                    {"since": floor},
+                )
+                tombstones = res.fetchall()
+        except Exception as e:
+            logger.warning(f"SQLStorage: 读取 Token 变更失败: {e}")
+            return None
+
+        changes = TokenChanges(version=int(since))
+        for row in rows:
+            try:
+                changes.upserts.append((row[1], self._row_to_token(row[:-1])))
+            except Exception:
+                continue
+            changes.version = max(changes.version, int(row[-1] or 0))
+        for token_str, deleted_at in tombstones:
+            if token_str:
+                changes.deleted.append(token_str)
+            changes.version = max(changes.version, int(deleted_at or 0))
+        return changes
+
+    async def wait_token_changes(self):
+        """PostgreSQL 使用 LISTEN/NOTIFY 推送变更，其他方言不支持"""
+        if not self._is_pgsql:
+            raise NotImplementedError
+        if self._listen_conn is None:
+            await self._open_listener()
+        while True:
+            payload = await self._notify_queue.get()
+            if payload is None:
+                await self._close_listener()
+                raise StorageError("SQLStorage: LISTEN 连接已断开")
+            if payload != self._node_id:
+                return
+
+    async def _open_listener(self):
+        conn = await self.engine.connect()
+        try:
+            raw = await conn.get_raw_connection()
+            driver = raw.driver_connection
+            if not hasattr(driver, "add_listener"):
+                raise NotImplementedError
+            queue: asyncio.Queue = asyncio.Queue()
+
+            def _on_notify(_conn, _pid, _channel, payload):
+                queue.put_nowait(payload)
+
+            def _on_terminate(_conn):
+                queue.put_nowait(None)
+
+            await driver.add_listener(SQL_NOTIFY_CHANNEL, _on_notify)
+            driver.add_termination_listener(_on_terminate)
+        except BaseException:
+            await conn.close()
+            raise
+        self._listen_conn = conn
+        self._notify_queue = queue
+
+    async def _close_listener(self):
+        conn, self._listen_conn = self._listen_conn, None
+        self._notify_queue = None
+        if conn is not None:
+            try:
+                await conn.invalidate()
+            except Exception:
+                pass
+
     async def verify_connection(self) -> bool:
         """验证数据库连接是否正常"""
         try:
@@ -1362,6 +2371,7 @@ class SQLStorage(BaseStorage):
             return False
 
     async def close(self):
+        await self._close_listener()
         await self.engine.dispose()
 
 
@@ -1379,6 +2389,9 @@ class StorageFactory:
                 return f"mysql+aiomysql://{url[len('mysql://') :]}"
             if url.startswith("mariadb://"):
                 return f"mariadb+aiomysql://{url[len('mariadb://') :]}"
+        if storage_type == "sqlite":
+            if url.startswith("sqlite://"):
+                return f"sqlite+aiosqlite://{url[len('sqlite://') :]}"
         if storage_type == "pgsql":
             if url.startswith("postgres://"):
                 return f"postgresql+asyncpg://{url[len('postgres://') :]}"
@@ -1410,6 +2423,12 @@ class StorageFactory:
             storage_url = cls._normalize_sql_url(storage_type, storage_url)
             cls._instance = SQLStorage(storage_url)
 
+        elif storage_type == "sqlite":
+            if not storage_url:
+                storage_url = f"sqlite+aiosqlite:///{SQLITE_DB_FILE}"
+            storage_url = cls._normalize_sql_url(storage_type, storage_url)
+            cls._instance = SQLStorage(storage_url)
+
         else:
             cls._instance = LocalStorage()
 
@@ -9,7 +9,7 @@ from app.core.config import get_config
 from app.core.logger import logger
 from app.services.reverse.assets_list import AssetsListReverse
 from app.services.reverse.assets_delete import AssetsDeleteReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session import PooledSession, pooled_session
 from app.core.batch import run_batch
 
 
@@ -17,15 +17,11 @@ class BaseAssetsService:
     """Base assets service."""
 
     def __init__(self):
-        self._session: Optional[ResettableSession] = None
+        self._session: Optional[PooledSession] = None
 
-    async def _get_session(self) -> ResettableSession:
+    async def _get_session(self) -> PooledSession:
         if self._session is None:
-            browser = get_config("proxy.browser")
-            if browser:
-                self._session = ResettableSession(impersonate=browser)
-            else:
-                self._session = ResettableSession()
+            self._session = pooled_session(impersonate=get_config("proxy.browser"))
         return self._session
 
     async def close(self):
@@ -11,7 +11,7 @@ from app.core.exceptions import UpstreamException
 from app.services.reverse.accept_tos import AcceptTosReverse
 from app.services.reverse.nsfw_mgmt import NsfwMgmtReverse
 from app.services.reverse.set_birth import SetBirthReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session import pooled_session
 from app.core.batch import run_batch
 
 
@@ -43,7 +43,7 @@ class NSFWService:
         async def _enable(token: str):
             try:
                 browser = get_config("proxy.browser")
-                async with ResettableSession(impersonate=browser) as session:
+                async with pooled_session(impersonate=browser) as session:
                     async def _record_fail(err: UpstreamException, reason: str):
                         status = None
                         if err.details and "status" in err.details:
@@ -4,7 +4,6 @@ Grok Chat 服务
 
 import asyncio
 import re
-import uuid
 from typing import Dict, List, Any, AsyncGenerator, AsyncIterable
 
 import orjson
@@ -13,18 +12,23 @@ from curl_cffi.requests.errors import RequestsError
 from app.core.logger import logger
 from app.core.config import get_config
 from app.core.exceptions import (
-    AppException,
     ValidationException,
-    ErrorType,
     UpstreamException,
     StreamIdleTimeoutError,
 )
 from app.services.grok.services.model import ModelService
 from app.services.grok.utils.upload import UploadService
 from app.services.grok.utils import process as proc_base
-from app.services.grok.utils.retry import pick_token, rate_limited
+from app.services.grok.utils.coalesce import coalesce_enabled, coalesce_sse
+from app.services.grok.utils.tag_filter import TagFilter, get_tag_automaton
+from app.services.grok.utils.tool_card import (
+    RENDER_CARD_RE,
+    ROLLOUT_ID_RE,
+    extract_tool_text,
+)
+from app.services.grok.utils.retry import no_available_token, pick_token, rate_limited
 from app.services.reverse.app_chat import AppChatReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.multiplex import stream_session
 from app.services.grok.utils.stream import wrap_stream_with_usage
 from app.services.token import get_token_manager, EffortType
 
@@ -35,61 +39,7 @@ _CHAT_SEM_VALUE = None
 _CHAT_SEMAPHORE = None
 _CHAT_SEM_VALUE = 0
 
-def extract_tool_text(raw: str, rollout_id: str = "") -> str:
-    if not raw:
-        return ""
-    name_match = re.search(
-        r"<xai:tool_name>(.*?)</xai:tool_name>", raw, flags=re.DOTALL
-    )
-    args_match = re.search(
-        r"<xai:tool_args>(.*?)</xai:tool_args>", raw, flags=re.DOTALL
-    )
-
-    name = name_match.group(1) if name_match else ""
-    if name:
-        name = re.sub(r"<!\[CDATA\[(.*?)\]\]>", r"\1", name, flags=re.DOTALL).strip()
-
-    args = args_match.group(1) if args_match else ""
-    if args:
-        args = re.sub(r"<!\[CDATA\[(.*?)\]\]>", r"\1", args, flags=re.DOTALL).strip()
-
-    payload = None
-    if args:
-        try:
-            payload = orjson.loads(args)
-        except orjson.JSONDecodeError:
-            payload = None
-
-    label = name
-    text = args
-    prefix = f"[{rollout_id}]" if rollout_id else ""
-
-    if name == "web_search":
-        label = f"{prefix}[WebSearch]"
-        if isinstance(payload, dict):
-            text = payload.get("query") or payload.get("q") or ""
-    elif name == "search_images":
-        label = f"{prefix}[SearchImage]"
-        if isinstance(payload, dict):
-            text = (
-                payload.get("image_description")
-                or payload.get("description")
-                or payload.get("query")
-                or ""
-            )
-    elif name == "chatroom_send":
-        label = f"{prefix}[AgentThink]"
-        if isinstance(payload, dict):
-            text = payload.get("message") or ""
-
-    if label and text:
-        return f"{label} {text}".strip()
-    if label:
-        return label
-    if text:
-        return text
-    # Fallback: strip tags to keep any raw text.
-    return re.sub(r"<[^>]+>", "", raw, flags=re.DOTALL).strip()
+TOOL_USAGE_CARD_TAG = "xai:tool_usage_card"
 
 
 def _get_chat_semaphore() -> asyncio.Semaphore:
@@ -192,7 +142,7 @@ class GrokChatService:
         browser = get_config("proxy.browser")
 
         async def _stream():
-            session = ResettableSession(impersonate=browser)
+            session = stream_session(impersonate=browser)
             try:
                 async with _get_chat_semaphore():
                     stream_response = await AppChatReverse.request(
@@ -302,8 +252,12 @@ class ChatService:
         reasoning_effort: str | None = None,
         temperature: float = 0.8,
         top_p: float = 0.95,
+        coalesce: bool | None = None,
     ):
-        """Chat Completions 入口"""
+        """Chat Completions 入口
+
+        coalesce: 流式输出是否合并小块，None 时取 chat.stream_coalesce
+        """
         # 获取 token
         token_mgr = await get_token_manager()
         await token_mgr.reload_if_stale()
@@ -326,14 +280,12 @@ class ChatService:
             if not token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_available_token(token_mgr)
 
             tried_tokens.add(token)
+            lease = token_mgr.lease(token)
+            handed_off = False
+            succeeded = False
 
             try:
                 # 请求 Grok
@@ -352,13 +304,22 @@ class ChatService:
                 if is_stream:
                     logger.debug(f"Processing stream response: model={model}")
                     processor = StreamProcessor(model_name, token, show_think)
+                    output = processor.process(response)
+                    if coalesce_enabled(coalesce):
+                        output = coalesce_sse(output, processor.chunks)
+                    handed_off = True
                     return wrap_stream_with_usage(
-                        processor.process(response), token_mgr, token, model
+                        output,
+                        token_mgr,
+                        token,
+                        model,
+                        lease=lease,
                     )
 
                 # 非流式
                 logger.debug(f"Processing non-stream response: model={model}")
                 result = await CollectProcessor(model_name, token).process(response)
+                succeeded = True
                 try:
                     model_info = ModelService.get(model)
                     effort = (
@@ -387,15 +348,14 @@ class ChatService:
                 # 非 429 错误，不换 token，直接抛出
                 raise
 
+            finally:
+                if not handed_off:
+                    lease.release(success=succeeded)
+
         # 所有 token 都 429，抛出最后的错误
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_available_token(token_mgr)
 
 
 class StreamProcessor(proc_base.BaseProcessor):
@@ -410,116 +370,68 @@ class StreamProcessor(proc_base.BaseProcessor):
         self.image_think_active: bool = False
         self.role_sent: bool = False
         self.filter_tags = get_config("app.filter_tags")
-        self.tool_usage_enabled = (
-            "xai:tool_usage_card" in (self.filter_tags or [])
+        self._tag_filter = TagFilter(
+            get_tag_automaton(self.filter_tags), self._replace_block
         )
-        self._tool_usage_opened = False
-        self._tool_usage_buffer = ""
+        self.chunks = proc_base.SSEChunkTemplate(self.created, model)
 
         self.show_think = bool(show_think)
 
-    def _filter_tool_card(self, token: str) -> str:
-        if not token or not self.tool_usage_enabled:
-            return token
-
-        output_parts: list[str] = []
-        rest = token
-        start_tag = "<xai:tool_usage_card"
-        end_tag = "</xai:tool_usage_card>"
-
-        while rest:
-            if self._tool_usage_opened:
-                end_idx = rest.find(end_tag)
-                if end_idx == -1:
-                    self._tool_usage_buffer += rest
-                    return "".join(output_parts)
-                end_pos = end_idx + len(end_tag)
-                self._tool_usage_buffer += rest[:end_pos]
-                line = extract_tool_text(self._tool_usage_buffer, self.rollout_id)
-                if line:
-                    if output_parts and not output_parts[-1].endswith("\n"):
-                        output_parts[-1] += "\n"
-                    output_parts.append(f"{line}\n")
-                self._tool_usage_buffer = ""
-                self._tool_usage_opened = False
-                rest = rest[end_pos:]
-                continue
-
-            start_idx = rest.find(start_tag)
-            if start_idx == -1:
-                output_parts.append(rest)
-                break
-
-            if start_idx > 0:
-                output_parts.append(rest[:start_idx])
-
-            end_idx = rest.find(end_tag, start_idx)
-            if end_idx == -1:
-                self._tool_usage_opened = True
-                self._tool_usage_buffer = rest[start_idx:]
-                break
-
-            end_pos = end_idx + len(end_tag)
-            raw_card = rest[start_idx:end_pos]
-            line = extract_tool_text(raw_card, self.rollout_id)
-            if line:
-                if output_parts and not output_parts[-1].endswith("\n"):
-                    output_parts[-1] += "\n"
-                output_parts.append(f"{line}\n")
-            rest = rest[end_pos:]
-
-        return "".join(output_parts)
+    def _replace_block(self, tag: str, raw: str) -> str:
+        """Render filtered tool usage cards as a one-line summary; drop other tags."""
+        if tag != TOOL_USAGE_CARD_TAG:
+            return ""
+        line = extract_tool_text(raw, self.rollout_id)
+        return f"{line}\n" if line else ""
 
     def _filter_token(self, token: str) -> str:
-        """Filter special tags in current token only."""
-        if not token:
-            return token
+        """Filter special tags; tags split across tokens are held back until resolved."""
+        return self._tag_filter.feed(token)
 
-        if self.tool_usage_enabled:
-            token = self._filter_tool_card(token)
-            if not token:
-                return ""
-
-        if not self.filter_tags:
-            return token
-
-        for tag in self.filter_tags:
-            if tag == "xai:tool_usage_card":
-                continue
-            if f"<{tag}" in token or f"</{tag}" in token:
-                return ""
-
-        return token
+    def _token_chunks(self, token: str, is_thinking: Any) -> List[bytes]:
+        """Build SSE chunks for one token delta.
 
-    def _sse(self, content: str = "", role: str = None, finish: str = None) -> str:
+        isThinking controls <think> tagging; when absent, treat as False.
+        """
+        if not token:
+            return []
+        filtered = self._filter_token(token)
+        if not filtered:
+            return []
+        chunks = []
+        if is_thinking or self.image_think_active:
+            if not self.show_think:
+                return []
+            if not self.think_opened:
+                chunks.append(self._sse("<think>\n"))
+                self.think_opened = True
+        elif self.think_opened:
+            chunks.append(self._sse("\n</think>\n"))
+            self.think_opened = False
+        chunks.append(self._sse(filtered))
+        return chunks
+
+    def _sse(self, content: str = "", role: str = None, finish: str = None) -> bytes:
         """Build SSE response."""
+        if content and not role and not finish:
+            return self.chunks.content(self.response_id, content, self.fingerprint)
+
         delta = {}
         if role:
             delta["role"] = role
             delta["content"] = ""
         elif content:
             delta["content"] = content
+        return self.chunks.render(self.response_id, delta, finish, self.fingerprint)
 
-        chunk = {
-            "id": self.response_id or f"chatcmpl-{uuid.uuid4().hex[:24]}",
-            "object": "chat.completion.chunk",
-            "created": self.created,
-            "model": self.model,
-            "system_fingerprint": self.fingerprint,
-            "choices": [
-                {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}
-            ],
-        }
-        return f"data: {orjson.dumps(chunk).decode()}\n\n"
-
-    async def process(self, response: AsyncIterable[bytes]) -> AsyncGenerator[str, None]:
+    async def process(self, response: AsyncIterable[bytes]) -> AsyncGenerator[bytes, None]:
         """Process stream response.
         
         Args:
             response: AsyncIterable[bytes], async iterable of bytes
 
         Returns:
-            AsyncGenerator[str, None], async generator of strings
+            AsyncGenerator[bytes, None], async generator of SSE chunks
         """
         idle_timeout = get_config("chat.stream_timeout")
 
@@ -527,30 +439,31 @@ class StreamProcessor(proc_base.BaseProcessor):
             async for line in proc_base._with_idle_timeout(
                 response, idle_timeout, self.model
             ):
-                line = proc_base._normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
+                resp = proc_base._parse_frame(line)
+                if resp is None:
                     continue
-
-                resp = data.get("result", {}).get("response", {})
-                is_thinking = bool(resp.get("isThinking"))
-                # isThinking controls <think> tagging
-                # when absent, treat as False
-
-                if (llm := resp.get("llmInfo")) and not self.fingerprint:
-                    self.fingerprint = llm.get("modelHash", "")
+                # Plain token deltas dominate the stream; skip the rich-frame lookups
+                token_frame = proc_base._is_token_frame(resp)
+
+                if not token_frame:
+                    if (llm := resp.get("llmInfo")) and not self.fingerprint:
+                        self.fingerprint = llm.get("modelHash", "")
+                    if rid := resp.get("rolloutId"):
+                        self.rollout_id = str(rid)
                 if rid := resp.get("responseId"):
                     self.response_id = rid
-                if rid := resp.get("rolloutId"):
-                    self.rollout_id = str(rid)
 
                 if not self.role_sent:
                     yield self._sse(role="assistant")
                     self.role_sent = True
 
+                if token_frame:
+                    for chunk in self._token_chunks(
+                        resp["token"], resp.get("isThinking")
+                    ):
+                        yield chunk
+                    continue
+
                 if img := resp.get("streamingImageGenerationResponse"):
                     if not self.show_think:
                         continue
@@ -607,28 +520,16 @@ class StreamProcessor(proc_base.BaseProcessor):
                     continue
 
                 if (token := resp.get("token")) is not None:
-                    if not token:
-                        continue
-                    filtered = self._filter_token(token)
-                    if not filtered:
-                        continue
-                    in_think = is_thinking or self.image_think_active
-                    if in_think:
-                        if not self.show_think:
-                            continue
-                        if not self.think_opened:
-                            yield self._sse("<think>\n")
-                            self.think_opened = True
-                    else:
-                        if self.think_opened:
-                            yield self._sse("\n</think>\n")
-                            self.think_opened = False
-                    yield self._sse(filtered)
+                    for chunk in self._token_chunks(token, resp.get("isThinking")):
+                        yield chunk
 
+            # Unclosed tag at end of stream: emit the held text as-is
+            if tail := self._tag_filter.finish():
+                yield self._sse(tail)
             if self.think_opened:
                 yield self._sse("</think>\n")
             yield self._sse(finish="stop")
-            yield "data: [DONE]\n\n"
+            yield proc_base.SSE_DONE
         except asyncio.CancelledError:
             logger.debug("Stream cancelled by client", extra={"model": self.model})
         except StreamIdleTimeoutError as e:
@@ -677,33 +578,19 @@ class CollectProcessor(proc_base.BaseProcessor):
         if not content or not self.filter_tags:
             return content
 
-        result = content
-        if "xai:tool_usage_card" in self.filter_tags:
-            rollout_id = ""
-            rollout_match = re.search(
-                r"<rolloutId>(.*?)</rolloutId>", result, flags=re.DOTALL
-            )
+        rollout_id = ""
+        if TOOL_USAGE_CARD_TAG in self.filter_tags:
+            rollout_match = ROLLOUT_ID_RE.search(content)
             if rollout_match:
                 rollout_id = rollout_match.group(1).strip()
 
-            result = re.sub(
-                r"<xai:tool_usage_card[^>]*>.*?</xai:tool_usage_card>",
-                lambda match: (
-                    f"{extract_tool_text(match.group(0), rollout_id)}\n"
-                    if extract_tool_text(match.group(0), rollout_id)
-                    else ""
-                ),
-                result,
-                flags=re.DOTALL,
-            )
-
-        for tag in self.filter_tags:
-            if tag == "xai:tool_usage_card":
-                continue
-            pattern = rf"<{re.escape(tag)}[^>]*>.*?</{re.escape(tag)}>|<{re.escape(tag)}[^>]*/>"
-            result = re.sub(pattern, "", result, flags=re.DOTALL)
+        def _replace(tag: str, raw: str) -> str:
+            if tag != TOOL_USAGE_CARD_TAG:
+                return ""
+            line = extract_tool_text(raw, rollout_id)
+            return f"{line}\n" if line else ""
 
-        return result
+        return TagFilter(get_tag_automaton(self.filter_tags), _replace).filter(content)
 
     async def process(self, response: AsyncIterable[bytes]) -> dict[str, Any]:
         """Process and collect full response."""
@@ -716,16 +603,11 @@ class CollectProcessor(proc_base.BaseProcessor):
             async for line in proc_base._with_idle_timeout(
                 response, idle_timeout, self.model
             ):
-                line = proc_base._normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
+                resp = proc_base._parse_frame(line)
+                if resp is None or proc_base._is_token_frame(resp):
+                    # Only metadata and the final modelResponse are collected
                     continue
 
-                resp = data.get("result", {}).get("response", {})
-
                 if (llm := resp.get("llmInfo")) and not fingerprint:
                     fingerprint = llm.get("modelHash", "")
 
@@ -766,12 +648,7 @@ class CollectProcessor(proc_base.BaseProcessor):
                                     prefix = "\n"
                             return f"{prefix}![{title_safe}]({original})"
 
-                        content = re.sub(
-                            r'<grok:render[^>]*card_id="([^"]+)"[^>]*>.*?</grok:render>',
-                            _render_card,
-                            content,
-                            flags=re.DOTALL,
-                        )
+                        content = RENDER_CARD_RE.sub(_render_card, content)
 
                     if urls := proc_base._collect_images(mr):
                         content += "\n"
@@ -15,9 +15,9 @@ import orjson
 from app.core.config import get_config
 from app.core.logger import logger
 from app.core.storage import DATA_DIR
-from app.core.exceptions import AppException, ErrorType, UpstreamException
+from app.core.exceptions import UpstreamException
 from app.services.grok.utils.process import BaseProcessor
-from app.services.grok.utils.retry import pick_token, rate_limited
+from app.services.grok.utils.retry import no_available_token, pick_token, rate_limited
 from app.services.grok.utils.stream import wrap_stream_with_usage
 from app.services.token import EffortType
 from app.services.reverse.ws_imagine import ImagineWebSocketReverse
@@ -65,15 +65,11 @@ class ImageGenerationService:
                     if not current_token:
                         if last_error:
                             raise last_error
-                        raise AppException(
-                            message="No available tokens. Please try again later.",
-                            error_type=ErrorType.RATE_LIMIT.value,
-                            code="rate_limit_exceeded",
-                            status_code=429,
-                        )
+                        raise no_available_token(token_mgr)
 
                     tried_tokens.add(current_token)
                     yielded = False
+                    lease = token_mgr.lease(current_token)
                     try:
                         result = await self._stream_ws(
                             token_mgr=token_mgr,
@@ -87,11 +83,15 @@ class ImageGenerationService:
                             enable_nsfw=enable_nsfw,
                         )
                         async for chunk in result.data:
-                            yielded = True
+                            if not yielded:
+                                yielded = True
+                                lease.mark_first_byte()
                             yield chunk
+                        lease.release(success=True)
                         return
                     except UpstreamException as e:
                         last_error = e
+                        lease.release(success=False)
                         if rate_limited(e):
                             if yielded:
                                 raise
@@ -102,15 +102,12 @@ class ImageGenerationService:
                             )
                             continue
                         raise
+                    finally:
+                        lease.release()
 
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_available_token(token_mgr)
 
             return ImageGenerationResult(stream=True, data=_stream_retry())
 
@@ -122,25 +119,21 @@ class ImageGenerationService:
             if not current_token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_available_token(token_mgr)
 
             tried_tokens.add(current_token)
             try:
-                return await self._collect_ws(
-                    token_mgr=token_mgr,
-                    token=current_token,
-                    model_info=model_info,
-                    prompt=prompt,
-                    n=n,
-                    response_format=response_format,
-                    aspect_ratio=aspect_ratio,
-                    enable_nsfw=enable_nsfw,
-                )
+                async with token_mgr.lease(current_token):
+                    return await self._collect_ws(
+                        token_mgr=token_mgr,
+                        token=current_token,
+                        model_info=model_info,
+                        prompt=prompt,
+                        n=n,
+                        response_format=response_format,
+                        aspect_ratio=aspect_ratio,
+                        enable_nsfw=enable_nsfw,
+                    )
             except UpstreamException as e:
                 last_error = e
                 if rate_limited(e):
@@ -154,12 +147,7 @@ class ImageGenerationService:
 
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_available_token(token_mgr)
 
     async def _stream_ws(
         self,
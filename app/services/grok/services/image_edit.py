@@ -22,12 +22,12 @@ from app.core.logger import logger
 from app.services.grok.utils.process import (
     BaseProcessor,
     _with_idle_timeout,
-    _normalize_line,
+    _parse_frame,
     _collect_images,
     _is_http2_error,
 )
 from app.services.grok.utils.upload import UploadService
-from app.services.grok.utils.retry import pick_token, rate_limited
+from app.services.grok.utils.retry import no_available_token, pick_token, rate_limited
 from app.services.grok.services.chat import GrokChatService
 from app.services.grok.services.video import VideoService
 from app.services.grok.utils.stream import wrap_stream_with_usage
@@ -67,14 +67,12 @@ class ImageEditService:
             if not current_token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_available_token(token_mgr)
 
             tried_tokens.add(current_token)
+            lease = token_mgr.lease(current_token)
+            handed_off = False
+            succeeded = False
             try:
                 image_urls = await self._upload_images(images, current_token)
                 parent_post_id = await self._get_parent_post_id(
@@ -112,6 +110,7 @@ class ImageEditService:
                         n=n,
                         response_format=response_format,
                     )
+                    handed_off = True
                     return ImageEditResult(
                         stream=True,
                         data=wrap_stream_with_usage(
@@ -119,6 +118,7 @@ class ImageEditService:
                             token_mgr,
                             current_token,
                             model_info.model_id,
+                            lease=lease,
                         ),
                     )
 
@@ -131,6 +131,7 @@ class ImageEditService:
                     tool_overrides=tool_overrides,
                     model_config_override=model_config_override,
                 )
+                succeeded = True
                 try:
                     effort = (
                         EffortType.HIGH
@@ -155,15 +156,13 @@ class ImageEditService:
                     )
                     continue
                 raise
+            finally:
+                if not handed_off:
+                    lease.release(success=succeeded)
 
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_available_token(token_mgr)
 
     async def _upload_images(self, images: List[str], token: str) -> List[str]:
         image_urls: List[str] = []
@@ -312,16 +311,10 @@ class ImageStreamProcessor(BaseProcessor):
 
         try:
             async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
+                resp = _parse_frame(line)
+                if resp is None:
                     continue
 
-                resp = data.get("result", {}).get("response", {})
-
                 # Image generation progress
                 if img := resp.get("streamingImageGenerationResponse"):
                     image_index = img.get("imageIndex", 0)
@@ -449,15 +442,9 @@ class ImageCollectProcessor(BaseProcessor):
 
         try:
             async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
+                resp = _parse_frame(line)
+                if resp is None:
                     continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
-                resp = data.get("result", {}).get("response", {})
 
                 if mr := resp.get("modelResponse"):
                     if urls := _collect_images(mr):
@@ -3,11 +3,9 @@ Grok video generation service.
 """
 
 import asyncio
-import uuid
 import re
 from typing import Any, AsyncGenerator, AsyncIterable, Optional
 
-import orjson
 from curl_cffi.requests.errors import RequestsError
 
 from app.core.logger import logger
@@ -16,7 +14,6 @@ from app.core.exceptions import (
     UpstreamException,
     AppException,
     ValidationException,
-    ErrorType,
     StreamIdleTimeoutError,
 )
 from app.services.grok.services.model import ModelService
@@ -24,15 +21,18 @@ from app.services.token import get_token_manager, EffortType
 from app.services.grok.utils.stream import wrap_stream_with_usage
 from app.services.grok.utils.process import (
     BaseProcessor,
+    SSEChunkTemplate,
+    SSE_DONE,
     _with_idle_timeout,
-    _normalize_line,
+    _parse_frame,
     _is_http2_error,
 )
-from app.services.grok.utils.retry import rate_limited
+from app.services.grok.utils.retry import no_available_token, rate_limited
 from app.services.reverse.app_chat import AppChatReverse
 from app.services.reverse.media_post import MediaPostReverse
 from app.services.reverse.video_upscale import VideoUpscaleReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.multiplex import stream_session
+from app.services.reverse.utils.session import PooledSession, pooled_session
 from app.services.token.manager import BASIC_POOL_NAME
 
 _VIDEO_SEMAPHORE = None
@@ -48,11 +48,8 @@ def _get_video_semaphore() -> asyncio.Semaphore:
     return _VIDEO_SEMAPHORE
 
 
-def _new_session() -> ResettableSession:
-    browser = get_config("proxy.browser")
-    if browser:
-        return ResettableSession(impersonate=browser)
-    return ResettableSession()
+def _new_session() -> PooledSession:
+    return pooled_session(impersonate=get_config("proxy.browser"))
 
 
 class VideoService:
@@ -138,7 +135,7 @@ class VideoService:
         }
 
         async def _stream():
-            session = _new_session()
+            session = stream_session(impersonate=get_config("proxy.browser"))
             try:
                 async with _get_video_semaphore():
                     stream_response = await AppChatReverse.request(
@@ -198,7 +195,7 @@ class VideoService:
         }
 
         async def _stream():
-            session = _new_session()
+            session = stream_session(impersonate=get_config("proxy.browser"))
             try:
                 async with _get_video_semaphore():
                     stream_response = await AppChatReverse.request(
@@ -264,22 +261,25 @@ class VideoService:
                 pool_candidates=pool_candidates,
             )
 
-            if not token_info:
+            if token_info:
+                # Extract token string from TokenInfo.
+                token = token_info.token
+                if token.startswith("sso="):
+                    token = token[4:]
+            else:
+                # All candidate tokens may be at their in-flight cap; queue for one.
+                token = await token_mgr.wait_for_token(pool_candidates)
+
+            if not token:
                 if last_error:
                     raise last_error
-                raise AppException(
-                    message="No available tokens. Please try again later.",
-                    error_type=ErrorType.RATE_LIMIT.value,
-                    code="rate_limit_exceeded",
-                    status_code=429,
-                )
+                raise no_available_token(token_mgr)
 
-            # Extract token string from TokenInfo.
-            token = token_info.token
-            if token.startswith("sso="):
-                token = token[4:]
             pool_name = token_mgr.get_pool_name_for_token(token)
             should_upscale = resolution == "720p" and pool_name == BASIC_POOL_NAME
+            lease = token_mgr.lease(token)
+            handed_off = False
+            succeeded = False
 
             try:
                 # Handle image attachments.
@@ -327,13 +327,19 @@ class VideoService:
                         show_think,
                         upscale_on_finish=should_upscale,
                     )
+                    handed_off = True
                     return wrap_stream_with_usage(
-                        processor.process(response), token_mgr, token, model
+                        processor.process(response),
+                        token_mgr,
+                        token,
+                        model,
+                        lease=lease,
                     )
 
                 result = await VideoCollectProcessor(
                     model, token, upscale_on_finish=should_upscale
                 ).process(response)
+                succeeded = True
                 try:
                     model_info = ModelService.get(model)
                     effort = (
@@ -360,14 +366,13 @@ class VideoService:
                     continue
                 raise
 
+            finally:
+                if not handed_off:
+                    lease.release(success=succeeded)
+
         if last_error:
             raise last_error
-        raise AppException(
-            message="No available tokens. Please try again later.",
-            error_type=ErrorType.RATE_LIMIT.value,
-            code="rate_limit_exceeded",
-            status_code=429,
-        )
+        raise no_available_token(token_mgr)
 
 
 class VideoStreamProcessor(BaseProcessor):
@@ -384,6 +389,7 @@ class VideoStreamProcessor(BaseProcessor):
         self.response_id: Optional[str] = None
         self.think_opened: bool = False
         self.role_sent: bool = False
+        self.chunks = SSEChunkTemplate(self.created, model)
 
         self.show_think = bool(show_think)
         self.upscale_on_finish = bool(upscale_on_finish)
@@ -421,43 +427,30 @@ class VideoStreamProcessor(BaseProcessor):
             logger.warning(f"Video upscale failed: {e}")
         return video_url
 
-    def _sse(self, content: str = "", role: str = None, finish: str = None) -> str:
+    def _sse(self, content: str = "", role: str = None, finish: str = None) -> bytes:
         """Build SSE response."""
+        if content and not role and not finish:
+            return self.chunks.content(self.response_id, content)
+
         delta = {}
         if role:
             delta["role"] = role
             delta["content"] = ""
         elif content:
             delta["content"] = content
-
-        chunk = {
-            "id": self.response_id or f"chatcmpl-{uuid.uuid4().hex[:24]}",
-            "object": "chat.completion.chunk",
-            "created": self.created,
-            "model": self.model,
-            "choices": [
-                {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}
-            ],
-        }
-        return f"data: {orjson.dumps(chunk).decode()}\n\n"
+        return self.chunks.render(self.response_id, delta, finish)
 
     async def process(
         self, response: AsyncIterable[bytes]
-    ) -> AsyncGenerator[str, None]:
+    ) -> AsyncGenerator[bytes, None]:
         """Process video stream response."""
         idle_timeout = get_config("video.stream_timeout")
 
         try:
             async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
-                    continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
+                resp = _parse_frame(line)
+                if resp is None:
                     continue
-
-                resp = data.get("result", {}).get("response", {})
                 is_thinking = bool(resp.get("isThinking"))
 
                 if rid := resp.get("responseId"):
@@ -521,7 +514,7 @@ class VideoStreamProcessor(BaseProcessor):
             if self.think_opened:
                 yield self._sse("</think>\n")
             yield self._sse(finish="stop")
-            yield "data: [DONE]\n\n"
+            yield SSE_DONE
         except asyncio.CancelledError:
             logger.debug(
                 "Video stream cancelled by client", extra={"model": self.model}
@@ -611,15 +604,9 @@ class VideoCollectProcessor(BaseProcessor):
 
         try:
             async for line in _with_idle_timeout(response, idle_timeout, self.model):
-                line = _normalize_line(line)
-                if not line:
+                resp = _parse_frame(line)
+                if resp is None:
                     continue
-                try:
-                    data = orjson.loads(line)
-                except orjson.JSONDecodeError:
-                    continue
-
-                resp = data.get("result", {}).get("response", {})
 
                 if video_resp := resp.get("streamingVideoGenerationResponse"):
                     if video_resp.get("progress") == 100:
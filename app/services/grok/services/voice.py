@@ -6,7 +6,7 @@ from typing import Any, Dict
 
 from app.core.config import get_config
 from app.services.reverse.ws_livekit import LivekitTokenReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session import pooled_session
 
 
 class VoiceService:
@@ -20,7 +20,7 @@ class VoiceService:
         speed: float = 1.0,
     ) -> Dict[str, Any]:
         browser = get_config("proxy.browser")
-        async with ResettableSession(impersonate=browser) as session:
+        async with pooled_session(impersonate=browser) as session:
             response = await LivekitTokenReverse.request(
                 session,
                 token=token,
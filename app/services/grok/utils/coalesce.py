@@ -0,0 +1,148 @@
+"""
+流式输出合并（微批）
+
+上游每个 token 一行，逐个转发会产生大量极小的 SSE 事件与 HTTP 写入。
+合并阶段位于 StreamProcessor.process 与 StreamingResponse 之间，把时间窗口内
+连续到达的 content 增量合并为一个事件：
+- 首个增量缓冲后最多等待 chat.stream_coalesce_window_ms
+- 缓冲的 content 达到 chat.stream_coalesce_max_bytes 立即下发
+- think 标签切换、role/finish 等非 content 块、上游报错时先下发缓冲再原样转发
+"""
+
+import asyncio
+from typing import AsyncGenerator, List, Optional
+
+import orjson
+
+from app.core.config import get_config
+from app.services.grok.utils.process import SSEChunkTemplate
+
+
+DEFAULT_COALESCE_WINDOW_MS = 20
+DEFAULT_COALESCE_MAX_BYTES = 256
+# 上游读取与下发之间的缓冲块数
+COALESCE_QUEUE_SIZE = 64
+
+# think 标签切换块，遇到时立即下发
+_THINK_TAG_LITERALS = frozenset(
+    orjson.dumps(tag) for tag in ("<think>\n", "\n</think>\n", "</think>\n")
+)
+_END = object()
+
+
+def _config_float(key: str, default: float) -> float:
+    try:
+        return float(get_config(key, default))
+    except Exception:
+        return float(default)
+
+
+def coalesce_enabled(override: Optional[bool] = None) -> bool:
+    """是否启用合并（请求参数优先于 chat.stream_coalesce）"""
+    if override is not None:
+        return bool(override)
+    return bool(get_config("chat.stream_coalesce", False))
+
+
+async def coalesce_sse(
+    stream: AsyncGenerator[bytes, None], template: SSEChunkTemplate
+) -> AsyncGenerator[bytes, None]:
+    """
+    合并由 template 渲染的连续 content 增量块
+
+    上游在独立任务中读取，下发端可以在等待新数据时按时间窗口刷新缓冲。
+
+    Args:
+        stream: StreamProcessor.process 的输出
+        template: 该处理器的 SSE 模板，用于识别与重建 content 增量块
+    """
+    window_ms = _config_float(
+        "chat.stream_coalesce_window_ms", DEFAULT_COALESCE_WINDOW_MS
+    )
+    window = max(0.0, window_ms) / 1000
+    max_bytes = int(
+        _config_float("chat.stream_coalesce_max_bytes", DEFAULT_COALESCE_MAX_BYTES)
+    )
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=COALESCE_QUEUE_SIZE)
+
+    async def _produce():
+        try:
+            async for chunk in stream:
+                # 在处理器暂停于 yield 时拆分，此时模板前缀与该块一致
+                await queue.put((chunk, template.split_content(chunk)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(_END)
+
+    producer = asyncio.create_task(_produce())
+    parts: List[bytes] = []
+    prefix = b""
+    size = 0
+    deadline = 0.0
+
+    def _flush() -> bytes:
+        nonlocal size
+        merged = template.join_content(prefix, parts)
+        parts.clear()
+        size = 0
+        return merged
+
+    try:
+        while True:
+            if parts:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    yield _flush()
+                    continue
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        yield _flush()
+                        continue
+            else:
+                item = await queue.get()
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                if parts:
+                    yield _flush()
+                raise item
+
+            chunk, split = item
+            if split is None or split[1] in _THINK_TAG_LITERALS:
+                if parts:
+                    yield _flush()
+                yield chunk
+                continue
+
+            chunk_prefix, literal = split
+            if parts and chunk_prefix != prefix:
+                yield _flush()
+            if not parts:
+                prefix = chunk_prefix
+                deadline = loop.time() + window
+            parts.append(literal[1:-1])
+            size += len(literal) - 2
+            if size >= max_bytes:
+                yield _flush()
+
+        if parts:
+            yield _flush()
+    finally:
+        producer.cancel()
+        # 处理器会吞掉取消并收尾，清空队列避免其阻塞在 put 上
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait({producer}, timeout=0.05)
+
+
+__all__ = ["coalesce_enabled", "coalesce_sse"]
@@ -19,7 +19,7 @@ from app.core.storage import DATA_DIR
 from app.core.config import get_config
 from app.core.exceptions import AppException
 from app.services.reverse.assets_download import AssetsDownloadReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session import PooledSession, pooled_session
 from app.services.grok.utils.locks import _get_download_semaphore, _file_lock
 
 
@@ -27,7 +27,7 @@ class DownloadService:
     """Assets download service."""
 
     def __init__(self):
-        self._session: Optional[ResettableSession] = None
+        self._session: Optional[PooledSession] = None
         base_dir = DATA_DIR / "tmp"
         self.image_dir = base_dir / "image"
         self.video_dir = base_dir / "video"
@@ -35,14 +35,10 @@ class DownloadService:
         self.video_dir.mkdir(parents=True, exist_ok=True)
         self._cleanup_running = False
 
-    async def create(self) -> ResettableSession:
+    async def create(self) -> PooledSession:
         """Create or reuse a session."""
         if self._session is None:
-            browser = get_config("proxy.browser")
-            if browser:
-                self._session = ResettableSession(impersonate=browser)
-            else:
-                self._session = ResettableSession()
+            self._session = pooled_session(impersonate=get_config("proxy.browser"))
         return self._session
 
     async def close(self):
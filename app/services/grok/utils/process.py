@@ -4,12 +4,16 @@
 
 import asyncio
 import time
-from typing import Any, AsyncGenerator, Optional, AsyncIterable, List, TypeVar
+import uuid
+from typing import Any, AsyncGenerator, Optional, AsyncIterable, List, Tuple, TypeVar
+
+import orjson
 
 from app.core.config import get_config
 from app.core.logger import logger
 from app.core.exceptions import StreamIdleTimeoutError
 from app.services.grok.utils.download import DownloadService
+from app.services.reverse.utils.multiplex import is_http2_error
 
 
 T = TypeVar("T")
@@ -17,8 +21,7 @@ T = TypeVar("T")
 
 def _is_http2_error(e: Exception) -> bool:
     """检查是否为 HTTP/2 流错误"""
-    err_str = str(e).lower()
-    return "http/2" in err_str or "curl: (92)" in err_str or "stream" in err_str
+    return is_http2_error(e)
 
 
 def _normalize_line(line: Any) -> Optional[str]:
@@ -39,6 +42,46 @@ def _normalize_line(line: Any) -> Optional[str]:
     return text
 
 
+# 需要完整处理的响应字段，不含这些字段的 token 帧走快速路径
+RICH_FRAME_KEYS = frozenset(
+    (
+        "modelResponse",
+        "cardAttachment",
+        "streamingImageGenerationResponse",
+        "llmInfo",
+        "rolloutId",
+    )
+)
+
+
+def _parse_frame(line: Any) -> Optional[dict]:
+    """
+    解析上游 NDJSON 行，返回 result.response 对象（无法解析时返回 None）
+
+    上游逐行产出裸 JSON（bytes），直接交给 orjson，不做 str 解码与 strip；
+    仅在解析失败时回退到 _normalize_line 处理 SSE data 前缀、[DONE] 等格式。
+    """
+    try:
+        data = orjson.loads(line)
+    except (orjson.JSONDecodeError, TypeError):
+        text = _normalize_line(line)
+        if not text:
+            return None
+        try:
+            data = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return None
+    try:
+        return data["result"]["response"]
+    except (KeyError, TypeError):
+        return {}
+
+
+def _is_token_frame(resp: dict) -> bool:
+    """是否为纯 token 增量帧（只需读取 token/isThinking/responseId）"""
+    return "token" in resp and RICH_FRAME_KEYS.isdisjoint(resp)
+
+
 def _collect_images(obj: Any) -> List[str]:
     """递归收集响应中的图片 URL"""
     urls: List[str] = []
@@ -115,6 +158,87 @@ async def _with_idle_timeout(
             break
 
 
+# SSE 流结束标记
+SSE_DONE = b"data: [DONE]\n\n"
+_SSE_CONTENT_OPEN = b',"choices":[{"index":0,"delta":{"content":'
+_SSE_CONTENT_CLOSE = b'},"logprobs":null,"finish_reason":null}]}\n\n'
+
+
+class SSEChunkTemplate:
+    """
+    chat.completion.chunk 的预渲染模板
+
+    id/created/model/system_fingerprint 在一次响应内基本不变，其前缀字节只在
+    id 或指纹变化时重新渲染；content 增量块只需拼接 JSON 转义后的 content。
+    输出与整块 orjson 序列化逐字节一致。
+    """
+
+    def __init__(self, created: int, model: str):
+        self.created = created
+        self.model = model
+        # 上游尚未返回 responseId 时使用，整个响应内保持一致
+        self.fallback_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        self._key: Optional[tuple] = None
+        self._prefix = b""
+
+    def _head(self, chunk_id: Optional[str], fingerprint: Optional[str]) -> dict:
+        head = {
+            "id": chunk_id or self.fallback_id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+        }
+        # None 表示不输出 system_fingerprint 字段
+        if fingerprint is not None:
+            head["system_fingerprint"] = fingerprint
+        return head
+
+    def content(
+        self, chunk_id: Optional[str], content: str, fingerprint: Optional[str] = None
+    ) -> bytes:
+        """渲染 content 增量块"""
+        key = (chunk_id, fingerprint)
+        if key != self._key:
+            head = orjson.dumps(self._head(chunk_id, fingerprint))
+            self._prefix = b"data: " + head[:-1] + _SSE_CONTENT_OPEN
+            self._key = key
+        return self._prefix + orjson.dumps(content) + _SSE_CONTENT_CLOSE
+
+    def split_content(self, chunk: bytes) -> Optional[Tuple[bytes, bytes]]:
+        """
+        拆分刚由 content() 渲染的块为 (前缀, content 的 JSON 字符串字面量)
+
+        其他块（role、finish、[DONE] 或前缀已变化）返回 None。
+        """
+        prefix = self._prefix
+        if (
+            prefix
+            and chunk.startswith(prefix)
+            and chunk.endswith(_SSE_CONTENT_CLOSE)
+        ):
+            return prefix, chunk[len(prefix) : -len(_SSE_CONTENT_CLOSE)]
+        return None
+
+    @staticmethod
+    def join_content(prefix: bytes, parts: List[bytes]) -> bytes:
+        """把多个 content 字面量（已去掉两端引号）合并为一个 content 增量块"""
+        return prefix + b'"' + b"".join(parts) + b'"' + _SSE_CONTENT_CLOSE
+
+    def render(
+        self,
+        chunk_id: Optional[str],
+        delta: dict,
+        finish: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+    ) -> bytes:
+        """渲染任意块（role、finish 等低频块）"""
+        chunk = self._head(chunk_id, fingerprint)
+        chunk["choices"] = [
+            {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}
+        ]
+        return b"data: " + orjson.dumps(chunk) + b"\n\n"
+
+
 class BaseProcessor:
     """基础处理器"""
 
@@ -145,8 +269,13 @@ class BaseProcessor:
 
 __all__ = [
     "BaseProcessor",
+    "SSEChunkTemplate",
+    "SSE_DONE",
     "_with_idle_timeout",
     "_normalize_line",
+    "_parse_frame",
+    "_is_token_frame",
+    "RICH_FRAME_KEYS",
     "_collect_images",
     "_is_http2_error",
 ]
@@ -4,7 +4,7 @@ Retry helpers for token switching.
 
 from typing import Optional, Set
 
-from app.core.exceptions import UpstreamException
+from app.core.exceptions import AppException, ErrorType, UpstreamException
 from app.services.grok.services.model import ModelService
 
 
@@ -17,23 +17,31 @@ async def pick_token(
     if preferred and preferred not in tried:
         return preferred
 
-    token = None
-    for pool_name in ModelService.pool_candidates_for_model(model_id):
-        token = token_mgr.get_token(pool_name, exclude=tried)
-        if token:
-            break
+    pool_candidates = ModelService.pool_candidates_for_model(model_id)
+    token = await token_mgr.select_token(pool_candidates, exclude=tried)
+
+    if not token:
+        # 候选 Token 在途均已满时排队等待空闲名额
+        token = await token_mgr.wait_for_token(pool_candidates, exclude=tried)
 
     if not token and not tried:
-        result = await token_mgr.refresh_cooling_tokens()
-        if result.get("recovered", 0) > 0:
-            for pool_name in ModelService.pool_candidates_for_model(model_id):
-                token = token_mgr.get_token(pool_name)
-                if token:
-                    break
+        # 通知后台恢复泵，并在 token.pick_wait_ms 内等待冷却 Token 恢复
+        token = await token_mgr.wait_for_recovery(pool_candidates, exclude=tried)
 
     return token
 
 
+def no_available_token(token_mgr) -> AppException:
+    """无可用 Token 时的 429 错误，附带预计恢复时间的 Retry-After"""
+    return AppException(
+        message="No available tokens. Please try again later.",
+        error_type=ErrorType.RATE_LIMIT.value,
+        code="rate_limit_exceeded",
+        status_code=429,
+        headers={"Retry-After": str(token_mgr.retry_after_seconds())},
+    )
+
+
 def rate_limited(error: Exception) -> bool:
     if not isinstance(error, UpstreamException):
         return False
@@ -42,4 +50,4 @@ def rate_limited(error: Exception) -> bool:
     return status == 429 or code == "rate_limit_exceeded"
 
 
-__all__ = ["pick_token", "rate_limited"]
+__all__ = ["pick_token", "no_available_token", "rate_limited"]
@@ -2,15 +2,20 @@
 流式响应通用工具
 """
 
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
+from app.core.lifecycle import track_stream
 from app.core.logger import logger
 from app.services.grok.services.model import ModelService
-from app.services.token import EffortType
+from app.services.token import EffortType, TokenLease
 
 
 async def wrap_stream_with_usage(
-    stream: AsyncGenerator, token_mgr, token: str, model: str
+    stream: AsyncGenerator,
+    token_mgr,
+    token: str,
+    model: str,
+    lease: Optional[TokenLease] = None,
 ) -> AsyncGenerator:
     """
     包装流式响应，在完成时记录使用
@@ -20,27 +25,35 @@ async def wrap_stream_with_usage(
         token_mgr: TokenManager 实例
         token: Token 字符串
         model: 模型名称
+        lease: Token 租约；提供时以首包延迟作为延迟样本，并在流结束后释放
+
+    整个流（含用量记录）计入在途流数量，停机排空时等待其结束。
     """
-    success = False
-    try:
-        async for chunk in stream:
-            yield chunk
-        success = True
-    finally:
-        if success:
-            try:
-                model_info = ModelService.get(model)
-                effort = (
-                    EffortType.HIGH
-                    if (model_info and model_info.cost.value == "high")
-                    else EffortType.LOW
-                )
-                await token_mgr.consume(token, effort)
-                logger.debug(
-                    f"Stream completed, recorded usage for token {token[:10]}... (effort={effort.value})"
-                )
-            except Exception as e:
-                logger.warning(f"Failed to record stream usage: {e}")
+    async with track_stream():
+        success = False
+        try:
+            async for chunk in stream:
+                if lease is not None:
+                    lease.mark_first_byte()
+                yield chunk
+            success = True
+        finally:
+            if lease is not None:
+                lease.release(success=success)
+            if success:
+                try:
+                    model_info = ModelService.get(model)
+                    effort = (
+                        EffortType.HIGH
+                        if (model_info and model_info.cost.value == "high")
+                        else EffortType.LOW
+                    )
+                    await token_mgr.consume(token, effort)
+                    logger.debug(
+                        f"Stream completed, recorded usage for token {token[:10]}... (effort={effort.value})"
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to record stream usage: {e}")
 
 
 __all__ = ["wrap_stream_with_usage"]
@@ -0,0 +1,252 @@
+"""
+流式标签过滤
+
+由 app.filter_tags 构建一次多模式自动机（Aho-Corasick 结构的起始标记 trie），
+按流逐段输入，线性时间移除 <tag ...>...</tag> 与 <tag .../> 块：
+- 标签可跨 token 拆分，疑似标签前缀的尾部字符会暂缓输出
+- 块的替换文本由调用方决定（如工具卡片渲染为一行摘要），默认直接移除
+- 流式与非流式（整段内容一次输入）共用同一实现
+- 暂缓的块超过 max_block 字符仍未闭合时按原文放行，畸形卡片不会卡住整个流
+
+匹配语义与旧的逐标签正则（<tag[^>]*>.*?</tag>|<tag[^>]*/>）并不完全相同，
+差异见 TagFilter。
+"""
+
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 块替换回调: (tag, 完整块文本) -> 替换文本
+BlockReplacer = Callable[[str, str], str]
+
+_TEXT, _OPEN, _BLOCK = 0, 1, 2
+
+# 单个块最多暂缓的字符数
+DEFAULT_MAX_BLOCK_CHARS = 32 * 1024
+
+
+class TagAutomaton:
+    """
+    起始标记 "<tag" 的匹配自动机（只读，可被所有流共享）
+
+    所有模式都以 "<" 开头且标签名不含 "<"，失配时的失败转移都回到根或 "<" 节点，
+    因此扫描只需在 "<" 处进入 trie，其余文本直接跳过。
+    """
+
+    def __init__(self, tags: Iterable[str]):
+        self.tags: Tuple[str, ...] = tuple(t for t in tags if t)
+        # trie 节点: 转移表、命中的标签
+        self.goto: List[Dict[str, int]] = [{}]
+        self.match: List[Optional[str]] = [None]
+        for tag in self.tags:
+            node = 0
+            for ch in f"<{tag}":
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.match.append(None)
+                node = nxt
+            if self.match[node] is None:
+                self.match[node] = tag
+        self.close_tags: Dict[str, str] = {tag: f"</{tag}>" for tag in self.tags}
+        # "<" 之后的首字符 -> 候选 (模式, 标签)，短模式优先（与 trie 先命中的一致）
+        self.candidates: Dict[str, List[Tuple[str, str]]] = {}
+        for tag in sorted(set(self.tags), key=len):
+            self.candidates.setdefault(tag[0], []).append((f"<{tag}", tag))
+        self.max_len = max((len(tag) + 1 for tag in self.tags), default=0)
+
+    def __bool__(self) -> bool:
+        return bool(self.tags)
+
+
+@lru_cache(maxsize=16)
+def _build(tags: Tuple[str, ...]) -> TagAutomaton:
+    return TagAutomaton(tags)
+
+
+def get_tag_automaton(tags: Optional[Iterable[str]]) -> TagAutomaton:
+    """按标签列表获取（缓存的）自动机"""
+    return _build(tuple(tags or ()))
+
+
+class TagFilter:
+    """
+    单个流的过滤状态
+
+    feed() 返回可以立即输出的文本，finish() 返回流结束时剩余的文本
+    （未闭合的块与疑似前缀按原文输出）。未触发 max_block 时，无论输入如何分段，
+    输出都与整段一次输入 filter() 的结果相同。
+
+    与旧正则有意不同之处:
+    - 自闭合标签 <tag .../> 只移除其本身；正则会从它一直匹配到后面某个块的
+      </tag>，连同中间的正文一起删除
+    - 起始标记 <tag ...> 之后的内容都属于该块，直到出现 </tag>；始终未闭合时，
+      其后的块（包括自闭合标签）随原文一起输出，而正则会跳过未闭合的起始标记，
+      继续删除后面的块
+    - 块暂缓超过 max_block 字符仍未闭合时视为畸形，已暂缓的原文立即输出并回到
+      文本模式（之后才到达的 </tag> 作为正文输出），流不会停滞，内存占用也有上限；
+      放行的位置取决于分段方式，此时输出不保证与整段过滤相同
+    """
+
+    __slots__ = (
+        "_auto",
+        "_replace",
+        "_max_block",
+        "_mode",
+        "_node",
+        "_held",
+        "_tag",
+        "_raw",
+        "_scan_from",
+        "_last_char",
+    )
+
+    def __init__(
+        self,
+        automaton: TagAutomaton,
+        replace: Optional[BlockReplacer] = None,
+        max_block: int = DEFAULT_MAX_BLOCK_CHARS,
+    ):
+        self._auto = automaton
+        self._replace = replace
+        self._max_block = max_block
+        self._mode = _TEXT
+        # _TEXT: 当前 trie 节点与暂缓输出的前缀字符
+        self._node = 0
+        self._held = ""
+        # _OPEN/_BLOCK: 当前块的标签与原文
+        self._tag = ""
+        self._raw = ""
+        self._scan_from = 0
+        self._last_char = ""
+
+    def feed(self, text: str) -> str:
+        if not text:
+            return ""
+        if not self._auto:
+            return text
+        if self._mode == _TEXT and self._node == 0 and "<" not in text:
+            # 绝大多数 token: 不在块内且不含 "<"
+            self._last_char = text[-1]
+            return text
+        out: List[str] = []
+        goto = self._auto.goto
+        match = self._auto.match
+        i, n = 0, len(text)
+
+        while i < n:
+            if self._mode == _TEXT:
+                if self._node == 0:
+                    j = text.find("<", i)
+                    if j < 0:
+                        out.append(text[i:])
+                        break
+                    if j > i:
+                        out.append(text[i:j])
+                    i = j
+                    if i + self._auto.max_len <= n:
+                        # 余下文本足够长: 直接比较候选模式，不逐字符走 trie
+                        for pattern, tag in self._auto.candidates.get(text[i + 1], ()):
+                            if text.startswith(pattern, i):
+                                self._mode, self._tag, self._raw = _OPEN, tag, pattern
+                                i += len(pattern)
+                                break
+                        else:
+                            out.append("<")
+                            i += 1
+                        continue
+                ch = text[i]
+                nxt = goto[self._node].get(ch)
+                if nxt is None:
+                    # 失配: 暂缓的字符确定不是标签，"<" 需从根重新匹配
+                    out.append(self._held)
+                    self._held, self._node = "", 0
+                    if ch != "<":
+                        out.append(ch)
+                        i += 1
+                    continue
+                self._held += ch
+                self._node = nxt
+                i += 1
+                tag = match[nxt]
+                if tag is not None:
+                    self._mode, self._tag, self._raw = _OPEN, tag, self._held
+                    self._held, self._node = "", 0
+            elif self._mode == _OPEN:
+                j = text.find(">", i)
+                if j < 0:
+                    self._raw += text[i:]
+                    if len(self._raw) > self._max_block:
+                        self._release_block(out)
+                    break
+                self._raw += text[i : j + 1]
+                i = j + 1
+                if self._raw.endswith("/>"):
+                    self._close_block(self._raw, out)
+                else:
+                    self._mode = _BLOCK
+                    self._scan_from = len(self._raw)
+            else:
+                close = self._auto.close_tags[self._tag]
+                if self._scan_from < len(self._raw):
+                    # 结束标签可能跨越上一段末尾与本段开头
+                    window = self._raw[self._scan_from :] + text[i : i + len(close) - 1]
+                    k = window.find(close)
+                    if k >= 0:
+                        end = i + self._scan_from + k + len(close) - len(self._raw)
+                        self._close_block(self._raw + text[i:end], out)
+                        i = end
+                        continue
+                k = text.find(close, i)
+                if k < 0:
+                    self._raw += text[i:]
+                    self._scan_from = max(0, len(self._raw) - len(close) + 1)
+                    if len(self._raw) > self._max_block:
+                        self._release_block(out)
+                    break
+                end = k + len(close)
+                self._close_block(self._raw + text[i:end], out)
+                i = end
+
+        result = "".join(out)
+        if result:
+            self._last_char = result[-1]
+        return result
+
+    def _close_block(self, raw: str, out: List[str]):
+        tag = self._tag
+        self._mode, self._tag, self._raw, self._scan_from = _TEXT, "", "", 0
+        replacement = self._replace(tag, raw) if self._replace else ""
+        if not replacement:
+            return
+        last = next((part[-1] for part in reversed(out) if part), self._last_char)
+        if last and last != "\n":
+            # 替换文本单独成行
+            replacement = "\n" + replacement
+        out.append(replacement)
+
+    def _release_block(self, out: List[str]):
+        """块超过上限仍未闭合: 已暂缓的原文按原样输出，回到文本模式"""
+        out.append(self._raw)
+        self._mode, self._tag, self._raw, self._scan_from = _TEXT, "", "", 0
+
+    def finish(self) -> str:
+        """流结束，返回剩余原文"""
+        rest = self._held + self._raw
+        self._mode, self._node, self._held = _TEXT, 0, ""
+        self._tag, self._raw, self._scan_from = "", "", 0
+        return rest
+
+    def filter(self, text: str) -> str:
+        """整段过滤（非流式）"""
+        return self.feed(text) + self.finish()
+
+
+__all__ = [
+    "DEFAULT_MAX_BLOCK_CHARS",
+    "BlockReplacer",
+    "TagAutomaton",
+    "TagFilter",
+    "get_tag_automaton",
+]
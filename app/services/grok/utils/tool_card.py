@@ -0,0 +1,133 @@
+"""
+工具卡片 / 渲染卡片解析
+
+正则在模块加载时编译一次（下方模式注册表），不再在每次调用时按字符串查 re 缓存；
+工具卡片用 str.find 前向扫描一遍同时取出 tool_name 与 tool_args 并生成展示标签，
+常见的整段 CDATA 直接切片，只有不规则内容才回退到正则。
+"""
+
+import re
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import orjson
+
+
+# ========== 模式注册表 ==========
+
+CDATA_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.DOTALL)
+XML_TAG_RE = re.compile(r"<[^>]+>")
+ROLLOUT_ID_RE = re.compile(r"<rolloutId>(.*?)</rolloutId>", re.DOTALL)
+RENDER_CARD_RE = re.compile(
+    r'<grok:render[^>]*card_id="([^"]+)"[^>]*>.*?</grok:render>', re.DOTALL
+)
+
+# tool_name -> (标签, 依次尝试的参数字段)
+TOOL_LABELS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "web_search": ("WebSearch", ("query", "q")),
+    "search_images": ("SearchImage", ("image_description", "description", "query")),
+    "chatroom_send": ("AgentThink", ("message",)),
+}
+
+
+class ToolCard(NamedTuple):
+    """解析后的工具卡片"""
+
+    name: str
+    args: str
+    label: str
+    text: str
+    raw: str
+
+    @property
+    def line(self) -> str:
+        """单行摘要，无可用字段时退化为去标签的原文"""
+        if self.label and self.text:
+            return f"{self.label} {self.text}".strip()
+        if self.label:
+            return self.label
+        if self.text:
+            return self.text
+        return XML_TAG_RE.sub("", self.raw).strip()
+
+
+_NAME_OPEN, _NAME_CLOSE = "<xai:tool_name>", "</xai:tool_name>"
+_ARGS_OPEN, _ARGS_CLOSE = "<xai:tool_args>", "</xai:tool_args>"
+_CDATA_OPEN = "<![CDATA["
+_CDATA_CLOSE = "]]>"
+
+
+def _strip_cdata(value: str) -> str:
+    value = value.strip()
+    if _CDATA_OPEN not in value:
+        return value
+    # 常见形式: 整个值是单个 CDATA 段
+    if (
+        value.startswith(_CDATA_OPEN)
+        and value.find(_CDATA_CLOSE) == len(value) - len(_CDATA_CLOSE)
+    ):
+        return value[len(_CDATA_OPEN) : -len(_CDATA_CLOSE)].strip()
+    return CDATA_RE.sub(r"\1", value).strip()
+
+
+def _find_field(
+    raw: str, open_tag: str, close_tag: str, pos: int
+) -> Tuple[Optional[str], int, int]:
+    """返回 (字段内容, 起始标签位置, 结束标签之后的位置)，未找到时内容为 None"""
+    start = raw.find(open_tag, pos)
+    if start < 0:
+        return None, -1, -1
+    end = raw.find(close_tag, start + len(open_tag))
+    if end < 0:
+        return None, -1, -1
+    return raw[start + len(open_tag) : end], start, end + len(close_tag)
+
+
+def _scan_fields(raw: str) -> Tuple[str, str]:
+    """取 tool_name / tool_args；常见布局（name 在 args 之前）只需前向扫描一遍"""
+    name, name_start, name_end = _find_field(raw, _NAME_OPEN, _NAME_CLOSE, 0)
+    args_from = 0
+    if name is not None and raw.find(_ARGS_OPEN, 0, name_start) < 0:
+        args_from = name_end
+    args, _, _ = _find_field(raw, _ARGS_OPEN, _ARGS_CLOSE, args_from)
+    return name or "", args or ""
+
+
+def parse_tool_card(raw: str, rollout_id: str = "") -> ToolCard:
+    """单次扫描解析工具卡片"""
+    name, args = _scan_fields(raw)
+    name = _strip_cdata(name)
+    args = _strip_cdata(args)
+
+    label, text = name, args
+    spec = TOOL_LABELS.get(name)
+    if spec:
+        prefix = f"[{rollout_id}]" if rollout_id else ""
+        label = f"{prefix}[{spec[0]}]"
+        payload: Any = None
+        if args:
+            try:
+                payload = orjson.loads(args)
+            except orjson.JSONDecodeError:
+                payload = None
+        if isinstance(payload, dict):
+            text = next((payload[k] for k in spec[1] if payload.get(k)), "")
+    return ToolCard(name, args, label, text, raw)
+
+
+def extract_tool_text(raw: str, rollout_id: str = "") -> str:
+    """工具卡片的单行摘要"""
+    if not raw:
+        return ""
+    return parse_tool_card(raw, rollout_id).line
+
+
+__all__ = [
+    "CDATA_RE",
+    "RENDER_CARD_RE",
+    "ROLLOUT_ID_RE",
+    "TOOL_LABELS",
+    "ToolCard",
+    "XML_TAG_RE",
+    "extract_tool_text",
+    "parse_tool_card",
+]
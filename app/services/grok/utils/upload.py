@@ -19,7 +19,7 @@ from app.core.exceptions import AppException, UpstreamException, ValidationExcep
 from app.core.logger import logger
 from app.core.storage import DATA_DIR
 from app.services.reverse.assets_upload import AssetsUploadReverse
-from app.services.reverse.utils.session import ResettableSession
+from app.services.reverse.utils.session import PooledSession, pooled_session
 from app.services.grok.utils.locks import _get_upload_semaphore, _file_lock
 
 
@@ -27,17 +27,13 @@ class UploadService:
     """Assets upload service."""
 
     def __init__(self):
-        self._session: Optional[ResettableSession] = None
+        self._session: Optional[PooledSession] = None
         self._chunk_size = 64 * 1024
 
-    async def create(self) -> ResettableSession:
+    async def create(self) -> PooledSession:
         """Create or reuse a session."""
         if self._session is None:
-            browser = get_config("proxy.browser")
-            if browser:
-                self._session = ResettableSession(impersonate=browser)
-            else:
-                self._session = ResettableSession()
+            self._session = pooled_session(impersonate=get_config("proxy.browser"))
         return self._session
 
     async def close(self):
@@ -11,6 +11,7 @@ from app.core.config import get_config
 from app.core.exceptions import UpstreamException
 from app.services.token.service import TokenService
 from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.proxy_pool import get_proxy_pool
 from app.services.reverse.utils.retry import retry_on_status
 
 CHAT_API = "https://grok.com/rest/app-chat/conversations/new"
@@ -100,10 +101,6 @@ class AppChatReverse:
             Any: The response from the request.
         """
         try:
-            # Get proxies
-            base_proxy = get_config("proxy.base_proxy_url")
-            proxies = {"http": base_proxy, "https": base_proxy} if base_proxy else None
-
             # Build headers
             headers = build_headers(
                 cookie_token=token,
@@ -130,16 +127,27 @@ class AppChatReverse:
             )
             browser = get_config("proxy.browser")
 
+            # Multiplexed sessions are pinned to the egress of their connection
+            pinned_proxy = getattr(session, "pinned_proxy", None)
+            proxy_lease = None
+
             async def _do_request():
-                response = await session.post(
-                    CHAT_API,
-                    headers=headers,
-                    data=orjson.dumps(payload),
-                    timeout=timeout,
-                    stream=True,
-                    proxies=proxies,
-                    impersonate=browser,
-                )
+                nonlocal proxy_lease
+                proxy_lease = get_proxy_pool().pick(pinned_proxy)
+                try:
+                    response = await session.post(
+                        CHAT_API,
+                        headers=headers,
+                        data=orjson.dumps(payload),
+                        timeout=timeout,
+                        stream=True,
+                        proxies=proxy_lease.proxies,
+                        impersonate=browser,
+                    )
+                except Exception as e:
+                    proxy_lease.error(e)
+                    raise
+                proxy_lease.observe(response.status_code)
 
                 if response.status_code != 200:
 
@@ -179,6 +187,13 @@ class AppChatReverse:
                 try:
                     async for line in response.aiter_lines():
                         yield line
+                except Exception as e:
+                    report_error = getattr(session, "report_error", None)
+                    if report_error:
+                        report_error(e)
+                    if proxy_lease and proxy_lease.url:
+                        get_proxy_pool().report(proxy_lease.url, False, reason=str(e))
+                    raise
                 finally:
                     await session.close()
 
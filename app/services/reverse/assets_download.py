@@ -12,6 +12,7 @@ from app.core.config import get_config
 from app.core.exceptions import UpstreamException
 from app.services.token.service import TokenService
 from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.proxy_pool import get_proxy_pool
 from app.services.reverse.utils.retry import retry_on_status
 
 DOWNLOAD_API = "https://assets.grok.com"
@@ -47,13 +48,8 @@ class AssetsDownloadReverse:
                 file_path = f"/{file_path}"
             url = f"{DOWNLOAD_API}{file_path}"
 
-            # Get proxies
-            base_proxy = get_config("proxy.base_proxy_url")
+            # Get proxies (a dedicated asset proxy bypasses the pool)
             assert_proxy = get_config("proxy.asset_proxy_url")
-            if assert_proxy:
-                proxies = {"http": assert_proxy, "https": assert_proxy}
-            else:
-                proxies = {"http": base_proxy, "https": base_proxy}
 
             # Guess content type by extension for Accept/Sec-Fetch-Dest
             content_type = _CONTENT_TYPES.get(Path(urllib.parse.urlparse(file_path).path).suffix.lower())
@@ -78,15 +74,21 @@ class AssetsDownloadReverse:
             browser = get_config("proxy.browser")
 
             async def _do_request():
-                response = await session.get(
-                    url,
-                    headers=headers,
-                    proxies=proxies,
-                    timeout=timeout,
-                    allow_redirects=True,
-                    impersonate=browser,
-                    stream=True,
-                )
+                proxy_lease = get_proxy_pool().pick(assert_proxy or None)
+                try:
+                    response = await session.get(
+                        url,
+                        headers=headers,
+                        proxies=proxy_lease.proxies,
+                        timeout=timeout,
+                        allow_redirects=True,
+                        impersonate=browser,
+                        stream=True,
+                    )
+                except Exception as e:
+                    proxy_lease.error(e)
+                    raise
+                proxy_lease.observe(response.status_code)
 
                 if response.status_code != 200:
                     logger.error(
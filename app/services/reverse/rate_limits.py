@@ -10,6 +10,7 @@ from app.core.logger import logger
 from app.core.config import get_config
 from app.core.exceptions import UpstreamException
 from app.services.reverse.utils.headers import build_headers
+from app.services.reverse.utils.proxy_pool import get_proxy_pool
 from app.services.reverse.utils.retry import retry_on_status
 
 RATE_LIMITS_API = "https://grok.com/rest/rate-limits"
@@ -30,10 +31,6 @@ class RateLimitsReverse:
             Any: The response from the request.
         """
         try:
-            # Get proxies
-            base_proxy = get_config("proxy.base_proxy_url")
-            proxies = {"http": base_proxy, "https": base_proxy} if base_proxy else None
-
             # Build headers
             headers = build_headers(
                 cookie_token=token,
@@ -53,14 +50,20 @@ class RateLimitsReverse:
             browser = get_config("proxy.browser")
 
             async def _do_request():
-                response = await session.post(
-                    RATE_LIMITS_API,
-                    headers=headers,
-                    data=orjson.dumps(payload),
-                    timeout=timeout,
-                    proxies=proxies,
-                    impersonate=browser,
-                )
+                proxy_lease = get_proxy_pool().pick()
+                try:
+                    response = await session.post(
+                        RATE_LIMITS_API,
+                        headers=headers,
+                        data=orjson.dumps(payload),
+                        timeout=timeout,
+                        proxies=proxy_lease.proxies,
+                        impersonate=browser,
+                    )
+                except Exception as e:
+                    proxy_lease.error(e)
+                    raise
+                proxy_lease.observe(response.status_code)
 
                 if response.status_code != 200:
                     logger.error(
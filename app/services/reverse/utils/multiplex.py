@@ -0,0 +1,303 @@
+"""
+HTTP/2 multiplexed upstream sessions for long-lived chat streams.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from curl_cffi.const import CurlMOpt
+from curl_cffi.requests import AsyncSession
+
+from app.core.config import get_config
+from app.core.logger import logger
+from app.services.reverse.utils.proxy_pool import get_proxy_pool
+from app.services.reverse.utils.session import pooled_session
+
+
+DEFAULT_HTTP2_MAX_STREAMS = 100
+DEFAULT_HTTP2_MAX_CONNECTIONS = 8
+DEFAULT_HTTP2_IDLE_TIMEOUT_SEC = 60
+# libcurl CURLPIPE_MULTIPLEX
+CURLPIPE_MULTIPLEX = 2
+
+# (impersonate, proxy url)
+ChannelKey = Tuple[str, str]
+
+
+def is_http2_error(e: Exception) -> bool:
+    """Whether the error is an HTTP/2 stream / connection failure."""
+    err_str = str(e).lower()
+    return "http/2" in err_str or "curl: (92)" in err_str or "stream" in err_str
+
+
+def _config_int(key: str, default: int) -> int:
+    try:
+        return int(get_config(key, default))
+    except Exception:
+        return int(default)
+
+
+def _reset_status_codes() -> set:
+    codes = get_config("retry.reset_session_status_codes")
+    if codes is None:
+        codes = [403]
+    if isinstance(codes, int):
+        codes = [codes]
+    return {int(code) for code in codes or []}
+
+
+class Http2Channel:
+    """
+    One upstream HTTP/2 connection shared by many concurrent streams.
+
+    Backed by its own curl multi handle limited to a single connection per
+    host, so every transfer started on it is multiplexed as an HTTP/2 stream.
+    Concurrent streams belong to different accounts, so the session keeps no
+    cookie jar: each request carries only its own Cookie header, and
+    Set-Cookie responses are never replayed on other streams.
+    """
+
+    def __init__(self, key: ChannelKey, max_streams: int):
+        impersonate, _ = key
+        kwargs: Dict[str, Any] = {"max_clients": max_streams, "discard_cookies": True}
+        if impersonate:
+            kwargs["impersonate"] = impersonate
+        self.key = key
+        self.max_streams = max_streams
+        self.session = AsyncSession(**kwargs)
+        acurl = self.session.acurl
+        acurl.setopt(CurlMOpt.PIPELINING, CURLPIPE_MULTIPLEX)
+        acurl.setopt(CurlMOpt.MAX_HOST_CONNECTIONS, 1)
+        acurl.setopt(CurlMOpt.MAX_CONCURRENT_STREAMS, max_streams)
+        self.active = 0
+        self.retired = False
+        self.closed = False
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
+        self.streams_total = 0
+
+    @property
+    def available(self) -> bool:
+        return not self.retired and not self.closed and self.active < self.max_streams
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.session.close()
+        except Exception:
+            pass
+
+
+class MultiplexedSession:
+    """
+    Lease of one stream slot on an Http2Channel.
+
+    Same call surface as PooledSession. Closing the lease frees the slot; the
+    channel itself stays open for other streams. Connection-level failures
+    (HTTP/2 errors, reset status codes) retire the channel: in-flight streams
+    finish on it, new streams go to a fresh connection.
+    """
+
+    def __init__(self, client: "Http2Multiplexer", channel: Http2Channel):
+        self._client = client
+        self._channel: Optional[Http2Channel] = channel
+
+    async def _request(self, method: str, *args: Any, **kwargs: Any):
+        channel = self._channel
+        if channel is None:
+            raise RuntimeError("MultiplexedSession: session already released")
+        channel.last_used_at = time.monotonic()
+        try:
+            response = await getattr(channel.session, method)(*args, **kwargs)
+        except Exception as e:
+            self.report_error(e)
+            raise
+        if response.status_code in self._client.reset_status_codes:
+            self._client.retire(channel, f"status {response.status_code}")
+        return response
+
+    async def get(self, *args: Any, **kwargs: Any):
+        return await self._request("get", *args, **kwargs)
+
+    async def post(self, *args: Any, **kwargs: Any):
+        return await self._request("post", *args, **kwargs)
+
+    @property
+    def pinned_proxy(self) -> Optional[str]:
+        """Egress proxy of the underlying connection ("" for direct)."""
+        channel = self._channel
+        return channel.key[1] if channel is not None else None
+
+    def report_error(self, e: Exception) -> None:
+        """Rotate the connection when a stream fails at the HTTP/2 layer."""
+        if self._channel is not None and is_http2_error(e):
+            self._client.retire(self._channel, str(e))
+
+    async def reset(self) -> None:
+        if self._channel is not None:
+            self._client.retire(self._channel, "reset requested")
+
+    async def close(self) -> None:
+        channel, self._channel = self._channel, None
+        if channel is not None:
+            await self._client.release(channel)
+
+    async def __aenter__(self) -> "MultiplexedSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        channel = self.__dict__.get("_channel")
+        if channel is None:
+            raise AttributeError(name)
+        return getattr(channel.session, name)
+
+
+class Http2Multiplexer:
+    """
+    Process-wide HTTP/2 channel manager keyed by (impersonate, proxy url).
+
+    New streams go to the busiest channel that still has a free slot, which
+    packs streams onto few connections. A new channel is opened when all are
+    full, up to proxy.http2_max_connections per key; past that the least
+    loaded channel takes the stream and libcurl queues it until a slot frees.
+    """
+
+    def __init__(self):
+        self._channels: Dict[ChannelKey, List[Http2Channel]] = {}
+        self._closing: set = set()
+        self.reset_status_codes = _reset_status_codes()
+        self._rotations = 0
+
+    def acquire(
+        self, impersonate: Optional[str] = None, proxy: Optional[str] = None
+    ) -> MultiplexedSession:
+        impersonate = impersonate or get_config("proxy.browser") or ""
+        if proxy is None:
+            proxy = get_config("proxy.base_proxy_url") or ""
+        key: ChannelKey = (impersonate, proxy)
+        self.reset_status_codes = _reset_status_codes()
+
+        max_streams = max(1, _config_int("proxy.http2_max_streams", DEFAULT_HTTP2_MAX_STREAMS))
+        max_conns = max(
+            1, _config_int("proxy.http2_max_connections", DEFAULT_HTTP2_MAX_CONNECTIONS)
+        )
+        channels = self._channels.setdefault(key, [])
+        self._evict(channels)
+
+        candidates = [ch for ch in channels if ch.available]
+        if candidates:
+            channel = max(candidates, key=lambda ch: ch.active)
+        elif len(channels) < max_conns:
+            channel = Http2Channel(key, max_streams)
+            channels.append(channel)
+        else:
+            channel = min(channels, key=lambda ch: ch.active)
+
+        channel.active += 1
+        channel.streams_total += 1
+        channel.last_used_at = time.monotonic()
+        return MultiplexedSession(self, channel)
+
+    async def release(self, channel: Http2Channel) -> None:
+        channel.active = max(0, channel.active - 1)
+        channel.last_used_at = time.monotonic()
+        if channel.retired and channel.active == 0:
+            await channel.close()
+
+    def retire(self, channel: Http2Channel, reason: str) -> None:
+        """Stop routing new streams to the channel; close it once drained."""
+        if channel.retired:
+            return
+        channel.retired = True
+        self._rotations += 1
+        self._drop(channel)
+        logger.warning(
+            f"HTTP/2 upstream connection rotated ({channel.active} active): {reason}"
+        )
+        if channel.active == 0:
+            self._close_later(channel)
+
+    def _drop(self, channel: Http2Channel) -> None:
+        channels = self._channels.get(channel.key)
+        if channels and channel in channels:
+            channels.remove(channel)
+            if not channels:
+                del self._channels[channel.key]
+
+    def _close_later(self, channel: Http2Channel) -> None:
+        try:
+            task = asyncio.get_running_loop().create_task(channel.close())
+        except RuntimeError:
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _evict(self, channels: List[Http2Channel]) -> None:
+        idle = _config_int("proxy.http2_idle_timeout_sec", DEFAULT_HTTP2_IDLE_TIMEOUT_SEC)
+        if idle <= 0:
+            return
+        now = time.monotonic()
+        for channel in list(channels):
+            if channel.active == 0 and now - channel.last_used_at > idle:
+                channels.remove(channel)
+                self._close_later(channel)
+
+    async def close(self) -> None:
+        channels, self._channels = self._channels, {}
+        for bucket in channels.values():
+            for channel in bucket:
+                await channel.close()
+
+    def stats(self) -> Dict[str, Any]:
+        channels = [ch for bucket in self._channels.values() for ch in bucket]
+        return {
+            "connections": len(channels),
+            "active_streams": sum(ch.active for ch in channels),
+            "rotations": self._rotations,
+        }
+
+
+_multiplexer: Optional[Http2Multiplexer] = None
+
+
+def get_multiplexer() -> Http2Multiplexer:
+    global _multiplexer
+    if _multiplexer is None:
+        _multiplexer = Http2Multiplexer()
+    return _multiplexer
+
+
+def stream_session(impersonate: Optional[str] = None):
+    """
+    Session for a long-lived upstream stream.
+
+    Uses a multiplexed HTTP/2 slot when proxy.http2_multiplex is enabled,
+    otherwise an exclusive lease from the session pool.
+    """
+    if get_config("proxy.http2_multiplex", False):
+        proxy = get_proxy_pool().pick().url or ""
+        return get_multiplexer().acquire(impersonate, proxy)
+    return pooled_session(impersonate=impersonate)
+
+
+async def close_multiplexer() -> None:
+    global _multiplexer
+    if _multiplexer is not None:
+        await _multiplexer.close()
+        _multiplexer = None
+
+
+__all__ = [
+    "Http2Multiplexer",
+    "MultiplexedSession",
+    "close_multiplexer",
+    "get_multiplexer",
+    "is_http2_error",
+    "stream_session",
+]
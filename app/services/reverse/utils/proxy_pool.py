@@ -0,0 +1,303 @@
+"""
+Egress proxy pool with health scoring and circuit breaking.
+"""
+
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from app.core.config import get_config
+from app.core.logger import logger
+
+
+DEFAULT_POOL_FAILURE_THRESHOLD = 5
+DEFAULT_POOL_OPEN_SEC = 30
+# Repeated trips double the open period up to this cap (seconds)
+POOL_OPEN_MAX_SEC = 300
+# EWMA smoothing for success rate and latency
+POOL_EWMA_ALPHA = 0.1
+# Latency at which a proxy's score is halved (ms)
+POOL_LATENCY_REF_MS = 1000.0
+
+
+def _config_number(key: str, default: float) -> float:
+    try:
+        return float(get_config(key, default))
+    except Exception:
+        return float(default)
+
+
+def mask_proxy(url: str) -> str:
+    """Hide credentials in a proxy URL for logging."""
+    parsed = urlparse(url)
+    if parsed.username or parsed.password:
+        host = parsed.hostname or ""
+        if parsed.port:
+            host = f"{host}:{parsed.port}"
+        return f"{parsed.scheme}://***@{host}"
+    return url
+
+
+def _parse_entries(raw: Any) -> List[Tuple[str, float]]:
+    """Parse proxy.pool_urls: ["http://a:1", {url = "http://b:2", weight = 3}]."""
+    if isinstance(raw, str):
+        raw = [item.strip() for item in raw.split(",")]
+    entries: List[Tuple[str, float]] = []
+    for item in raw or []:
+        url, weight = None, 1.0
+        if isinstance(item, str):
+            url = item.strip()
+        elif isinstance(item, dict):
+            url = str(item.get("url") or "").strip()
+            try:
+                weight = float(item.get("weight", 1))
+            except (TypeError, ValueError):
+                weight = 1.0
+        if url and weight > 0:
+            entries.append((url, weight))
+    return entries
+
+
+class ProxyState:
+    """Health state of one egress proxy."""
+
+    __slots__ = (
+        "url",
+        "weight",
+        "success_rate",
+        "latency_ms",
+        "successes",
+        "failures",
+        "consecutive_failures",
+        "trips",
+        "open_until",
+        "probing",
+        "last_error",
+    )
+
+    def __init__(self, url: str, weight: float = 1.0):
+        self.url = url
+        self.weight = weight
+        self.success_rate = 1.0
+        self.latency_ms = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.trips = 0
+        # 0: closed; > now: open; <= now with trips: half-open
+        self.open_until = 0.0
+        # A half-open trial request is in flight
+        self.probing = False
+        self.last_error: Optional[str] = None
+
+    def score(self) -> float:
+        return (
+            self.weight
+            * max(self.success_rate, 0.01)
+            / (1.0 + self.latency_ms / POOL_LATENCY_REF_MS)
+        )
+
+    def state(self, now: float) -> str:
+        if self.open_until > now:
+            return "open"
+        if self.trips and self.consecutive_failures:
+            return "half_open"
+        return "closed"
+
+
+class ProxyLease:
+    """
+    One request's use of a proxy; feed the outcome back with observe()/error().
+    """
+
+    __slots__ = ("_pool", "url", "started_at", "_done")
+
+    def __init__(self, pool: "ProxyPool", url: Optional[str]):
+        self._pool = pool
+        self.url = url
+        self.started_at = time.monotonic()
+        self._done = False
+
+    @property
+    def proxies(self) -> Optional[Dict[str, str]]:
+        if not self.url:
+            return None
+        return {"http": self.url, "https": self.url}
+
+    def observe(self, status_code: int) -> None:
+        """
+        Record an HTTP status.
+
+        403 and 5xx count against the proxy (blocked / unhealthy egress);
+        401/429 and other 4xx are token or request problems and are ignored.
+        """
+        if status_code == 403 or status_code >= 500:
+            self._report(False, f"status {status_code}")
+        elif status_code < 400:
+            self._report(True)
+
+    def success(self) -> None:
+        self._report(True)
+
+    def error(self, e: BaseException) -> None:
+        """Record a transport-level failure."""
+        self._report(False, str(e) or type(e).__name__)
+
+    def _report(self, ok: bool, reason: Optional[str] = None) -> None:
+        if self._done or not self.url:
+            return
+        self._done = True
+        latency_ms = (time.monotonic() - self.started_at) * 1000
+        self._pool.report(self.url, ok, latency_ms if ok else None, reason)
+
+
+class ProxyPool:
+    """
+    Weighted egress proxy selection.
+
+    Proxies come from proxy.pool_urls (falling back to proxy.base_proxy_url).
+    Each pick is a weighted random choice over healthy proxies, scored by
+    weight x success-rate EWMA / latency. After proxy.pool_failure_threshold
+    consecutive failures a proxy's circuit opens for proxy.pool_open_sec
+    (doubling on repeated trips); once it elapses one trial request is let
+    through, and its outcome closes or reopens the circuit. When every circuit
+    is open the proxy closest to recovery is used rather than failing outright.
+    """
+
+    def __init__(self):
+        self._proxies: Dict[str, ProxyState] = {}
+        self._signature: Any = None
+
+    def _sync_config(self) -> List[ProxyState]:
+        raw = get_config("proxy.pool_urls")
+        base = get_config("proxy.base_proxy_url") or ""
+        signature = (repr(raw), base)
+        if signature != self._signature:
+            entries = _parse_entries(raw)
+            if not entries and base:
+                entries = [(base, 1.0)]
+            proxies = {}
+            for url, weight in entries:
+                state = self._proxies.get(url) or ProxyState(url)
+                state.weight = weight
+                proxies[url] = state
+            self._proxies = proxies
+            self._signature = signature
+        return list(self._proxies.values())
+
+    def pick(self, url: Optional[str] = None) -> ProxyLease:
+        """
+        Lease a proxy for one request.
+
+        Args:
+            url: use this proxy instead of selecting one ("" for a direct
+                connection), e.g. when the session is pinned to an egress.
+        """
+        proxies = self._sync_config()
+        if url is not None:
+            return ProxyLease(self, url or None)
+        if not proxies:
+            return ProxyLease(self, None)
+        if len(proxies) == 1:
+            return ProxyLease(self, proxies[0].url)
+
+        now = time.monotonic()
+        candidates = [p for p in proxies if p.open_until <= now]
+        if not candidates:
+            return ProxyLease(self, min(proxies, key=lambda p: p.open_until).url)
+
+        chosen = random.choices(candidates, weights=[p.score() for p in candidates])[0]
+        if chosen.state(now) == "half_open":
+            # Let a single trial through; hold the circuit open until it reports
+            chosen.probing = True
+            chosen.open_until = now + self._open_period(chosen)
+        return ProxyLease(self, chosen.url)
+
+    @staticmethod
+    def _open_period(state: ProxyState) -> float:
+        base = _config_number("proxy.pool_open_sec", DEFAULT_POOL_OPEN_SEC)
+        return min(POOL_OPEN_MAX_SEC, base * (2 ** max(0, state.trips - 1)))
+
+    def report(
+        self,
+        url: str,
+        ok: bool,
+        latency_ms: Optional[float] = None,
+        reason: Optional[str] = None,
+    ) -> None:
+        state = self._proxies.get(url)
+        if state is None:
+            return
+        state.success_rate += POOL_EWMA_ALPHA * ((1.0 if ok else 0.0) - state.success_rate)
+        if ok:
+            state.successes += 1
+            state.consecutive_failures = 0
+            if latency_ms is not None:
+                state.latency_ms = (
+                    latency_ms
+                    if state.successes == 1
+                    else state.latency_ms + POOL_EWMA_ALPHA * (latency_ms - state.latency_ms)
+                )
+            if state.trips:
+                logger.info(f"Proxy pool: {mask_proxy(url)} recovered")
+            state.trips = 0
+            state.open_until = 0.0
+            state.probing = False
+            return
+
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.last_error = reason
+        threshold = int(
+            _config_number("proxy.pool_failure_threshold", DEFAULT_POOL_FAILURE_THRESHOLD)
+        )
+        now = time.monotonic()
+        if state.probing:
+            # Half-open trial failed
+            state.probing = False
+        elif state.open_until > now:
+            # Stragglers from before the trip do not extend it
+            return
+        elif state.consecutive_failures < max(1, threshold):
+            return
+        state.trips += 1
+        period = self._open_period(state)
+        state.open_until = now + period
+        logger.warning(
+            f"Proxy pool: {mask_proxy(url)} circuit open for {period:.0f}s "
+            f"({state.consecutive_failures} consecutive failures, last: {reason})"
+        )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        self._sync_config()
+        return [
+            {
+                "url": state.url,
+                "weight": state.weight,
+                "state": state.state(now),
+                "score": round(state.score(), 4),
+                "success_rate": round(state.success_rate, 4),
+                "latency_ms": round(state.latency_ms, 1),
+                "successes": state.successes,
+                "failures": state.failures,
+                "consecutive_failures": state.consecutive_failures,
+                "open_for_sec": round(max(0.0, state.open_until - now), 1),
+                "last_error": state.last_error,
+            }
+            for state in self._proxies.values()
+        ]
+
+
+_proxy_pool: Optional[ProxyPool] = None
+
+
+def get_proxy_pool() -> ProxyPool:
+    global _proxy_pool
+    if _proxy_pool is None:
+        _proxy_pool = ProxyPool()
+    return _proxy_pool
+
+
+__all__ = ["ProxyPool", "ProxyLease", "get_proxy_pool", "mask_proxy"]
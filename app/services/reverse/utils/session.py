@@ -1,9 +1,11 @@
 """
-Resettable session wrapper for reverse requests.
+Resettable session wrapper and process-wide session pool for reverse requests.
 """
 
 import asyncio
-from typing import Any, Iterable, Optional
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
 
 from curl_cffi.requests import AsyncSession
 
@@ -36,6 +38,8 @@ class ResettableSession:
         self._reset_requested = False
         self._reset_lock = asyncio.Lock()
         self._session = AsyncSession(**self._session_kwargs)
+        self.created_at = time.monotonic()
+        self.last_used_at = self.created_at
 
     async def _maybe_reset(self) -> None:
         if not self._reset_requested:
@@ -54,6 +58,7 @@ class ResettableSession:
 
     async def _request(self, method: str, *args: Any, **kwargs: Any):
         await self._maybe_reset()
+        self.last_used_at = time.monotonic()
         response = await getattr(self._session, method)(*args, **kwargs)
         if self._reset_on_status and response.status_code in self._reset_on_status:
             self._reset_requested = True
@@ -69,6 +74,14 @@ class ResettableSession:
         self._reset_requested = True
         await self._maybe_reset()
 
+    @property
+    def closed(self) -> bool:
+        return self._session is None or bool(getattr(self._session, "_closed", False))
+
+    @property
+    def reset_requested(self) -> bool:
+        return self._reset_requested
+
     async def close(self) -> None:
         if self._session is None:
             return
@@ -88,4 +101,282 @@ class ResettableSession:
         return getattr(self._session, name)
 
 
-__all__ = ["ResettableSession"]
+DEFAULT_SESSION_POOL_SIZE = 16
+DEFAULT_SESSION_IDLE_TIMEOUT_SEC = 60
+DEFAULT_SESSION_MAX_AGE_SEC = 600
+# Grace period for a finished stream's transfer task to settle on release
+STREAM_SETTLE_SEC = 0.05
+
+# (impersonate, proxy url)
+PoolKey = Tuple[str, str]
+
+
+def _config_number(key: str, default: float) -> float:
+    try:
+        return float(get_config(key, default))
+    except Exception:
+        return float(default)
+
+
+class PooledSession:
+    """
+    Exclusive lease of a pooled ResettableSession.
+
+    Drop-in for ResettableSession at call sites: close() (or leaving the
+    context manager) hands the session back to the pool instead of tearing
+    down its connections. The session is discarded instead when it is no
+    longer safe to share: a reset status was seen, a transport error was
+    raised, or a streamed response was abandoned before it finished.
+    """
+
+    def __init__(self, pool: "SessionPool", key: PoolKey, session: ResettableSession):
+        self._pool = pool
+        self._key = key
+        self._inner: Optional[ResettableSession] = session
+        self._broken = False
+        self._streams: List[Any] = []
+
+    async def _request(self, method: str, *args: Any, **kwargs: Any):
+        if self._inner is None:
+            raise RuntimeError("PooledSession: session already released")
+        try:
+            response = await getattr(self._inner, method)(*args, **kwargs)
+        except BaseException:
+            # Transport errors and cancellation can leave connections half-used
+            self._broken = True
+            raise
+        if kwargs.get("stream"):
+            self._streams.append(response)
+        return response
+
+    async def get(self, *args: Any, **kwargs: Any):
+        return await self._request("get", *args, **kwargs)
+
+    async def post(self, *args: Any, **kwargs: Any):
+        return await self._request("post", *args, **kwargs)
+
+    async def reset(self) -> None:
+        if self._inner is not None:
+            await self._inner.reset()
+
+    def report_error(self, e: Exception) -> None:
+        """A streamed response failed mid-transfer; do not reuse the session."""
+        self._broken = True
+
+    def _reusable(self, session: ResettableSession) -> bool:
+        if self._broken or session.closed or session.reset_requested:
+            return False
+        for response in self._streams:
+            task = getattr(response, "astream_task", None)
+            if task is not None and not task.done():
+                return False
+        return True
+
+    async def close(self) -> None:
+        session, self._inner = self._inner, None
+        if session is None:
+            return
+        pending = [
+            task
+            for task in (getattr(r, "astream_task", None) for r in self._streams)
+            if task is not None and not task.done()
+        ]
+        if pending and not self._broken:
+            await asyncio.wait(pending, timeout=STREAM_SETTLE_SEC)
+        reusable = self._reusable(session)
+        self._streams = []
+        await self._pool.release(self._key, session, reusable)
+
+    async def __aenter__(self) -> "PooledSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            self._broken = True
+        await self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        inner = self.__dict__.get("_inner")
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+
+class SessionPool:
+    """
+    Process-wide pool of ResettableSession keyed by (impersonate, proxy url).
+
+    Each lease is exclusive, so a reset triggered by one request never tears
+    down another request's in-flight stream. Idle sessions keep their TLS and
+    HTTP/2 connections warm; at most proxy.session_pool_size idle sessions are
+    kept per key, and sessions idle longer than proxy.session_idle_timeout_sec
+    or older than proxy.session_max_age_sec are closed.
+    """
+
+    def __init__(self):
+        self._idle: Dict[PoolKey, Deque[ResettableSession]] = {}
+        self._leased = 0
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+        self._closing: set = set()
+
+    @staticmethod
+    def _limits() -> Tuple[int, float, float]:
+        size = int(_config_number("proxy.session_pool_size", DEFAULT_SESSION_POOL_SIZE))
+        idle = _config_number(
+            "proxy.session_idle_timeout_sec", DEFAULT_SESSION_IDLE_TIMEOUT_SEC
+        )
+        max_age = _config_number("proxy.session_max_age_sec", DEFAULT_SESSION_MAX_AGE_SEC)
+        return max(0, size), idle, max_age
+
+    @staticmethod
+    def _expired(session: ResettableSession, now: float, idle: float, max_age: float) -> bool:
+        if session.closed or session.reset_requested:
+            return True
+        if idle > 0 and now - session.last_used_at > idle:
+            return True
+        return max_age > 0 and now - session.created_at > max_age
+
+    def acquire(
+        self, impersonate: Optional[str] = None, proxy: Optional[str] = None
+    ) -> PooledSession:
+        """Lease a session; reuses a healthy idle one when available."""
+        impersonate = impersonate or get_config("proxy.browser") or ""
+        if proxy is None:
+            proxy = get_config("proxy.base_proxy_url") or ""
+        key: PoolKey = (impersonate, proxy)
+
+        _, idle, max_age = self._limits()
+        now = time.monotonic()
+        bucket = self._idle.get(key)
+        session = None
+        while bucket:
+            candidate = bucket.pop()
+            if self._expired(candidate, now, idle, max_age):
+                self._discard(candidate)
+                continue
+            session = candidate
+            self._reused += 1
+            break
+
+        if session is None:
+            if impersonate:
+                session = ResettableSession(impersonate=impersonate)
+            else:
+                session = ResettableSession()
+            self._created += 1
+
+        self._leased += 1
+        return PooledSession(self, key, session)
+
+    async def release(
+        self, key: PoolKey, session: ResettableSession, reusable: bool = True
+    ) -> None:
+        self._leased = max(0, self._leased - 1)
+        size, idle, max_age = self._limits()
+        now = time.monotonic()
+        bucket = self._idle.setdefault(key, deque())
+        if (
+            not reusable
+            or size == 0
+            or len(bucket) >= size
+            or self._expired(session, now, idle, max_age)
+        ):
+            self._discarded += 1
+            await session.close()
+        elif not self._clear_cookies(session):
+            self._discarded += 1
+            await session.close()
+        else:
+            session.last_used_at = now
+            bucket.append(session)
+        self._evict_idle(now, idle, max_age)
+
+    @staticmethod
+    def _clear_cookies(session: ResettableSession) -> bool:
+        """
+        Empty the cookie jar before the session is shared again.
+
+        Each lease sends a different account's Cookie header; Set-Cookie
+        responses (sso, __cf_bm, ...) would otherwise be replayed on the next
+        lease and link accounts together.
+        """
+        try:
+            session.cookies.clear()
+        except Exception as e:
+            logger.debug(f"SessionPool: failed to clear cookies: {e}")
+            return False
+        return True
+
+    def _discard(self, session: ResettableSession) -> None:
+        self._discarded += 1
+        try:
+            task = asyncio.get_running_loop().create_task(session.close())
+        except RuntimeError:
+            return
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    def _evict_idle(self, now: float, idle: float, max_age: float) -> None:
+        """Close expired sessions; the oldest ones sit at the left of each bucket."""
+        for key in list(self._idle):
+            bucket = self._idle[key]
+            while bucket and self._expired(bucket[0], now, idle, max_age):
+                self._discard(bucket.popleft())
+            if not bucket:
+                del self._idle[key]
+
+    async def close(self) -> None:
+        """Close all idle sessions (leased sessions close on release)."""
+        idle, self._idle = self._idle, {}
+        for bucket in idle.values():
+            for session in bucket:
+                try:
+                    await session.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "idle": sum(len(bucket) for bucket in self._idle.values()),
+            "keys": len(self._idle),
+            "leased": self._leased,
+            "created": self._created,
+            "reused": self._reused,
+            "discarded": self._discarded,
+        }
+
+
+_session_pool: Optional[SessionPool] = None
+
+
+def get_session_pool() -> SessionPool:
+    global _session_pool
+    if _session_pool is None:
+        _session_pool = SessionPool()
+    return _session_pool
+
+
+def pooled_session(
+    impersonate: Optional[str] = None, proxy: Optional[str] = None
+) -> PooledSession:
+    """Lease a session from the process-wide pool."""
+    return get_session_pool().acquire(impersonate, proxy)
+
+
+async def close_session_pool() -> None:
+    global _session_pool
+    if _session_pool is not None:
+        await _session_pool.close()
+        _session_pool = None
+
+
+__all__ = [
+    "ResettableSession",
+    "PooledSession",
+    "SessionPool",
+    "get_session_pool",
+    "pooled_session",
+    "close_session_pool",
+]
@@ -11,6 +11,7 @@ from urllib.parse import urlparse
 
 from app.core.logger import logger
 from app.core.config import get_config
+from app.services.reverse.utils.proxy_pool import get_proxy_pool
 
 
 def _default_ssl_context() -> ssl.SSLContext:
@@ -111,8 +112,9 @@ class WebSocketClient:
         Returns:
             WebSocketConnection: The WebSocket connection.
         """
-        # Resolve proxy dynamically from config if not overridden
-        proxy_url = self._proxy_override or get_config("proxy.base_proxy_url")
+        # Resolve proxy: explicit override, otherwise pick from the proxy pool
+        proxy_lease = get_proxy_pool().pick(self._proxy_override or None)
+        proxy_url = proxy_lease.url
         connector, resolved_proxy = resolve_proxy(proxy_url, self._ssl_context)
         logger.debug(f"WebSocket connect: proxy_url={proxy_url}, resolved_proxy={resolved_proxy}, connector={type(connector).__name__}")
 
@@ -136,8 +138,14 @@ class WebSocketClient:
                 ssl=self._ssl_context,
                 **extra_kwargs,
             )
+            proxy_lease.success()
             return WebSocketConnection(session, ws)
-        except Exception:
+        except aiohttp.WSServerHandshakeError as e:
+            proxy_lease.observe(e.status)
+            await session.close()
+            raise
+        except Exception as e:
+            proxy_lease.error(e)
             await session.close()
             raise
 
@@ -2,6 +2,7 @@
 
 from app.services.token.models import (
     TokenInfo,
+    TokenRecord,
     TokenStatus,
     TokenPoolStats,
     EffortType,
@@ -10,6 +11,7 @@ from app.services.token.models import (
     EFFORT_COST,
 )
 from app.services.token.pool import TokenPool
+from app.services.token.load import TokenLease, TokenLoadTracker
 from app.services.token.manager import TokenManager, get_token_manager
 from app.services.token.service import TokenService
 from app.services.token.scheduler import TokenRefreshScheduler, get_scheduler
@@ -17,6 +19,7 @@ from app.services.token.scheduler import TokenRefreshScheduler, get_scheduler
 __all__ = [
     # Models
     "TokenInfo",
+    "TokenRecord",
     "TokenStatus",
     "TokenPoolStats",
     "EffortType",
@@ -25,6 +28,8 @@ __all__ = [
     "EFFORT_COST",
     # Core
     "TokenPool",
+    "TokenLoadTracker",
+    "TokenLease",
     "TokenManager",
     # API
     "TokenService",
@@ -0,0 +1,118 @@
+"""Token 冷却恢复调度（按预计恢复时间排序的最小堆）"""
+
+import heapq
+import itertools
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# rate-limits 响应中表示恢复等待时间的字段（按优先级）
+RECOVERY_DELAY_FIELDS = ("waitTimeSeconds", "resetSeconds", "windowSizeSeconds")
+# 按 effort 细分的限额字段
+EFFORT_LIMIT_FIELDS = ("lowEffortRateLimits", "highEffortRateLimits")
+
+
+def _positive_seconds(value: Any) -> Optional[float]:
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if seconds > 0 else None
+
+
+def recovery_delay(data: Optional[Dict[str, Any]]) -> Optional[float]:
+    """
+    从 rate-limits 响应中解析预计恢复时间（秒）
+
+    优先使用顶层字段；缺失时取按 effort 细分的限额中最早的恢复时间。
+    无法解析时返回 None。
+    """
+    if not isinstance(data, dict):
+        return None
+
+    for field in RECOVERY_DELAY_FIELDS:
+        seconds = _positive_seconds(data.get(field))
+        if seconds is not None:
+            return seconds
+
+    candidates = []
+    for key in EFFORT_LIMIT_FIELDS:
+        sub = data.get(key)
+        if not isinstance(sub, dict):
+            continue
+        for field in RECOVERY_DELAY_FIELDS:
+            seconds = _positive_seconds(sub.get(field))
+            if seconds is not None:
+                candidates.append(seconds)
+                break
+    return min(candidates) if candidates else None
+
+
+class CooldownSchedule:
+    """
+    冷却 Token 的恢复时间表
+
+    最小堆按预计恢复时间（epoch 秒）排序，重新调度时旧条目惰性失效，
+    调度器只需查看堆顶即可得知下一次需要刷新的时间，无需扫描全池。
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def schedule(self, token: str, due_at: float):
+        """设置（或覆盖）Token 的预计恢复时间"""
+        self._due[token] = due_at
+        heapq.heappush(self._heap, (due_at, next(self._seq), token))
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._compact()
+
+    def cancel(self, token: str):
+        self._due.pop(token, None)
+
+    def due_at(self, token: str) -> Optional[float]:
+        return self._due.get(token)
+
+    def next_due(self) -> Optional[float]:
+        """最早的预计恢复时间，没有冷却 Token 时返回 None"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        """弹出所有已到期的 Token"""
+        tokens = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, token = heapq.heappop(self._heap)
+            del self._due[token]
+            tokens.append(token)
+        return tokens
+
+    def clear(self):
+        self._heap = []
+        self._due = {}
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap:
+            due_at, _, token = heap[0]
+            if self._due.get(token) == due_at:
+                return
+            heapq.heappop(heap)
+
+    def _compact(self):
+        self._heap = [
+            entry for entry in self._heap if self._due.get(entry[2]) == entry[0]
+        ]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._due
+
+
+__all__ = ["CooldownSchedule", "recovery_delay"]
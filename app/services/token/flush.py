@@ -0,0 +1,368 @@
+"""Token 持久化写后合并引擎（合并 state/usage 变更、批量写入、失败退避、指标）"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from app.core.config import get_config
+from app.core.logger import logger
+from app.core.storage import get_storage
+
+
+DEFAULT_SAVE_DELAY_MS = 500
+DEFAULT_USAGE_FLUSH_INTERVAL_SEC = 5
+DEFAULT_FLUSH_BATCH_SIZE = 1000
+# 写入失败后的退避（秒）
+FLUSH_BACKOFF_BASE_SEC = 1.0
+FLUSH_BACKOFF_MAX_SEC = 30.0
+# 存储锁等待时间（秒）
+FLUSH_LOCK_TIMEOUT_SEC = 10
+# 刷新耗时 EWMA 平滑系数
+FLUSH_LATENCY_EWMA_ALPHA = 0.2
+
+# 构建写入负载: (token_key, pool_name, change_kind, fields) -> dict 或 None（Token 已不存在）
+# fields 为 None 时写入完整记录，否则只写入其中的字段
+PayloadBuilder = Callable[
+    [str, str, str, Optional[FrozenSet[str]]], Optional[Dict[str, Any]]
+]
+# (pool_name, change_kind, seq, fields)
+DirtyEntry = Tuple[str, str, int, Optional[FrozenSet[str]]]
+
+
+def _merge_fields(
+    a: Optional[FrozenSet[str]], b: Optional[FrozenSet[str]]
+) -> Optional[FrozenSet[str]]:
+    """合并两次登记的字段范围，任一方为完整写入时结果为完整写入"""
+    if a is None or b is None:
+        return None
+    return a | b
+
+
+def _config_float(key: str, default: float) -> float:
+    try:
+        return float(get_config(key, default))
+    except Exception:
+        return float(default)
+
+
+class TokenFlushEngine:
+    """
+    Token 变更的写后合并引擎
+
+    变更先登记为脏数据（同一 Token 多次变更合并为一条，state 优先于 usage），
+    由单个后台任务按批写入存储：
+    - state 变更与删除在 save_delay_ms 后写入
+    - 仅有 usage 变更时至少间隔 usage_flush_interval_sec 写入
+    - 单批最多 flush_batch_size 条，积压时连续写入
+    - 写入失败的变更放回队列，按指数退避重试
+    - 登记时可限定字段范围（共享状态模式下避免覆盖其他 worker 原子维护的计数），
+      合并时取并集，与完整写入合并则为完整写入
+
+    每次登记返回单调递增的序号，flush() 可等待该序号之前的变更全部落盘，
+    调用方无需持有存储锁。
+    """
+
+    def __init__(self, build_payload: PayloadBuilder):
+        self._build_payload = build_payload
+        # token_key -> (pool_name, change_kind, seq, fields)
+        self._dirty: Dict[str, DirtyEntry] = {}
+        # token_key -> seq
+        self._deletes: Dict[str, int] = {}
+        self._state_pending = False
+        self._seq = 0
+        self._durable_seq = 0
+        # flush() 等待的序号，落盘水位达到前跳过合并延迟
+        self._urgent_seq = 0
+        self._pending_since: Optional[float] = None
+        self._last_usage_flush_at = 0.0
+        self._retry_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._durable = asyncio.Condition()
+        self._task: Optional[asyncio.Task] = None
+
+        # 指标
+        self._flushes = 0
+        self._failures = 0
+        self._consecutive_failures = 0
+        self._last_flush_ms = 0.0
+        self._avg_flush_ms = 0.0
+        self._last_batch = 0
+        self._last_success_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    # ========== 登记 ==========
+
+    def mark(
+        self,
+        token_key: str,
+        pool_name: str,
+        change_kind: str,
+        fields: Optional[Iterable[str]] = None,
+    ) -> int:
+        """
+        登记 Token 变更
+
+        Args:
+            change_kind: state/usage
+            fields: 只写入这些字段（None 表示写入完整记录）
+        """
+        self._seq += 1
+        was_deleted = self._deletes.pop(token_key, None) is not None
+        fields = None if fields is None or was_deleted else frozenset(fields)
+        existing = self._dirty.get(token_key)
+        seq = self._seq
+        if existing:
+            if existing[1] == "state":
+                change_kind = "state"
+            seq = existing[2]
+            fields = _merge_fields(existing[3], fields)
+        self._dirty[token_key] = (pool_name, change_kind, seq, fields)
+        if change_kind == "state":
+            self._state_pending = True
+        self._touch()
+        return self._seq
+
+    def mark_delete(self, token_key: str) -> int:
+        """登记 Token 删除"""
+        self._seq += 1
+        entry = self._dirty.pop(token_key, None)
+        seq = entry[2] if entry else self._seq
+        self._deletes[token_key] = min(self._deletes.get(token_key, seq), seq)
+        self._state_pending = True
+        self._touch()
+        return self._seq
+
+    def discard(self, token_key: str):
+        """放弃尚未写入的变更（Token 已被其他 worker 删除）"""
+        self._dirty.pop(token_key, None)
+        self._deletes.pop(token_key, None)
+
+    def __contains__(self, token_key: str) -> bool:
+        return token_key in self._dirty or token_key in self._deletes
+
+    @property
+    def pending(self) -> int:
+        return len(self._dirty) + len(self._deletes)
+
+    def _touch(self):
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        self._ensure_task()
+        self._wakeup.set()
+
+    def _ensure_task(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    # ========== 等待落盘 ==========
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        立即写入并等待当前已登记的变更落盘
+
+        Returns:
+            是否在超时前全部落盘
+        """
+        target = self._seq
+        if self._durable_seq >= target and not self.pending:
+            return True
+        self._urgent_seq = max(self._urgent_seq, target)
+        self._ensure_task()
+        self._wakeup.set()
+
+        async def _wait():
+            async with self._durable:
+                await self._durable.wait_for(lambda: self._durable_seq >= target)
+
+        try:
+            await asyncio.wait_for(_wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Token flush did not complete within {timeout}s "
+                f"(pending={self.pending}, last_error={self._last_error})"
+            )
+            return False
+
+    # ========== 后台写入 ==========
+
+    def _next_delay(self) -> float:
+        """距离下一次写入的等待时间（基于绝对时间点，重复计算结果一致）"""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return self._retry_at - now
+        if self._durable_seq < self._urgent_seq:
+            return 0.0
+        since = self._pending_since or now
+        delay_ms = _config_float("token.save_delay_ms", DEFAULT_SAVE_DELAY_MS)
+        due = since + max(0.0, delay_ms) / 1000.0
+        if not self._state_pending:
+            interval = _config_float(
+                "token.usage_flush_interval_sec", DEFAULT_USAGE_FLUSH_INTERVAL_SEC
+            )
+            due = max(due, self._last_usage_flush_at + max(0.0, interval))
+        return max(0.0, due - now)
+
+    async def _run(self):
+        while True:
+            if not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            delay = self._next_delay()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._flush_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Token flush engine error: {e}")
+
+    def _take_batch(self) -> Tuple[Dict[str, DirtyEntry], Dict[str, int]]:
+        limit = int(_config_float("token.flush_batch_size", DEFAULT_FLUSH_BATCH_SIZE))
+        if limit <= 0 or self.pending <= limit:
+            dirty, deletes = self._dirty, self._deletes
+            self._dirty, self._deletes = {}, {}
+            return dirty, deletes
+
+        # 删除优先，其余按登记顺序
+        deletes = {}
+        for token_key in list(self._deletes)[:limit]:
+            deletes[token_key] = self._deletes.pop(token_key)
+        dirty = {}
+        for token_key in list(self._dirty)[: limit - len(deletes)]:
+            dirty[token_key] = self._dirty.pop(token_key)
+        return dirty, deletes
+
+    def _requeue(self, dirty: Dict[str, DirtyEntry], deletes: Dict[str, int]):
+        """写入失败时放回队列（与期间新增的变更合并，保留较早的序号）"""
+        for token_key, (pool_name, change_kind, seq, fields) in dirty.items():
+            if token_key in self._deletes:
+                continue
+            existing = self._dirty.get(token_key)
+            if existing:
+                kind = "state" if "state" in (existing[1], change_kind) else "usage"
+                self._dirty[token_key] = (
+                    existing[0],
+                    kind,
+                    min(existing[2], seq),
+                    _merge_fields(existing[3], fields),
+                )
+            else:
+                self._dirty[token_key] = (pool_name, change_kind, seq, fields)
+        for token_key, seq in deletes.items():
+            if token_key in self._dirty:
+                continue
+            self._deletes[token_key] = min(self._deletes.get(token_key, seq), seq)
+        self._state_pending = bool(self._deletes) or any(
+            meta[1] == "state" for meta in self._dirty.values()
+        )
+
+    async def _flush_batch(self):
+        seq_before = self._seq
+        dirty, deletes = self._take_batch()
+        self._state_pending = bool(self._deletes) or any(
+            meta[1] == "state" for meta in self._dirty.values()
+        )
+
+        updates: List[Dict[str, Any]] = []
+        for token_key, (pool_name, change_kind, _, fields) in dirty.items():
+            payload = self._build_payload(token_key, pool_name, change_kind, fields)
+            if payload is not None:
+                updates.append(payload)
+
+        start = time.monotonic()
+        try:
+            storage = get_storage()
+            async with storage.acquire_lock("tokens_save", timeout=FLUSH_LOCK_TIMEOUT_SEC):
+                await storage.save_tokens_delta(updates, list(deletes))
+        except Exception as e:
+            self._requeue(dirty, deletes)
+            self._failures += 1
+            self._consecutive_failures += 1
+            self._last_error = str(e)
+            backoff = min(
+                FLUSH_BACKOFF_MAX_SEC,
+                FLUSH_BACKOFF_BASE_SEC * (2 ** (self._consecutive_failures - 1)),
+            )
+            self._retry_at = time.monotonic() + backoff
+            logger.error(
+                f"Failed to save tokens ({len(dirty) + len(deletes)} changes), "
+                f"retry in {backoff:.1f}s: {e}"
+            )
+            return
+
+        elapsed_ms = (time.monotonic() - start) * 1000
+        self._flushes += 1
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+        self._last_error = None
+        self._last_flush_ms = elapsed_ms
+        self._avg_flush_ms = (
+            elapsed_ms
+            if self._flushes == 1
+            else self._avg_flush_ms
+            + FLUSH_LATENCY_EWMA_ALPHA * (elapsed_ms - self._avg_flush_ms)
+        )
+        self._last_batch = len(dirty) + len(deletes)
+        self._last_success_at = time.time()
+        # state 写入同样携带最新用量，统一计入用量写入间隔
+        self._last_usage_flush_at = time.monotonic()
+
+        # 落盘水位: 仍在队列中的最早序号之前的变更都已写入
+        pending_seqs = [meta[2] for meta in self._dirty.values()]
+        pending_seqs.extend(self._deletes.values())
+        durable = min(pending_seqs) - 1 if pending_seqs else max(seq_before, self._seq)
+        if not pending_seqs:
+            self._pending_since = None
+        elif min(pending_seqs) > seq_before:
+            # 剩余的都是写入期间新登记的变更，重新开始合并计时
+            self._pending_since = time.monotonic()
+        if durable > self._durable_seq:
+            self._durable_seq = durable
+            async with self._durable:
+                self._durable.notify_all()
+
+    async def close(self, timeout: Optional[float] = None) -> bool:
+        """写入剩余变更并停止后台任务"""
+        ok = await self.flush(timeout)
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._task = None
+        return ok
+
+    # ========== 指标 ==========
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "pending": self.pending,
+            "pending_deletes": len(self._deletes),
+            "oldest_pending_sec": (
+                round(now - self._pending_since, 3) if self._pending_since else 0.0
+            ),
+            "flushes": self._flushes,
+            "failures": self._failures,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_in_sec": round(max(0.0, self._retry_at - now), 3),
+            "last_flush_ms": round(self._last_flush_ms, 2),
+            "avg_flush_ms": round(self._avg_flush_ms, 2),
+            "last_batch": self._last_batch,
+            "last_success_at": self._last_success_at,
+            "last_error": self._last_error,
+        }
+
+
+__all__ = ["TokenFlushEngine", "PayloadBuilder"]
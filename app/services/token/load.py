@@ -0,0 +1,158 @@
+"""Token 负载追踪（在途请求数与近期延迟）及租约"""
+
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from app.services.token.models import TokenInfo
+
+if TYPE_CHECKING:
+    from app.services.token.manager import TokenManager
+
+
+# 延迟 EWMA 平滑系数
+LATENCY_EWMA_ALPHA = 0.2
+# 失败率 EWMA 平滑系数
+FAILURE_EWMA_ALPHA = 0.2
+
+
+class TokenLoadTracker:
+    """记录每个 Token 的在途请求数、延迟与失败率 EWMA，用于负载感知调度"""
+
+    def __init__(self):
+        self._inflight: Dict[str, int] = {}
+        self._latency: Dict[str, float] = {}
+        self._failure: Dict[str, float] = {}
+
+    def acquire(self, token: str):
+        """在途请求 +1"""
+        self._inflight[token] = self._inflight.get(token, 0) + 1
+
+    def release(
+        self,
+        token: str,
+        latency: Optional[float] = None,
+        success: Optional[bool] = None,
+    ):
+        """
+        在途请求 -1
+
+        Args:
+            token: 裸 token
+            latency: 延迟样本（秒），仅在成功或未知结果时计入
+            success: 请求结果，None 表示不记录
+        """
+        count = self._inflight.get(token, 0) - 1
+        if count > 0:
+            self._inflight[token] = count
+        else:
+            self._inflight.pop(token, None)
+
+        if latency is not None and latency >= 0 and success is not False:
+            last = self._latency.get(token)
+            if last is None:
+                self._latency[token] = latency
+            else:
+                self._latency[token] = last + LATENCY_EWMA_ALPHA * (latency - last)
+
+        if success is not None:
+            sample = 0.0 if success else 1.0
+            last = self._failure.get(token, 0.0)
+            rate = last + FAILURE_EWMA_ALPHA * (sample - last)
+            if rate > 1e-3:
+                self._failure[token] = rate
+            else:
+                self._failure.pop(token, None)
+
+    def inflight(self, token: str) -> int:
+        return self._inflight.get(token, 0)
+
+    def latency(self, token: str) -> float:
+        return self._latency.get(token, 0.0)
+
+    def failure_rate(self, token: str) -> float:
+        return self._failure.get(token, 0.0)
+
+    def saturated(self, limit: int) -> Set[str]:
+        """在途请求数达到上限的 token 集合"""
+        if limit <= 0:
+            return set()
+        return {token for token, count in self._inflight.items() if count >= limit}
+
+    def forget(self, token: str):
+        """Token 被删除时清理统计"""
+        self._inflight.pop(token, None)
+        self._latency.pop(token, None)
+        self._failure.pop(token, None)
+
+    def cost(self, info: TokenInfo) -> float:
+        """
+        调度代价（越小越优先）
+
+        在途请求越多、近期延迟与失败率越高、剩余额度越少，代价越大。
+        """
+        return self.score(info.token, info.quota)
+
+    def score(self, token: str, quota: int) -> float:
+        """按 token 与剩余额度计算调度代价"""
+        inflight = self._inflight.get(token, 0)
+        latency = self._latency.get(token, 0.0)
+        failure = self._failure.get(token, 0.0)
+        return (inflight + 1) * (1.0 + latency) * (1.0 + failure) / max(quota, 1)
+
+    def total_inflight(self) -> int:
+        return sum(self._inflight.values())
+
+
+class TokenLease:
+    """
+    Token 租约
+
+    占用 Token 的一个在途名额，释放时自动记录延迟与结果。
+    可作为 async context manager 使用，异常退出视为失败；
+    流式场景可调用 mark_first_byte() 以首包延迟作为延迟样本。
+    """
+
+    __slots__ = ("token", "started_at", "first_byte_at", "_manager", "_released")
+
+    def __init__(self, manager: "TokenManager", token: str):
+        self.token = token
+        self.started_at = time.monotonic()
+        self.first_byte_at: Optional[float] = None
+        self._manager = manager
+        self._released = False
+
+    @property
+    def released(self) -> bool:
+        return self._released
+
+    @property
+    def latency(self) -> float:
+        """首包延迟（未收到首包时为已耗时）"""
+        end = self.first_byte_at if self.first_byte_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def mark_first_byte(self):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.monotonic()
+
+    def release(self, success: Optional[bool] = None):
+        """释放租约（重复调用无副作用）"""
+        if self._released:
+            return
+        self._released = True
+        self._manager._release_lease(self, success)
+
+    async def __aenter__(self) -> "TokenLease":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self.release(success=exc_type is None)
+        return False
+
+
+__all__ = [
+    "TokenLoadTracker",
+    "TokenLease",
+    "LATENCY_EWMA_ALPHA",
+    "FAILURE_EWMA_ALPHA",
+]
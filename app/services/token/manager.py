@@ -1,23 +1,30 @@
 """Token 管理服务"""
 
 import asyncio
+import math
+import random
 import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 from app.core.logger import logger
 from app.services.token.models import (
     TokenInfo,
     EffortType,
+    EFFORT_COST,
     FAIL_THRESHOLD,
     TokenStatus,
     BASIC__DEFAULT_QUOTA,
     SUPER_DEFAULT_QUOTA,
 )
-from app.core.storage import get_storage, LocalStorage
+from app.core.storage import get_storage, LocalStorage, RedisStorage, TokenChanges
 from app.core.config import get_config
 from app.core.exceptions import UpstreamException
 from app.services.token.pool import TokenPool
+from app.services.token.load import TokenLease, TokenLoadTracker
+from app.services.token.cooldown import CooldownSchedule, recovery_delay
+from app.services.token.flush import TokenFlushEngine
 from app.services.grok.batch_services.usage import UsageService
 
 
@@ -26,8 +33,20 @@ DEFAULT_REFRESH_CONCURRENCY = 5
 DEFAULT_SUPER_REFRESH_INTERVAL_HOURS = 2
 DEFAULT_REFRESH_INTERVAL_HOURS = 8
 DEFAULT_RELOAD_INTERVAL_SEC = 30
-DEFAULT_SAVE_DELAY_MS = 500
-DEFAULT_USAGE_FLUSH_INTERVAL_SEC = 5
+DEFAULT_SELECTION_STRATEGY = "max_quota"
+DEFAULT_MAX_INFLIGHT_PER_TOKEN = 0
+DEFAULT_LEASE_WAIT_TIMEOUT_SEC = 10
+DEFAULT_COOLDOWN_PROBE_SEC = 60
+DEFAULT_PICK_WAIT_MS = 2000
+DEFAULT_RETRY_AFTER_SEC = 60
+# 管理操作等待变更落盘的超时（秒）
+FLUSH_WAIT_TIMEOUT_SEC = 15
+# 共享状态模式下每次从配额 ZSet 读取的候选数（不含排除项）
+SHARED_SELECT_WINDOW = 8
+
+# 共享状态模式下各类变更写入的字段（quota/use_count 由 Redis 原子维护，不随意回写）
+FAIL_FIELDS = ("fail_count", "last_fail_at", "last_fail_reason")
+REFRESH_FIELDS = ("quota", "status", "last_sync_at")
 
 SUPER_POOL_NAME = "ssoSuper"
 BASIC_POOL_NAME = "ssoBasic"
@@ -39,6 +58,13 @@ def _default_quota_for_pool(pool_name: str) -> int:
     return BASIC__DEFAULT_QUOTA
 
 
+def _normalize_token(token_str: str) -> str:
+    """统一为裸 token（去除 sso= 前缀）"""
+    if token_str.startswith("sso="):
+        return token_str[4:]
+    return token_str
+
+
 class TokenManager:
     """管理 Token 的增删改查和配额同步"""
 
@@ -47,19 +73,31 @@ class TokenManager:
 
     def __init__(self):
         self.pools: Dict[str, TokenPool] = {}
+        # 全局索引: 裸 token -> (pool_name, TokenInfo)
+        self._token_index: Dict[str, Tuple[str, TokenInfo]] = {}
+        # 在途请求与延迟统计（least_loaded 调度使用）
+        self._load_tracker = TokenLoadTracker()
+        # 等待空闲在途名额的请求（FIFO）
+        self._capacity_waiters: Deque[Tuple[asyncio.Future, List[str], Optional[set]]] = deque()
+        # 冷却 Token 的预计恢复时间表
+        self._cooldowns = CooldownSchedule()
+        self._cooldown_changed = asyncio.Event()
+        # Token 恢复可用时通知等待中的请求
+        self._token_available = asyncio.Condition()
+        # 每次通知递增，等待者据此发现选择与 wait() 之间发生的通知
+        self._available_seq = 0
+        self._recovery_task: Optional[asyncio.Task] = None
+        # 多 worker 共享状态（token.shared_state + Redis 存储时启用）
+        self._shared: Optional[RedisStorage] = None
         self.initialized = False
-        self._save_lock = asyncio.Lock()
-        self._dirty = False
-        self._save_task: Optional[asyncio.Task] = None
-        self._save_delay = DEFAULT_SAVE_DELAY_MS / 1000.0
+        # 变更写后合并落盘
+        self._flusher = TokenFlushEngine(self._flush_payload)
         self._last_reload_at = 0.0
-        self._has_state_changes = False
-        self._has_usage_changes = False
-        self._state_change_seq = 0
-        self._usage_change_seq = 0
-        self._last_usage_flush_at = 0.0
-        self._dirty_tokens = {}
-        self._dirty_deletes = set()
+        # 存储后端的变更水位（增量同步使用）
+        self._change_version: Any = None
+        self._sync_lock = asyncio.Lock()
+        # 订阅其他 worker 的变更推送（后端支持时）
+        self._change_task: Optional[asyncio.Task] = None
 
     @classmethod
     async def get_instance(cls) -> "TokenManager":
@@ -76,6 +114,12 @@ class TokenManager:
         if not self.initialized:
             try:
                 storage = get_storage()
+                # 先记录水位再加载，加载期间的写入会在下次增量同步中再次应用
+                try:
+                    version = await storage.token_version()
+                except Exception as e:
+                    logger.warning(f"Failed to read token change version: {e}")
+                    version = None
                 data = await storage.load_tokens()
 
                 # 如果后端返回 None 或空数据，尝试从本地 data/token.json 初始化后端
@@ -102,10 +146,8 @@ class TokenManager:
                             # 统一存储裸 token
                             if isinstance(token_data, dict):
                                 raw_token = token_data.get("token")
-                                if isinstance(raw_token, str) and raw_token.startswith(
-                                    "sso="
-                                ):
-                                    token_data["token"] = raw_token[4:]
+                                if isinstance(raw_token, str):
+                                    token_data["token"] = _normalize_token(raw_token)
                             token_info = TokenInfo(**token_data)
                             if quota_missing and pool_name == SUPER_POOL_NAME:
                                 token_info.quota = SUPER_DEFAULT_QUOTA
@@ -118,17 +160,52 @@ class TokenManager:
                     pool._rebuild_index()
                     self.pools[pool_name] = pool
 
+                self._rebuild_token_index()
+                self._rebuild_cooldowns()
+                await self._init_shared_state(storage)
                 self.initialized = True
+                self._change_version = version
                 self._last_reload_at = time.monotonic()
                 total = sum(p.count() for p in self.pools.values())
                 logger.info(
                     f"TokenManager initialized: {len(self.pools)} pools with {total} tokens"
                 )
+                self._start_change_listener(storage)
+                await self._notify_token_available()
             except Exception as e:
                 logger.error(f"Failed to initialize TokenManager: {e}")
                 self.pools = {}
+                self._token_index = {}
+                self._cooldowns.clear()
                 self.initialized = True
 
+    async def _init_shared_state(self, storage):
+        """启用 Redis 共享状态模式，并在缺失时建立各池的配额 ZSet"""
+        self._shared = None
+        if not get_config("token.shared_state", False):
+            return
+        if not isinstance(storage, RedisStorage):
+            logger.warning(
+                "token.shared_state requires Redis storage, falling back to per-worker state"
+            )
+            return
+        try:
+            if not await storage.has_quota_index(self.pools.keys()):
+                await storage.rebuild_quota_index(
+                    {
+                        name: [t.to_dict() for t in pool]
+                        for name, pool in self.pools.items()
+                    }
+                )
+            self._shared = storage
+            logger.info("TokenManager: shared state enabled (Redis)")
+        except Exception as e:
+            logger.warning(f"TokenManager: failed to enable shared state: {e}")
+
+    @property
+    def shared_state(self) -> bool:
+        return self._shared is not None
+
     async def reload(self):
         """重新加载 Token 池数据"""
         async with self.__class__._lock:
@@ -136,7 +213,9 @@ class TokenManager:
             await self._load()
 
     async def reload_if_stale(self):
-        """在多 worker 场景下保持短周期一致性"""
+        """在多 worker 场景下保持短周期一致性（共享状态模式下无需周期性全量重载）"""
+        if self._shared is not None:
+            return
         interval = get_config("token.reload_interval_sec", DEFAULT_RELOAD_INTERVAL_SEC)
         try:
             interval = float(interval)
@@ -146,145 +225,315 @@ class TokenManager:
             return
         if time.monotonic() - self._last_reload_at < interval:
             return
-        await self.reload()
+        await self.sync_changes()
+
+    async def sync_changes(self):
+        """拉取存储中的增量变更并就地应用，后端无法提供增量时回退到全量重载"""
+        async with self._sync_lock:
+            changes = None
+            if self._change_version is not None:
+                try:
+                    changes = await get_storage().load_token_changes(
+                        self._change_version
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to load token changes: {e}")
+            if changes is None:
+                await self.reload()
+                return
 
-    def _mark_state_change(self):
-        self._has_state_changes = True
-        self._state_change_seq += 1
+            applied = self._apply_changes(changes)
+            self._change_version = changes.version
+            self._last_reload_at = time.monotonic()
+        if applied:
+            logger.debug(f"TokenManager: applied {applied} token changes")
+            await self._notify_token_available()
 
-    def _mark_usage_change(self):
-        self._has_usage_changes = True
-        self._usage_change_seq += 1
+    def _start_change_listener(self, storage):
+        if self._change_task and not self._change_task.done():
+            return
+        self._change_task = asyncio.create_task(self._change_listener(storage))
+
+    async def _change_listener(self, storage):
+        """收到变更推送后立即增量同步；后端不支持推送时退出，由周期轮询兜底"""
+        backoff = 1.0
+        while True:
+            try:
+                await storage.wait_token_changes()
+            except NotImplementedError:
+                logger.debug(
+                    f"{storage.__class__.__name__} has no change push, using polling"
+                )
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Token change listener error: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            backoff = 1.0
+            try:
+                await self.sync_changes()
+            except Exception as e:
+                logger.warning(f"Failed to apply pushed token changes: {e}")
+
+    def _apply_changes(self, changes: TokenChanges) -> int:
+        """应用增量变更；本 worker 尚未落盘的 Token 以本地为准"""
+        applied = 0
+        for raw in changes.deleted:
+            token_key = _normalize_token(raw)
+            if token_key in self._flusher:
+                continue
+            entry = self._token_index.pop(token_key, None)
+            if not entry:
+                continue
+            for pool in self.pools.values():
+                pool.remove(token_key)
+            self._cooldowns.cancel(token_key)
+            self._load_tracker.forget(token_key)
+            applied += 1
+
+        for pool_name, token_data in changes.upserts:
+            raw = token_data.get("token") if isinstance(token_data, dict) else None
+            if not pool_name or not isinstance(raw, str):
+                continue
+            token_key = _normalize_token(raw)
+            if token_key in self._flusher:
+                continue
+            try:
+                info = TokenInfo(**{**token_data, "token": token_key})
+            except Exception as e:
+                logger.warning(f"Failed to apply token change in pool '{pool_name}': {e}")
+                continue
+            entry = self._token_index.get(token_key)
+            if entry and entry[0] == pool_name and entry[1] == info:
+                continue
+            if entry and entry[1].last_sync_at != info.last_sync_at:
+                # 其他 worker 已刷新该 Token，按新的同步时间重新登记恢复时间
+                self._cooldowns.cancel(token_key)
+            if entry and entry[0] != pool_name:
+                old_pool = self.pools.get(entry[0])
+                if old_pool:
+                    old_pool.remove(token_key)
+            pool = self.pools.get(pool_name)
+            if pool is None:
+                pool = TokenPool(pool_name)
+                self.pools[pool_name] = pool
+            pool.add(info)
+            self._token_index[token_key] = (pool_name, info)
+            self._sync_cooldown(info, pool_name, token_key)
+            applied += 1
+        return applied
+
+    def _rebuild_token_index(self):
+        """根据当前 pools 重建全局 token 索引（同一 token 以先出现的池为准）"""
+        index: Dict[str, Tuple[str, TokenInfo]] = {}
+        for pool_name, pool in self.pools.items():
+            for info in pool:
+                index.setdefault(info.token, (pool_name, info))
+        self._token_index = index
+
+    def _lookup(self, token_str: str) -> Tuple[str, Optional[Tuple[str, TokenInfo]]]:
+        """查找 token 所属池，返回 (裸 token, (pool_name, TokenInfo) 或 None)"""
+        raw_token = _normalize_token(token_str)
+        return raw_token, self._token_index.get(raw_token)
 
     def _track_token_change(
-        self, token: TokenInfo, pool_name: str, change_kind: str
+        self,
+        token: TokenInfo,
+        pool_name: str,
+        change_kind: str,
+        fields: Optional[Tuple[str, ...]] = None,
     ):
-        token_key = token.token
-        if token_key.startswith("sso="):
-            token_key = token_key[4:]
-        if token_key in self._dirty_deletes:
-            self._dirty_deletes.remove(token_key)
-        existing = self._dirty_tokens.get(token_key)
-        if existing and existing[1] == "state":
-            change_kind = "state"
-        self._dirty_tokens[token_key] = (pool_name, change_kind)
-        if change_kind == "state":
-            self._mark_state_change()
+        """
+        登记待落盘的变更
+
+        共享状态模式下 fields 限定写入的字段，避免用本地缓存中过期的
+        quota/use_count/status 覆盖其他 worker 的原子扣减；其他模式写入完整记录。
+        """
+        token_key = _normalize_token(token.token)
+        if self._shared is None:
+            fields = None
+        self._flusher.mark(token_key, pool_name, change_kind, fields)
+        self._sync_cooldown(token, pool_name, token_key)
+
+    def _sync_cooldown(self, token: TokenInfo, pool_name: str, token_key: str):
+        if token.status == TokenStatus.COOLING:
+            if token_key not in self._cooldowns:
+                self._schedule_cooldown(token, pool_name)
         else:
-            self._mark_usage_change()
+            self._cooldowns.cancel(token_key)
 
     def _track_token_delete(self, token_str: str):
-        token_key = token_str
-        if token_key.startswith("sso="):
-            token_key = token_key[4:]
-        self._dirty_deletes.add(token_key)
-        if token_key in self._dirty_tokens:
-            del self._dirty_tokens[token_key]
-        self._mark_state_change()
-
-    async def _save(self, force: bool = False):
-        """保存变更"""
-        async with self._save_lock:
-            try:
-                if not self._dirty_tokens and not self._dirty_deletes:
-                    return
+        self._flusher.mark_delete(_normalize_token(token_str))
 
-                if not force and not self._has_state_changes:
-                    interval_sec = get_config(
-                        "token.usage_flush_interval_sec",
-                        DEFAULT_USAGE_FLUSH_INTERVAL_SEC,
-                    )
-                    try:
-                        interval_sec = float(interval_sec)
-                    except Exception:
-                        interval_sec = float(DEFAULT_USAGE_FLUSH_INTERVAL_SEC)
-                    if interval_sec > 0:
-                        now = time.monotonic()
-                        if now - self._last_usage_flush_at < interval_sec:
-                            self._dirty = True
-                            return
-
-                state_seq = self._state_change_seq
-                usage_seq = self._usage_change_seq
-
-                dirty_tokens = self._dirty_tokens
-                dirty_deletes = self._dirty_deletes
-                self._dirty_tokens = {}
-                self._dirty_deletes = set()
-
-                updates = []
-                deleted = list(dirty_deletes)
-                for token_key, meta in dirty_tokens.items():
-                    if token_key in dirty_deletes:
-                        continue
-                    pool_name, change_kind = meta
-                    pool = self.pools.get(pool_name)
-                    if not pool:
-                        continue
-                    info = pool.get(token_key)
-                    if not info:
-                        continue
-                    payload = info.model_dump()
-                    payload["pool_name"] = pool_name
-                    payload["_update_kind"] = change_kind
-                    updates.append(payload)
-
-                storage = get_storage()
-                async with storage.acquire_lock("tokens_save", timeout=10):
-                    await storage.save_tokens_delta(updates, deleted)
-
-                if state_seq == self._state_change_seq:
-                    self._has_state_changes = False
-                if usage_seq == self._usage_change_seq:
-                    self._has_usage_changes = False
-                    self._last_usage_flush_at = time.monotonic()
-            except Exception as e:
-                logger.error(f"Failed to save tokens: {e}")
-                self._dirty = True
-                if 'dirty_tokens' in locals():
-                    for token_key, meta in dirty_tokens.items():
-                        existing = self._dirty_tokens.get(token_key)
-                        if existing and existing[1] == "state":
-                            continue
-                        if meta[1] == "state" and existing:
-                            self._dirty_tokens[token_key] = (meta[0], "state")
-                        else:
-                            self._dirty_tokens[token_key] = meta
-                    self._dirty_deletes.update(dirty_deletes)
-                    for token_key in dirty_deletes:
-                        if token_key in self._dirty_tokens:
-                            del self._dirty_tokens[token_key]
-
-    def _schedule_save(self):
-        """合并高频保存请求，减少写入开销"""
-        delay_ms = get_config("token.save_delay_ms", DEFAULT_SAVE_DELAY_MS)
+    def _flush_payload(
+        self,
+        token_key: str,
+        pool_name: str,
+        change_kind: str,
+        fields: Optional[frozenset] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """构建写入负载（Token 已被移除时返回 None；限定字段时只携带这些字段）"""
+        pool = self.pools.get(pool_name)
+        info = pool.get(token_key) if pool else None
+        if not info:
+            return None
+        payload = info.to_dict()
+        if fields is not None:
+            payload = {k: payload[k] for k in fields if k in payload}
+            payload["token"] = info.token
+            change_kind = "fields"
+        payload["pool_name"] = pool_name
+        payload["_update_kind"] = change_kind
+        return payload
+
+    async def flush(self, timeout: Optional[float] = FLUSH_WAIT_TIMEOUT_SEC) -> bool:
+        """立即写入并等待已登记的变更落盘，返回是否在超时前完成"""
+        return await self._flusher.flush(timeout)
+
+    async def close(self, timeout: Optional[float] = FLUSH_WAIT_TIMEOUT_SEC) -> bool:
+        """停机: 停止后台任务，写入剩余变更"""
+        for task in (self._change_task, self._recovery_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._change_task = None
+        self._recovery_task = None
+        return await self._flusher.close(timeout)
+
+    def flush_stats(self) -> Dict[str, Any]:
+        """落盘引擎指标（积压、耗时、失败次数等）"""
+        return self._flusher.stats()
+
+    def _select_from_pool(
+        self, pool: TokenPool, exclude: set = None
+    ) -> Optional[TokenInfo]:
+        """按 token.selection_strategy 从池中选择 Token（跳过在途已满的 Token）"""
+        saturated = self._load_tracker.saturated(self._max_inflight_per_token())
+        if saturated:
+            exclude = saturated | exclude if exclude else saturated
+        strategy = get_config("token.selection_strategy", DEFAULT_SELECTION_STRATEGY)
+        if strategy == "least_loaded":
+            return pool.select_least_loaded(self._load_tracker, exclude=exclude)
+        return pool.select(exclude=exclude)
+
+    @staticmethod
+    def _max_inflight_per_token() -> int:
         try:
-            delay_ms = float(delay_ms)
-        except Exception:
-            delay_ms = float(DEFAULT_SAVE_DELAY_MS)
-        self._save_delay = max(0.0, delay_ms / 1000.0)
-        self._dirty = True
-        if self._save_delay == 0:
-            if self._save_task and not self._save_task.done():
-                return
-            self._save_task = asyncio.create_task(self._save())
+            return int(
+                get_config(
+                    "token.max_inflight_per_token", DEFAULT_MAX_INFLIGHT_PER_TOKEN
+                )
+                or 0
+            )
+        except (TypeError, ValueError):
+            return DEFAULT_MAX_INFLIGHT_PER_TOKEN
+
+    def lease(self, token_str: str) -> TokenLease:
+        """
+        租用 Token 的一个在途名额
+
+        Returns:
+            TokenLease，释放时记录延迟与结果并唤醒等待者
+        """
+        raw_token = _normalize_token(token_str)
+        self._load_tracker.acquire(raw_token)
+        return TokenLease(self, raw_token)
+
+    def _release_lease(self, lease: TokenLease, success: Optional[bool]):
+        token = lease.token
+        self._load_tracker.release(token, lease.latency, success)
+        limit = self._max_inflight_per_token()
+        if self._capacity_waiters and (
+            limit <= 0 or self._load_tracker.inflight(token) < limit
+        ):
+            self._wake_capacity_waiter(token)
+
+    def _wake_capacity_waiter(self, token: str):
+        """按 FIFO 顺序唤醒第一个可以使用该 Token 的等待者"""
+        entry = self._token_index.get(token)
+        if not entry:
             return
-        if self._save_task and not self._save_task.done():
+        pool_name = entry[0]
+        for item in self._capacity_waiters:
+            waiter, pool_names, exclude = item
+            if waiter.done() or pool_name not in pool_names:
+                continue
+            if exclude and token in exclude:
+                continue
+            self._capacity_waiters.remove(item)
+            waiter.set_result(None)
             return
-        self._save_task = asyncio.create_task(self._flush_loop())
 
-    async def _flush_loop(self):
-        try:
-            while True:
-                await asyncio.sleep(self._save_delay)
-                if not self._dirty:
-                    break
-                self._dirty = False
-                await self._save()
-        finally:
-            self._save_task = None
-            if self._dirty:
-                self._schedule_save()
+    def _has_saturated_candidates(
+        self, pool_names: List[str], exclude: Optional[set]
+    ) -> bool:
+        """候选池中是否存在仅因在途已满而不可选的 Token"""
+        for token in self._load_tracker.saturated(self._max_inflight_per_token()):
+            if exclude and token in exclude:
+                continue
+            entry = self._token_index.get(token)
+            if entry and entry[0] in pool_names and entry[1].is_available():
+                return True
+        return False
+
+    async def wait_for_token(
+        self,
+        pool_names: List[str],
+        exclude: Optional[set] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        所有候选 Token 在途已满时，排队等待空闲名额
+
+        等待者按 FIFO 顺序被唤醒；没有可等待的 Token 或超过 deadline 时返回 None。
+
+        Args:
+            pool_names: 候选池名称（按优先级）
+            exclude: 需要排除的 token 字符串集合
+            timeout: 最长等待时间（秒），默认取 token.lease_wait_timeout
+        """
+        if timeout is None:
+            timeout = get_config(
+                "token.lease_wait_timeout", DEFAULT_LEASE_WAIT_TIMEOUT_SEC
+            )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max(float(timeout or 0), 0.0)
+        requeue = False
+
+        while True:
+            token = await self.select_token(pool_names, exclude)
+            if token:
+                return token
+
+            if not self._has_saturated_candidates(pool_names, exclude):
+                return None
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+
+            waiter = loop.create_future()
+            item = (waiter, pool_names, exclude)
+            if requeue:
+                # 被唤醒后名额已被抢占，保持队首位置
+                self._capacity_waiters.appendleft(item)
+            else:
+                self._capacity_waiters.append(item)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                try:
+                    self._capacity_waiters.remove(item)
+                except ValueError:
+                    pass
+            requeue = True
 
     def get_token(self, pool_name: str = "ssoBasic", exclude: set = None) -> Optional[str]:
         """
@@ -302,15 +551,12 @@ class TokenManager:
             logger.warning(f"Pool '{pool_name}' not found")
             return None
 
-        token_info = pool.select(exclude=exclude)
+        token_info = self._select_from_pool(pool, exclude=exclude)
         if not token_info:
             logger.warning(f"No available token in pool '{pool_name}'")
             return None
 
-        token = token_info.token
-        if token.startswith("sso="):
-            return token[4:]
-        return token
+        return _normalize_token(token_info.token)
 
     def get_token_info(self, pool_name: str = "ssoBasic") -> Optional["TokenInfo"]:
         """
@@ -327,7 +573,7 @@ class TokenManager:
             logger.warning(f"Pool '{pool_name}' not found")
             return None
 
-        token_info = pool.select()
+        token_info = self._select_from_pool(pool)
         if not token_info:
             logger.warning(f"No available token in pool '{pool_name}'")
             return None
@@ -402,11 +648,8 @@ class TokenManager:
 
     def get_pool_name_for_token(self, token_str: str) -> Optional[str]:
         """Return pool name for the given token string."""
-        raw_token = token_str.replace("sso=", "")
-        for pool_name, pool in self.pools.items():
-            if pool.get(raw_token):
-                return pool_name
-        return None
+        _, entry = self._lookup(token_str)
+        return entry[0] if entry else None
 
     async def consume(
         self, token_str: str, effort: EffortType = EffortType.LOW
@@ -421,23 +664,42 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token_str.replace("sso=", "")
+        raw_token, entry = self._lookup(token_str)
+        if not entry:
+            logger.warning(f"Token {raw_token[:10]}...: not found for consumption")
+            return False
 
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                old_status = token.status
-                consumed = token.consume(effort)
+        pool_name, token = entry
+        if self._shared is not None:
+            try:
+                result = await self._shared.consume_token(
+                    pool_name, raw_token, EFFORT_COST[effort]
+                )
+            except Exception as e:
+                logger.warning(
+                    f"Token {raw_token[:10]}...: shared consume failed, fallback to local ({e})"
+                )
+            else:
+                if result is None:
+                    logger.warning(
+                        f"Token {raw_token[:10]}...: not found in shared state for consumption"
+                    )
+                    return False
+                self._apply_shared(token, pool_name, raw_token, result)
                 logger.debug(
-                    f"Token {raw_token[:10]}...: consumed {consumed} quota, use_count={token.use_count}"
+                    f"Token {raw_token[:10]}...: consumed {result['consumed']} quota (shared), "
+                    f"use_count={token.use_count}"
                 )
-                change_kind = "state" if token.status != old_status else "usage"
-                self._track_token_change(token, pool.name, change_kind)
-                self._schedule_save()
                 return True
 
-        logger.warning(f"Token {raw_token[:10]}...: not found for consumption")
-        return False
+        old_status = token.status
+        consumed = token.consume(effort)
+        logger.debug(
+            f"Token {raw_token[:10]}...: consumed {consumed} quota, use_count={token.use_count}"
+        )
+        change_kind = "state" if token.status != old_status else "usage"
+        self._track_token_change(token, pool_name, change_kind)
+        return True
 
     async def sync_usage(
         self,
@@ -460,20 +722,11 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token_str.replace("sso=", "")
-
-        # 查找 Token 对象
-        target_token: Optional[TokenInfo] = None
-        target_pool_name: Optional[str] = None
-        for pool in self.pools.values():
-            target_token = pool.get(raw_token)
-            if target_token:
-                target_pool_name = pool.name
-                break
-
-        if not target_token:
+        raw_token, entry = self._lookup(token_str)
+        if not entry:
             logger.warning(f"Token {raw_token[:10]}...: not found for sync")
             return False
+        target_pool_name, target_token = entry
 
         # 尝试 API 同步
         try:
@@ -491,6 +744,10 @@ class TokenManager:
 
                 target_token.update_quota(new_quota)
                 target_token.record_success(is_usage=is_usage)
+                if target_token.status == TokenStatus.COOLING:
+                    self._schedule_cooldown(
+                        target_token, target_pool_name, delay=recovery_delay(result)
+                    )
 
                 consumed = max(0, old_quota - new_quota)
                 logger.info(
@@ -498,12 +755,19 @@ class TokenManager:
                     f"{old_quota} -> {new_quota} (consumed: {consumed}, use_count: {target_token.use_count})"
                 )
 
-                if target_pool_name:
-                    change_kind = "state" if target_token.status != old_status else "usage"
+                if self._shared is not None:
+                    await self._write_synced_usage(
+                        target_token, target_pool_name, raw_token, is_usage
+                    )
+                else:
+                    change_kind = (
+                        "state" if target_token.status != old_status else "usage"
+                    )
                     self._track_token_change(
                         target_token, target_pool_name, change_kind
                     )
-                self._schedule_save()
+                if old_status != TokenStatus.ACTIVE and target_token.is_available():
+                    await self._notify_token_available()
                 return True
 
         except Exception as e:
@@ -543,35 +807,36 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token_str.replace("sso=", "")
-
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                if status_code == 401:
-                    threshold = get_config("token.fail_threshold", FAIL_THRESHOLD)
-                    try:
-                        threshold = int(threshold)
-                    except (TypeError, ValueError):
-                        threshold = FAIL_THRESHOLD
-                    if threshold < 1:
-                        threshold = 1
-
-                    token.record_fail(status_code, reason, threshold=threshold)
-                    logger.warning(
-                        f"Token {raw_token[:10]}...: recorded {status_code} failure "
-                        f"({token.fail_count}/{threshold}) - {reason}"
-                    )
-                    self._track_token_change(token, pool.name, "state")
-                    self._schedule_save()
-                else:
-                    logger.info(
-                        f"Token {raw_token[:10]}...: non-auth error ({status_code}) - {reason} (not counted)"
-                    )
-                return True
+        raw_token, entry = self._lookup(token_str)
+        if not entry:
+            logger.warning(f"Token {raw_token[:10]}...: not found for failure record")
+            return False
 
-        logger.warning(f"Token {raw_token[:10]}...: not found for failure record")
-        return False
+        pool_name, token = entry
+        if status_code == 401:
+            threshold = get_config("token.fail_threshold", FAIL_THRESHOLD)
+            try:
+                threshold = int(threshold)
+            except (TypeError, ValueError):
+                threshold = FAIL_THRESHOLD
+            if threshold < 1:
+                threshold = 1
+
+            old_status = token.status
+            token.record_fail(status_code, reason, threshold=threshold)
+            logger.warning(
+                f"Token {raw_token[:10]}...: recorded {status_code} failure "
+                f"({token.fail_count}/{threshold}) - {reason}"
+            )
+            fields = FAIL_FIELDS
+            if token.status != old_status:
+                fields += ("status",)
+            self._track_token_change(token, pool_name, "state", fields)
+        else:
+            logger.info(
+                f"Token {raw_token[:10]}...: non-auth error ({status_code}) - {reason} (not counted)"
+            )
+        return True
 
     async def mark_rate_limited(self, token_str: str) -> bool:
         """
@@ -586,24 +851,228 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token_str.removeprefix("sso=")
+        raw_token, entry = self._lookup(token_str)
+        if not entry:
+            logger.warning(f"Token {raw_token[:10]}...: not found for rate limit marking")
+            return False
 
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                old_quota = token.quota
-                token.quota = 0
-                token.status = TokenStatus.COOLING
-                logger.warning(
-                    f"Token {raw_token[:10]}...: marked as rate limited "
-                    f"(quota {old_quota} -> 0, status -> cooling)"
+        pool_name, token = entry
+        old_quota = token.quota
+        token.quota = 0
+        token.status = TokenStatus.COOLING
+        logger.warning(
+            f"Token {raw_token[:10]}...: marked as rate limited "
+            f"(quota {old_quota} -> 0, status -> cooling)"
+        )
+        # 尽快探测一次 rate-limits 以获得准确的恢复时间
+        self._schedule_cooldown(token, pool_name, delay=self._cooldown_probe_sec())
+        if self._shared is not None:
+            try:
+                await self._shared.update_token_fields(
+                    pool_name,
+                    raw_token,
+                    {"quota": 0, "status": TokenStatus.COOLING},
                 )
-                self._track_token_change(token, pool.name, "state")
-                self._schedule_save()
                 return True
+            except Exception as e:
+                logger.warning(
+                    f"Token {raw_token[:10]}...: shared rate limit update failed ({e})"
+                )
+        self._track_token_change(token, pool_name, "state", ("quota", "status"))
+        return True
 
-        logger.warning(f"Token {raw_token[:10]}...: not found for rate limit marking")
-        return False
+    # ========== 共享状态 ==========
+
+    def _apply_shared(
+        self, token: TokenInfo, pool_name: str, raw_token: str, result: Dict
+    ):
+        """将 Redis 原子操作的结果同步到本地缓存（无需再写回存储）"""
+        token.quota = result["quota"]
+        token.status = TokenStatus(result["status"])
+        if "use_count" in result:
+            token.use_count = result["use_count"]
+        if "last_used_at" in result:
+            token.last_used_at = result["last_used_at"]
+        self._sync_cooldown(token, pool_name, raw_token)
+
+    async def _write_synced_usage(
+        self, token: TokenInfo, pool_name: str, raw_token: str, is_usage: bool
+    ):
+        """
+        共享状态下写入 API 同步结果
+
+        配额以上游返回值为准直接写入，use_count 经 Lua 原子累加，
+        不回写本地缓存中可能已过期的计数。
+        """
+        fields = {"quota": token.quota, "status": token.status}
+        for name in FAIL_FIELDS:
+            fields[name] = getattr(token, name)
+        if is_usage:
+            fields["last_used_at"] = token.last_used_at
+        try:
+            result = await self._shared.update_token_fields(
+                pool_name,
+                raw_token,
+                fields,
+                increments={"use_count": 1} if is_usage else None,
+            )
+        except Exception as e:
+            logger.warning(
+                f"Token {raw_token[:10]}...: shared usage sync failed, queued for retry ({e})"
+            )
+            self._track_token_change(token, pool_name, "state", tuple(fields))
+            return
+        if result is not None:
+            self._apply_shared(token, pool_name, raw_token, result)
+
+    async def _ensure_local(self, pool_name: str, raw_token: str, quota: int):
+        """确保共享状态中选出的 Token 存在于本地缓存，并刷新其配额"""
+        entry = self._token_index.get(raw_token)
+        if entry:
+            if entry[1].quota != quota:
+                entry[1].quota = quota
+            return
+        data = await self._shared.load_token(raw_token)
+        if not data:
+            return
+        token_info = TokenInfo(**data)
+        pool = self.pools.get(pool_name)
+        if pool is None:
+            pool = TokenPool(pool_name)
+            self.pools[pool_name] = pool
+        pool.add(token_info)
+        self._token_index[raw_token] = (pool_name, token_info)
+
+    async def _select_shared(
+        self, pool_names: List[str], exclude: Optional[set] = None
+    ) -> Optional[str]:
+        """从 Redis 配额 ZSet 选择 Token（额度最高者中随机选择）"""
+        saturated = self._load_tracker.saturated(self._max_inflight_per_token())
+        window = SHARED_SELECT_WINDOW + len(exclude or ()) + len(saturated)
+        least_loaded = (
+            get_config("token.selection_strategy", DEFAULT_SELECTION_STRATEGY)
+            == "least_loaded"
+        )
+        for pool_name in pool_names:
+            rows = await self._shared.top_pool_tokens(pool_name, window)
+            candidates = [
+                (token, quota)
+                for token, quota in rows
+                if token not in saturated and not (exclude and token in exclude)
+            ]
+            if not candidates:
+                continue
+            if least_loaded:
+                token, quota = min(
+                    candidates, key=lambda c: self._load_tracker.score(c[0], c[1])
+                )
+            else:
+                best = candidates[0][1]
+                token, quota = random.choice([c for c in candidates if c[1] == best])
+            await self._ensure_local(pool_name, token, quota)
+            return token
+        return None
+
+    async def select_token(
+        self, pool_names: List[str], exclude: Optional[set] = None
+    ) -> Optional[str]:
+        """
+        按候选池顺序选择可用 Token
+
+        共享状态模式下从 Redis 配额 ZSet 选择，失败时回退到本地池。
+        """
+        if self._shared is not None:
+            try:
+                return await self._select_shared(pool_names, exclude)
+            except Exception as e:
+                logger.warning(f"Shared token selection failed, fallback to local ({e})")
+        return self._select_from_pools(pool_names, exclude)
+
+    # ========== 恢复等待 ==========
+
+    async def _notify_token_available(self):
+        """唤醒等待可用 Token 的请求"""
+        self._available_seq += 1
+        async with self._token_available:
+            self._token_available.notify_all()
+
+    def request_recovery(self):
+        """通知后台恢复泵刷新已到期的冷却 Token（不阻塞调用方）"""
+        if self._recovery_task and not self._recovery_task.done():
+            return
+        self._recovery_task = asyncio.create_task(self._recovery_pump())
+
+    async def _recovery_pump(self):
+        try:
+            await self.refresh_due_tokens()
+        except Exception as e:
+            logger.warning(f"Recovery pump failed: {e}")
+
+    def _select_from_pools(
+        self, pool_names: List[str], exclude: Optional[set] = None
+    ) -> Optional[str]:
+        for pool_name in pool_names:
+            pool = self.pools.get(pool_name)
+            if not pool:
+                continue
+            token_info = self._select_from_pool(pool, exclude=exclude)
+            if token_info:
+                return _normalize_token(token_info.token)
+        return None
+
+    async def wait_for_recovery(
+        self,
+        pool_names: List[str],
+        exclude: Optional[set] = None,
+        timeout_ms: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        候选池无可用 Token 时，通知恢复泵并在限定时间内等待 Token 恢复
+
+        Args:
+            pool_names: 候选池名称（按优先级）
+            exclude: 需要排除的 token 字符串集合
+            timeout_ms: 最长等待时间（毫秒），默认取 token.pick_wait_ms
+
+        Returns:
+            恢复的 Token 字符串，超时返回 None
+        """
+        if timeout_ms is None:
+            timeout_ms = get_config("token.pick_wait_ms", DEFAULT_PICK_WAIT_MS)
+        try:
+            timeout = max(float(timeout_ms or 0), 0.0) / 1000.0
+        except (TypeError, ValueError):
+            timeout = DEFAULT_PICK_WAIT_MS / 1000.0
+
+        self.request_recovery()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            # 选择（共享状态下含 Redis I/O）不持有条件锁，避免等待者相互串行
+            seq = self._available_seq
+            token = await self.select_token(pool_names, exclude)
+            if token:
+                return token
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            try:
+                async with self._token_available:
+                    await asyncio.wait_for(
+                        self._token_available.wait_for(
+                            lambda: self._available_seq != seq
+                        ),
+                        timeout=remaining,
+                    )
+            except asyncio.TimeoutError:
+                return None
+
+    def retry_after_seconds(self) -> int:
+        """预计下一个冷却 Token 恢复前的秒数（用于 Retry-After）"""
+        next_due = self._cooldowns.next_due()
+        if next_due is None:
+            return DEFAULT_RETRY_AFTER_SEC
+        return max(1, math.ceil(next_due - time.time()))
 
     # ========== 管理功能 ==========
 
@@ -624,29 +1093,29 @@ class TokenManager:
 
         pool = self.pools[pool_name]
 
-        token = token[4:] if token.startswith("sso=") else token
+        token = _normalize_token(token)
         if pool.get(token):
             logger.warning(f"Pool '{pool_name}': token already exists")
             return False
 
         token_info = TokenInfo(token=token, quota=_default_quota_for_pool(pool_name))
         pool.add(token_info)
+        self._token_index.setdefault(token, (pool_name, token_info))
         self._track_token_change(token_info, pool_name, "state")
-        await self._save(force=True)
+        await self.flush()
         logger.info(f"Pool '{pool_name}': token added")
+        await self._notify_token_available()
         return True
 
     async def mark_asset_clear(self, token: str) -> bool:
         """记录在线资产清理时间"""
-        raw_token = token[4:] if token.startswith("sso=") else token
-        for pool in self.pools.values():
-            info = pool.get(raw_token)
-            if info:
-                info.last_asset_clear_at = int(datetime.now().timestamp() * 1000)
-                self._track_token_change(info, pool.name, "state")
-                self._schedule_save()
-                return True
-        return False
+        _, entry = self._lookup(token)
+        if not entry:
+            return False
+        pool_name, info = entry
+        info.last_asset_clear_at = int(datetime.now().timestamp() * 1000)
+        self._track_token_change(info, pool_name, "state", ("last_asset_clear_at",))
+        return True
 
     async def add_tag(self, token: str, tag: str) -> bool:
         """
@@ -659,17 +1128,15 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token[4:] if token.startswith("sso=") else token
-        for pool in self.pools.values():
-            info = pool.get(raw_token)
-            if info:
-                if tag not in info.tags:
-                    info.tags.append(tag)
-                    self._track_token_change(info, pool.name, "state")
-                    self._schedule_save()
-                    logger.debug(f"Token {raw_token[:10]}...: added tag '{tag}'")
-                return True
-        return False
+        raw_token, entry = self._lookup(token)
+        if not entry:
+            return False
+        pool_name, info = entry
+        if tag not in info.tags:
+            info.tags.append(tag)
+            self._track_token_change(info, pool_name, "state", ("tags",))
+            logger.debug(f"Token {raw_token[:10]}...: added tag '{tag}'")
+        return True
 
     async def remove_tag(self, token: str, tag: str) -> bool:
         """
@@ -682,17 +1149,15 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token[4:] if token.startswith("sso=") else token
-        for pool in self.pools.values():
-            info = pool.get(raw_token)
-            if info:
-                if tag in info.tags:
-                    info.tags.remove(tag)
-                    self._track_token_change(info, pool.name, "state")
-                    self._schedule_save()
-                    logger.debug(f"Token {raw_token[:10]}...: removed tag '{tag}'")
-                return True
-        return False
+        raw_token, entry = self._lookup(token)
+        if not entry:
+            return False
+        pool_name, info = entry
+        if tag in info.tags:
+            info.tags.remove(tag)
+            self._track_token_change(info, pool_name, "state", ("tags",))
+            logger.debug(f"Token {raw_token[:10]}...: removed tag '{tag}'")
+        return True
 
     async def remove(self, token: str) -> bool:
         """
@@ -704,15 +1169,26 @@ class TokenManager:
         Returns:
             是否成功
         """
-        for pool_name, pool in self.pools.items():
-            if pool.remove(token):
-                self._track_token_delete(token)
-                await self._save(force=True)
-                logger.info(f"Pool '{pool_name}': token removed")
-                return True
+        raw_token, entry = self._lookup(token)
+        if not entry:
+            logger.warning("Token not found for removal")
+            return False
 
-        logger.warning("Token not found for removal")
-        return False
+        pool_name = entry[0]
+        self.pools[pool_name].remove(raw_token)
+        del self._token_index[raw_token]
+        # 同一 token 可能重复出现在其他池，索引回退到下一个持有者
+        for other_name, other_pool in self.pools.items():
+            info = other_pool.get(raw_token)
+            if info:
+                self._token_index[raw_token] = (other_name, info)
+                break
+        if raw_token not in self._token_index:
+            self._load_tracker.forget(raw_token)
+        self._track_token_delete(raw_token)
+        await self.flush()
+        logger.info(f"Pool '{pool_name}': token removed")
+        return True
 
     async def reset_all(self):
         """重置所有 Token 配额"""
@@ -724,7 +1200,7 @@ class TokenManager:
                 self._track_token_change(token, pool_name, "state")
                 count += 1
 
-        await self._save(force=True)
+        await self.flush()
         logger.info(f"Reset all: {count} tokens updated")
 
     async def reset_token(self, token_str: str) -> bool:
@@ -737,20 +1213,18 @@ class TokenManager:
         Returns:
             是否成功
         """
-        raw_token = token_str.replace("sso=", "")
-
-        for pool in self.pools.values():
-            token = pool.get(raw_token)
-            if token:
-                default_quota = _default_quota_for_pool(pool.name)
-                token.reset(default_quota)
-                self._track_token_change(token, pool.name, "state")
-                await self._save(force=True)
-                logger.info(f"Token {raw_token[:10]}...: reset completed")
-                return True
+        raw_token, entry = self._lookup(token_str)
+        if not entry:
+            logger.warning(f"Token {raw_token[:10]}...: not found for reset")
+            return False
 
-        logger.warning(f"Token {raw_token[:10]}...: not found for reset")
-        return False
+        pool_name, token = entry
+        token.reset(_default_quota_for_pool(pool_name))
+        self._track_token_change(token, pool_name, "state")
+        await self.flush()
+        logger.info(f"Token {raw_token[:10]}...: reset completed")
+        await self._notify_token_available()
+        return True
 
     def get_stats(self) -> Dict[str, dict]:
         """获取统计信息"""
@@ -775,137 +1249,286 @@ class TokenManager:
             return []
         return pool.list()
 
-    async def refresh_cooling_tokens(self) -> Dict[str, int]:
+    # ========== 冷却恢复 ==========
+
+    @staticmethod
+    def _refresh_interval_hours(pool_name: str) -> float:
+        if pool_name == SUPER_POOL_NAME:
+            return get_config(
+                "token.super_refresh_interval_hours",
+                DEFAULT_SUPER_REFRESH_INTERVAL_HOURS,
+            )
+        return get_config(
+            "token.refresh_interval_hours",
+            DEFAULT_REFRESH_INTERVAL_HOURS,
+        )
+
+    @staticmethod
+    def _cooldown_probe_sec() -> float:
+        try:
+            return max(
+                0.0,
+                float(
+                    get_config("token.cooldown_probe_sec", DEFAULT_COOLDOWN_PROBE_SEC)
+                ),
+            )
+        except (TypeError, ValueError):
+            return float(DEFAULT_COOLDOWN_PROBE_SEC)
+
+    def _schedule_cooldown(
+        self, token: TokenInfo, pool_name: str, delay: Optional[float] = None
+    ):
+        """
+        登记冷却 Token 的预计恢复时间
+
+        Args:
+            token: 冷却中的 Token
+            pool_name: 所属池
+            delay: 距离恢复的秒数；None 时按上次同步时间 + 刷新间隔推算
         """
-        批量刷新 cooling 状态的 Token 配额
+        now = time.time()
+        if delay is not None:
+            due_at = now + delay
+        else:
+            due_at = self._sync_due_at(token, pool_name, now)
+
+        next_due = self._cooldowns.next_due()
+        self._cooldowns.schedule(_normalize_token(token.token), due_at)
+        if next_due is None or due_at < next_due:
+            self._cooldown_changed.set()
+
+    def _sync_due_at(self, token: TokenInfo, pool_name: str, now: float) -> float:
+        """按上次同步时间 + 刷新间隔推算的恢复时间"""
+        if token.last_sync_at is None:
+            return now
+        interval_sec = self._refresh_interval_hours(pool_name) * 3600
+        return token.last_sync_at / 1000 + interval_sec
+
+    def defer_due_cooldowns(self, delay: float) -> int:
+        """
+        未获得刷新锁时推迟本 worker 的到期条目
+
+        到期 Token 由持锁 worker 刷新，结果经变更同步到达后按新的同步时间重新登记；
+        在此之前条目推迟到按同步时间推算的恢复时间，且不早于 delay 秒后
+        （持锁 worker 异常退出时，由本 worker 在锁过期后接手）。
 
         Returns:
-            {"checked": int, "refreshed": int, "recovered": int, "expired": int}
+            推迟的 Token 数量
         """
-        # 收集需要刷新的 token
-        to_refresh: List[tuple[str, TokenInfo]] = []
-        for pool in self.pools.values():
-            if pool.name == SUPER_POOL_NAME:
-                interval_hours = get_config(
-                    "token.super_refresh_interval_hours",
-                    DEFAULT_SUPER_REFRESH_INTERVAL_HOURS,
-                )
+        now = time.time()
+        deferred = 0
+        for token_key in self._cooldowns.pop_due(now):
+            entry = self._token_index.get(token_key)
+            if not entry or entry[1].status != TokenStatus.COOLING:
+                continue
+            pool_name, token = entry
+            due_at = max(self._sync_due_at(token, pool_name, now), now + delay)
+            self._cooldowns.schedule(token_key, due_at)
+            deferred += 1
+        return deferred
+
+    def _rebuild_cooldowns(self):
+        """加载后重建恢复时间表（保留已知的恢复时间）"""
+        previous = self._cooldowns
+        self._cooldowns = CooldownSchedule()
+        for token_key, (pool_name, token) in self._token_index.items():
+            if token.status != TokenStatus.COOLING:
+                continue
+            due_at = previous.due_at(token_key)
+            if due_at is not None:
+                self._cooldowns.schedule(token_key, due_at)
             else:
-                interval_hours = get_config(
-                    "token.refresh_interval_hours",
-                    DEFAULT_REFRESH_INTERVAL_HOURS,
-                )
-            for token in pool:
-                if token.need_refresh(interval_hours):
-                    to_refresh.append((pool.name, token))
+                self._schedule_cooldown(token, pool_name)
+        self._cooldown_changed.set()
+
+    def next_cooldown_due(self) -> Optional[float]:
+        """最早的冷却恢复时间（epoch 秒），没有冷却 Token 时返回 None"""
+        return self._cooldowns.next_due()
+
+    async def wait_cooldown_due(self, max_wait: float):
+        """等待到下一个冷却 Token 到期，或恢复时间表提前时返回"""
+        self._cooldown_changed.clear()
+        next_due = self._cooldowns.next_due()
+        delay = max_wait if next_due is None else min(max_wait, next_due - time.time())
+        if delay <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._cooldown_changed.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
 
-        if not to_refresh:
-            logger.debug("Refresh check: no tokens need refresh")
-            return {"checked": 0, "refreshed": 0, "recovered": 0, "expired": 0}
+    async def _refresh_token(
+        self, pool_name: str, token_info: TokenInfo, usage_service: UsageService
+    ) -> Dict[str, bool]:
+        """
+        刷新单个 Token 的配额，并按响应登记下一次恢复时间
 
-        logger.info(f"Refresh check: found {len(to_refresh)} cooling tokens to refresh")
+        Returns:
+            {"recovered": bool, "expired": bool}
+        """
+        token_str = _normalize_token(token_info.token)
+
+        # 重试逻辑：最多 2 次重试
+        for retry in range(3):  # 0, 1, 2
+            try:
+                result = await usage_service.get(token_str)
+
+                if result and ("remainingTokens" in result or "remainingQueries" in result):
+                    new_quota = result.get("remainingTokens")
+                    if new_quota is None:
+                        new_quota = result.get("remainingQueries")
+                    if new_quota is None:
+                        break
+                    old_quota = token_info.quota
+                    old_status = token_info.status
+
+                    token_info.update_quota(new_quota)
+                    token_info.mark_synced()
+                    if token_info.status == TokenStatus.COOLING:
+                        self._schedule_cooldown(
+                            token_info, pool_name, delay=recovery_delay(result)
+                        )
+
+                    logger.info(
+                        f"Token {token_info.token[:10]}...: refreshed "
+                        f"{old_quota} -> {new_quota}, status: {old_status} -> {token_info.status}"
+                    )
 
-        # 批量并发刷新
+                    return {
+                        "recovered": new_quota > 0 and old_quota == 0,
+                        "expired": False,
+                    }
+
+                break
+
+            except Exception as e:
+                error_str = str(e)
+
+                # 检查是否为 401 错误
+                if "401" in error_str or "Unauthorized" in error_str:
+                    if retry < 2:
+                        logger.warning(
+                            f"Token {token_info.token[:10]}...: 401 error, "
+                            f"retry {retry + 1}/2..."
+                        )
+                        await asyncio.sleep(0.5)
+                        continue
+                    else:
+                        # 重试 2 次后仍然 401，标记为 expired
+                        logger.error(
+                            f"Token {token_info.token[:10]}...: 401 after 2 retries, "
+                            f"marking as expired"
+                        )
+                        token_info.status = TokenStatus.EXPIRED
+                        return {"recovered": False, "expired": True}
+                else:
+                    logger.warning(
+                        f"Token {token_info.token[:10]}...: refresh failed ({e})"
+                    )
+                    break
+
+        # 未拿到结果，稍后再探测
+        if token_info.status == TokenStatus.COOLING:
+            self._schedule_cooldown(
+                token_info, pool_name, delay=self._cooldown_probe_sec()
+            )
+        return {"recovered": False, "expired": False}
+
+    async def _refresh_tokens(
+        self, to_refresh: List[Tuple[str, TokenInfo]]
+    ) -> Dict[str, int]:
+        """并发刷新一组 Token 并保存"""
         semaphore = asyncio.Semaphore(DEFAULT_REFRESH_CONCURRENCY)
         usage_service = UsageService()
-        refreshed = 0
-        recovered = 0
-        expired = 0
 
-        async def _refresh_one(item: tuple[str, TokenInfo]) -> dict:
-            """刷新单个 token"""
-            _, token_info = item
+        async def _refresh_one(item: Tuple[str, TokenInfo]) -> Dict[str, bool]:
             async with semaphore:
-                token_str = token_info.token
-                if token_str.startswith("sso="):
-                    token_str = token_str[4:]
-
-                # 重试逻辑：最多 2 次重试
-                for retry in range(3):  # 0, 1, 2
-                    try:
-                        result = await usage_service.get(token_str)
-
-                        if result and ("remainingTokens" in result or "remainingQueries" in result):
-                            new_quota = result.get("remainingTokens")
-                            if new_quota is None:
-                                new_quota = result.get("remainingQueries")
-                            if new_quota is None:
-                                return {"recovered": False, "expired": False}
-                            old_quota = token_info.quota
-                            old_status = token_info.status
-
-                            token_info.update_quota(new_quota)
-                            token_info.mark_synced()
-
-                            logger.info(
-                                f"Token {token_info.token[:10]}...: refreshed "
-                                f"{old_quota} -> {new_quota}, status: {old_status} -> {token_info.status}"
-                            )
+                return await self._refresh_token(item[0], item[1], usage_service)
 
-                            return {
-                                "recovered": new_quota > 0 and old_quota == 0,
-                                "expired": False,
-                            }
-
-                        return {"recovered": False, "expired": False}
-
-                    except Exception as e:
-                        error_str = str(e)
-
-                        # 检查是否为 401 错误
-                        if "401" in error_str or "Unauthorized" in error_str:
-                            if retry < 2:
-                                logger.warning(
-                                    f"Token {token_info.token[:10]}...: 401 error, "
-                                    f"retry {retry + 1}/2..."
-                                )
-                                await asyncio.sleep(0.5)
-                                continue
-                            else:
-                                # 重试 2 次后仍然 401，标记为 expired
-                                logger.error(
-                                    f"Token {token_info.token[:10]}...: 401 after 2 retries, "
-                                    f"marking as expired"
-                                )
-                                token_info.status = TokenStatus.EXPIRED
-                                return {"recovered": False, "expired": True}
-                        else:
-                            logger.warning(
-                                f"Token {token_info.token[:10]}...: refresh failed ({e})"
-                            )
-                            return {"recovered": False, "expired": False}
-
-                return {"recovered": False, "expired": False}
-
-        # 批量处理
+        recovered = 0
+        expired = 0
         for i in range(0, len(to_refresh), DEFAULT_REFRESH_BATCH_SIZE):
             batch = to_refresh[i : i + DEFAULT_REFRESH_BATCH_SIZE]
             results = await asyncio.gather(*[_refresh_one(t) for t in batch])
-            refreshed += len(batch)
-            recovered += sum(r["recovered"] for r in results)
+            batch_recovered = sum(r["recovered"] for r in results)
+            recovered += batch_recovered
             expired += sum(r["expired"] for r in results)
 
+            for pool_name, token_info in batch:
+                self._track_token_change(
+                    token_info, pool_name, "state", REFRESH_FIELDS
+                )
+            if batch_recovered:
+                # 逐批唤醒等待者；共享状态下需先写入 Redis 配额 ZSet 才能被选中
+                if self._shared is not None:
+                    await self.flush()
+                await self._notify_token_available()
+
             # 批次间延迟
             if i + DEFAULT_REFRESH_BATCH_SIZE < len(to_refresh):
                 await asyncio.sleep(1)
 
-        for pool_name, token_info in to_refresh:
-            self._track_token_change(token_info, pool_name, "state")
-        await self._save(force=True)
-
-        logger.info(
-            f"Refresh completed: "
-            f"checked={len(to_refresh)}, refreshed={refreshed}, "
-            f"recovered={recovered}, expired={expired}"
-        )
+        await self.flush()
 
         return {
             "checked": len(to_refresh),
-            "refreshed": refreshed,
+            "refreshed": len(to_refresh),
             "recovered": recovered,
             "expired": expired,
         }
 
+    async def refresh_due_tokens(self) -> Dict[str, int]:
+        """
+        刷新已到预计恢复时间的冷却 Token
+
+        Returns:
+            {"checked": int, "refreshed": int, "recovered": int, "expired": int}
+        """
+        to_refresh: List[Tuple[str, TokenInfo]] = []
+        for token_key in self._cooldowns.pop_due(time.time()):
+            entry = self._token_index.get(token_key)
+            if entry and entry[1].status == TokenStatus.COOLING:
+                to_refresh.append(entry)
+
+        if not to_refresh:
+            return {"checked": 0, "refreshed": 0, "recovered": 0, "expired": 0}
+
+        logger.info(f"Cooldown: {len(to_refresh)} tokens due for refresh")
+        result = await self._refresh_tokens(to_refresh)
+        logger.info(
+            f"Cooldown refresh completed: "
+            f"checked={result['checked']}, recovered={result['recovered']}, "
+            f"expired={result['expired']}"
+        )
+        return result
+
+    async def refresh_cooling_tokens(self) -> Dict[str, int]:
+        """
+        批量刷新所有达到刷新间隔的 cooling Token（全量扫描，供手动触发）
+
+        Returns:
+            {"checked": int, "refreshed": int, "recovered": int, "expired": int}
+        """
+        to_refresh: List[Tuple[str, TokenInfo]] = []
+        for pool in self.pools.values():
+            interval_hours = self._refresh_interval_hours(pool.name)
+            for token in pool:
+                if token.need_refresh(interval_hours):
+                    to_refresh.append((pool.name, token))
+
+        if not to_refresh:
+            logger.debug("Refresh check: no tokens need refresh")
+            return {"checked": 0, "refreshed": 0, "recovered": 0, "expired": 0}
+
+        logger.info(f"Refresh check: found {len(to_refresh)} cooling tokens to refresh")
+        result = await self._refresh_tokens(to_refresh)
+        logger.info(
+            f"Refresh completed: "
+            f"checked={result['checked']}, refreshed={result['refreshed']}, "
+            f"recovered={result['recovered']}, expired={result['expired']}"
+        )
+        return result
+
 
 # 便捷函数
 async def get_token_manager() -> TokenManager:
@@ -9,7 +9,7 @@ Token 数据模型
 """
 
 from enum import Enum
-from typing import Optional, List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -21,7 +21,6 @@ SUPER_DEFAULT_QUOTA = 140
 # 失败阈值
 FAIL_THRESHOLD = 5
 
-
 class TokenStatus(str, Enum):
     """Token 状态"""
 
@@ -44,17 +43,25 @@ EFFORT_COST = {
 }
 
 
-class TokenInfo(BaseModel):
-    """Token 信息"""
+def _now_ms() -> int:
+    return int(datetime.now().timestamp() * 1000)
+
+
+def _opt_int(value: Any) -> Optional[int]:
+    if value is None or type(value) is int:
+        return value
+    return int(value)
+
+
+class TokenRecord(BaseModel):
+    """Token 数据校验模型（仅用于 API 边界的输入校验与序列化）"""
 
     token: str
     status: TokenStatus = TokenStatus.ACTIVE
     quota: int = BASIC__DEFAULT_QUOTA
 
     # 统计
-    created_at: int = Field(
-        default_factory=lambda: int(datetime.now().timestamp() * 1000)
-    )
+    created_at: int = Field(default_factory=_now_ms)
     last_used_at: Optional[int] = None
     use_count: int = 0
 
@@ -71,6 +78,128 @@ class TokenInfo(BaseModel):
     note: str = ""
     last_asset_clear_at: Optional[int] = None
 
+
+# 持久化字段（顺序与 TokenRecord 一致）
+TOKEN_FIELDS = tuple(TokenRecord.model_fields.keys())
+
+
+class TokenInfo:
+    """
+    Token 运行时信息
+
+    使用 __slots__ 的轻量对象，池内每个 Token 常驻内存，避免 pydantic 模型的
+    实例字典与校验开销；外部输入在 API 边界由 TokenRecord 校验。
+    status/quota 变更时通知所属 TokenPool 更新索引。
+    """
+
+    __slots__ = (
+        "token",
+        "_status",
+        "_quota",
+        "created_at",
+        "last_used_at",
+        "use_count",
+        "fail_count",
+        "last_fail_at",
+        "last_fail_reason",
+        "last_sync_at",
+        "tags",
+        "note",
+        "last_asset_clear_at",
+        "_pool",
+    )
+
+    def __init__(
+        self,
+        token: str,
+        status: Any = TokenStatus.ACTIVE,
+        quota: int = BASIC__DEFAULT_QUOTA,
+        created_at: Optional[int] = None,
+        last_used_at: Optional[int] = None,
+        use_count: int = 0,
+        fail_count: int = 0,
+        last_fail_at: Optional[int] = None,
+        last_fail_reason: Optional[str] = None,
+        last_sync_at: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        note: Optional[str] = "",
+        last_asset_clear_at: Optional[int] = None,
+        **_extra: Any,
+    ):
+        if not isinstance(token, str):
+            raise TypeError("token must be a string")
+        # 所属 TokenPool（运行时引用，不参与序列化）
+        self._pool = None
+        self.token = token
+        self._status = TokenStatus(status)
+        self._quota = int(quota)
+        self.created_at = _now_ms() if created_at is None else int(created_at)
+        self.last_used_at = _opt_int(last_used_at)
+        self.use_count = int(use_count or 0)
+        self.fail_count = int(fail_count or 0)
+        self.last_fail_at = _opt_int(last_fail_at)
+        self.last_fail_reason = last_fail_reason
+        self.last_sync_at = _opt_int(last_sync_at)
+        self.tags = list(tags) if tags else []
+        self.note = note or ""
+        self.last_asset_clear_at = _opt_int(last_asset_clear_at)
+
+    @property
+    def status(self) -> TokenStatus:
+        return self._status
+
+    @status.setter
+    def status(self, value: TokenStatus):
+        value = TokenStatus(value)
+        if value is self._status:
+            return
+        self._status = value
+        if self._pool is not None:
+            self._pool._reindex(self)
+
+    @property
+    def quota(self) -> int:
+        return self._quota
+
+    @quota.setter
+    def quota(self, value: int):
+        if value == self._quota:
+            return
+        self._quota = value
+        if self._pool is not None:
+            self._pool._reindex(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """序列化为持久化字典（字段同 TokenRecord）"""
+        return {
+            "token": self.token,
+            "status": self._status,
+            "quota": self._quota,
+            "created_at": self.created_at,
+            "last_used_at": self.last_used_at,
+            "use_count": self.use_count,
+            "fail_count": self.fail_count,
+            "last_fail_at": self.last_fail_at,
+            "last_fail_reason": self.last_fail_reason,
+            "last_sync_at": self.last_sync_at,
+            "tags": list(self.tags),
+            "note": self.note,
+            "last_asset_clear_at": self.last_asset_clear_at,
+        }
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, TokenInfo):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (
+            f"TokenInfo(token={self.token[:10]!r}..., status={self._status.value}, "
+            f"quota={self._quota})"
+        )
+
     def is_available(self) -> bool:
         """检查是否可用（状态正常且配额 > 0）"""
         return self.status == TokenStatus.ACTIVE and self.quota > 0
@@ -194,6 +323,8 @@ class TokenPoolStats(BaseModel):
 __all__ = [
     "TokenStatus",
     "TokenInfo",
+    "TokenRecord",
+    "TOKEN_FIELDS",
     "TokenPoolStats",
     "EffortType",
     "EFFORT_COST",
@@ -1,10 +1,20 @@
 """Token 池管理"""
 
 import random
-from typing import Dict, List, Optional, Iterator
+from bisect import bisect_left, insort
+from typing import TYPE_CHECKING, Dict, List, Optional, Iterator, Tuple
 
 from app.services.token.models import TokenInfo, TokenStatus, TokenPoolStats
 
+if TYPE_CHECKING:
+    from app.services.token.load import TokenLoadTracker
+
+
+# 带 exclude 选择时的随机采样次数，超过后退化为桶内过滤
+EXCLUDE_SAMPLE_ATTEMPTS = 8
+# least_loaded 策略每次比较的候选数（power of two choices）
+LEAST_LOADED_CHOICES = 2
+
 
 class TokenPool:
     """Token 池（管理一组 Token）"""
@@ -13,16 +23,37 @@ class TokenPool:
         self.name = name
         self._tokens: Dict[str, TokenInfo] = {}
 
+        # 可用 Token 索引: quota -> 同额度 Token 列表
+        self._buckets: Dict[int, List[TokenInfo]] = {}
+        # token -> (quota, 桶内下标)，用于 O(1) 移除
+        self._bucket_pos: Dict[str, Tuple[int, int]] = {}
+        # 升序 quota 键，选择时从尾部（最大额度）开始
+        self._quota_keys: List[int] = []
+        # 全部可用 Token 的扁平列表，用于均匀随机采样
+        self._available: List[TokenInfo] = []
+        self._available_pos: Dict[str, int] = {}
+
     def add(self, token: TokenInfo):
         """添加 Token"""
+        existing = self._tokens.get(token.token)
+        if existing is token:
+            self._reindex(token)
+            return
+        if existing is not None:
+            self._index_remove(existing.token)
+            existing._pool = None
         self._tokens[token.token] = token
+        token._pool = self
+        self._index_add(token)
 
     def remove(self, token_str: str) -> bool:
         """删除 Token"""
-        if token_str in self._tokens:
-            del self._tokens[token_str]
-            return True
-        return False
+        token = self._tokens.pop(token_str, None)
+        if token is None:
+            return False
+        self._index_remove(token_str)
+        token._pool = None
+        return True
 
     def get(self, token_str: str) -> Optional[TokenInfo]:
         """获取 Token"""
@@ -35,31 +66,76 @@ class TokenPool:
         1. 选择 active 状态且有配额的 token
         2. 优先选择剩余额度最多的
         3. 如果额度相同，随机选择（避免并发冲突）
+
+        基于额度分桶索引，无需全量扫描；exclude 中的 token 在桶内跳过，
+        整桶被排除时回退到下一档额度。
+        """
+        for quota in reversed(self._quota_keys):
+            token = self._pick(self._buckets[quota], exclude)
+            if token is not None:
+                return token
+        return None
+
+    def select_least_loaded(
+        self, load: "TokenLoadTracker", exclude: set = None
+    ) -> Optional[TokenInfo]:
         """
-        # 选择 token
-        available = [
-            t
-            for t in self._tokens.values()
-            if t.status == TokenStatus.ACTIVE and t.quota > 0
-            and (not exclude or t.token not in exclude)
-        ]
+        负载感知选择（power of two choices）
 
+        从可用 Token 中随机抽取若干候选，选择调度代价最小的一个：
+        在途请求数、剩余额度和近期延迟共同决定代价（见 TokenLoadTracker.cost）。
+        """
+        available = self._available
         if not available:
             return None
 
-        # 找到最大额度
-        max_quota = max(t.quota for t in available)
-
-        # 筛选最大额度
-        candidates = [t for t in available if t.quota == max_quota]
-
-        # 随机选择
+        candidates: List[TokenInfo] = []
+        attempts = LEAST_LOADED_CHOICES + (len(exclude) if exclude else 0)
+        for _ in range(min(attempts, len(available) * 2)):
+            token = random.choice(available)
+            if exclude and token.token in exclude:
+                continue
+            if all(c is not token for c in candidates):
+                candidates.append(token)
+            if len(candidates) >= LEAST_LOADED_CHOICES:
+                break
+
+        if not candidates:
+            if not exclude:
+                return None
+            candidates = [t for t in available if t.token not in exclude]
+            if not candidates:
+                return None
+            candidates = random.sample(
+                candidates, min(LEAST_LOADED_CHOICES, len(candidates))
+            )
+
+        return min(candidates, key=load.cost)
+
+    @staticmethod
+    def _pick(bucket: List[TokenInfo], exclude: set = None) -> Optional[TokenInfo]:
+        """从同额度桶中随机选择一个未被排除的 Token"""
+        if not exclude:
+            return random.choice(bucket)
+
+        for _ in range(min(EXCLUDE_SAMPLE_ATTEMPTS, len(bucket))):
+            token = random.choice(bucket)
+            if token.token not in exclude:
+                return token
+
+        candidates = [t for t in bucket if t.token not in exclude]
+        if not candidates:
+            return None
         return random.choice(candidates)
 
     def count(self) -> int:
         """Token 数量"""
         return len(self._tokens)
 
+    def available_count(self) -> int:
+        """可用 Token 数量"""
+        return len(self._bucket_pos)
+
     def list(self) -> List[TokenInfo]:
         """获取所有 Token"""
         return list(self._tokens.values())
@@ -85,9 +161,66 @@ class TokenPool:
 
         return stats
 
+    # ========== 索引维护 ==========
+
+    def _index_add(self, token: TokenInfo):
+        """将可用 Token 加入额度桶"""
+        if not token.is_available():
+            return
+        quota = token.quota
+        bucket = self._buckets.get(quota)
+        if bucket is None:
+            bucket = []
+            self._buckets[quota] = bucket
+            insort(self._quota_keys, quota)
+        self._bucket_pos[token.token] = (quota, len(bucket))
+        bucket.append(token)
+        self._available_pos[token.token] = len(self._available)
+        self._available.append(token)
+
+    def _index_remove(self, token_str: str):
+        """从额度桶移除 Token（与桶尾交换后弹出）"""
+        entry = self._bucket_pos.pop(token_str, None)
+        if entry is None:
+            return
+        quota, idx = entry
+        bucket = self._buckets[quota]
+        last = bucket.pop()
+        if idx < len(bucket):
+            bucket[idx] = last
+            self._bucket_pos[last.token] = (quota, idx)
+        if not bucket:
+            del self._buckets[quota]
+            del self._quota_keys[bisect_left(self._quota_keys, quota)]
+
+        pos = self._available_pos.pop(token_str)
+        last = self._available.pop()
+        if pos < len(self._available):
+            self._available[pos] = last
+            self._available_pos[last.token] = pos
+
+    def _reindex(self, token: TokenInfo):
+        """Token 的 status/quota 变更后同步索引"""
+        if self._tokens.get(token.token) is not token:
+            return
+        current = self._bucket_pos.get(token.token)
+        target = token.quota if token.is_available() else None
+        if current is not None and current[0] == target:
+            return
+        if current is not None:
+            self._index_remove(token.token)
+        if target is not None:
+            self._index_add(token)
+
     def _rebuild_index(self):
-        """重建索引（预留接口，用于加载时调用）"""
-        pass
+        """重建索引（加载时调用）"""
+        self._buckets = {}
+        self._bucket_pos = {}
+        self._quota_keys = []
+        self._available = []
+        self._available_pos = {}
+        for token in self._tokens.values():
+            self._index_add(token)
 
     def __iter__(self) -> Iterator[TokenInfo]:
         return iter(self._tokens.values())
@@ -1,6 +1,7 @@
 """Token 刷新调度器"""
 
 import asyncio
+import time
 from typing import Optional
 
 from app.core.logger import logger
@@ -8,6 +9,12 @@ from app.core.storage import get_storage, StorageError, RedisStorage
 from app.services.token.manager import get_token_manager
 
 
+# Redis 刷新锁过期时间（秒）
+REFRESH_LOCK_TIMEOUT_SEC = 300
+# 出错时的重试间隔（秒）
+LOCK_RETRY_SEC = 30
+
+
 class TokenRefreshScheduler:
     """Token 自动刷新调度器"""
 
@@ -18,11 +25,25 @@ class TokenRefreshScheduler:
         self._running = False
 
     async def _refresh_loop(self):
-        """刷新循环"""
-        logger.info(f"Scheduler: started (interval: {self.interval_hours}h)")
+        """
+        刷新循环
+
+        按冷却 Token 的预计恢复时间唤醒，只刷新已到期的 Token；
+        没有冷却 Token 时最长空闲 interval_hours。
+        未获得刷新锁时到期条目由持锁 worker 处理，本 worker 将其推迟
+        （见 TokenManager.defer_due_cooldowns），不会在锁上反复重试。
+        """
+        logger.info(f"Scheduler: started (max idle: {self.interval_hours}h)")
 
         while self._running:
             try:
+                manager = await get_token_manager()
+                await manager.wait_cooldown_due(self.interval_seconds)
+
+                next_due = manager.next_cooldown_due()
+                if next_due is None or next_due > time.time():
+                    continue
+
                 storage = get_storage()
                 lock_acquired = False
                 lock = None
@@ -31,7 +52,7 @@ class TokenRefreshScheduler:
                     # Redis: non-blocking lock to avoid multi-worker duplication
                     lock_key = "grok2api:lock:token_refresh"
                     lock = storage.redis.lock(
-                        lock_key, timeout=self.interval_seconds + 60, blocking_timeout=0
+                        lock_key, timeout=REFRESH_LOCK_TIMEOUT_SEC, blocking_timeout=0
                     )
                     lock_acquired = await lock.acquire(blocking=False)
                 else:
@@ -42,22 +63,16 @@ class TokenRefreshScheduler:
                         lock_acquired = False
 
                 if not lock_acquired:
-                    logger.info("Scheduler: skipped (lock not acquired)")
-                    await asyncio.sleep(self.interval_seconds)
+                    # 其他 worker 正在刷新，其结果经变更同步到达
+                    deferred = manager.defer_due_cooldowns(REFRESH_LOCK_TIMEOUT_SEC)
+                    logger.debug(
+                        f"Scheduler: skipped (lock not acquired), deferred {deferred} tokens"
+                    )
+                    await manager.reload_if_stale()
                     continue
 
                 try:
-                    logger.info("Scheduler: starting token refresh...")
-                    manager = await get_token_manager()
-                    result = await manager.refresh_cooling_tokens()
-
-                    logger.info(
-                        f"Scheduler: refresh completed - "
-                        f"checked={result['checked']}, "
-                        f"refreshed={result['refreshed']}, "
-                        f"recovered={result['recovered']}, "
-                        f"expired={result['expired']}"
-                    )
+                    await manager.refresh_due_tokens()
                 finally:
                     if lock is not None and lock_acquired:
                         try:
@@ -65,13 +80,11 @@ class TokenRefreshScheduler:
                         except Exception:
                             pass
 
-                await asyncio.sleep(self.interval_seconds)
-
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Scheduler: refresh error - {e}")
-                await asyncio.sleep(self.interval_seconds)
+                await asyncio.sleep(LOCK_RETRY_SEC)
 
     def start(self):
         """启动调度器"""
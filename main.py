@@ -31,6 +31,11 @@ from app.core.auth import verify_api_key_if_private  # noqa: E402
 from app.core.config import get_config  # noqa: E402
 from app.core.logger import logger, setup_logging  # noqa: E402
 from app.core.exceptions import register_exception_handlers  # noqa: E402
+from app.core.lifecycle import (  # noqa: E402
+    DEFAULT_DRAIN_TIMEOUT_SEC,
+    install_shutdown_drain,
+    wait_for_streams,
+)
 from app.core.response_middleware import ResponseLoggerMiddleware  # noqa: E402
 from app.api.v1.chat import router as chat_router  # noqa: E402
 from app.api.v1.image import router as image_router  # noqa: E402
@@ -65,7 +70,15 @@ async def lifespan(app: FastAPI):
     logger.info(f"Platform: {platform.system()} {platform.release()}")
     logger.info(f"Python: {sys.version.split()[0]}")
 
-    # 4. 启动 Token 刷新调度器
+    # 4. 停机排空：由 uvicorn 关闭监听并等待在途请求（有截止时间）
+    drain_timeout = get_config("app.shutdown_drain_timeout_sec", DEFAULT_DRAIN_TIMEOUT_SEC)
+    try:
+        drain_timeout = float(drain_timeout)
+    except Exception:
+        drain_timeout = float(DEFAULT_DRAIN_TIMEOUT_SEC)
+    install_shutdown_drain(drain_timeout)
+
+    # 5. 启动 Token 刷新调度器
     refresh_enabled = get_config("token.auto_refresh", True)
     if refresh_enabled:
         basic_interval = get_config("token.refresh_interval_hours", 8)
@@ -80,15 +93,34 @@ async def lifespan(app: FastAPI):
     # 关闭
     logger.info("Shutting down Grok2API...")
 
-    from app.core.storage import StorageFactory
-
-    if StorageFactory._instance:
-        await StorageFactory._instance.close()
+    # 1. 等待仍在收尾的流（超时被取消的请求释放租约），其他服务器下等待在途流结束
+    if await wait_for_streams(drain_timeout):
+        logger.info("All active streams drained.")
 
+    # 2. 停止刷新调度器，避免关闭期间产生新的变更
     if refresh_enabled:
         scheduler = get_scheduler()
         scheduler.stop()
 
+    # 3. 最后一次落盘 Token 变更
+    from app.services.token.manager import TokenManager
+
+    if TokenManager._instance:
+        if not await TokenManager._instance.close():
+            logger.error("Pending token changes were not saved before shutdown.")
+
+    # 4. 关闭上游连接池与存储
+    from app.services.reverse.utils.multiplex import close_multiplexer
+    from app.services.reverse.utils.session import close_session_pool
+
+    await close_multiplexer()
+    await close_session_pool()
+
+    from app.core.storage import StorageFactory
+
+    if StorageFactory._instance:
+        await StorageFactory._instance.close()
+
 
 def create_app() -> FastAPI:
     """创建 FastAPI 应用"""
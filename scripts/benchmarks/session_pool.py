@@ -0,0 +1,181 @@
+"""
+上游会话池延迟基准
+
+在本地启动 HTTPS 替身服务（自签名证书，前置可配置往返延迟的 TCP 转发），
+对比每个请求新建 ResettableSession（每次都要 TCP + TLS 握手）与从进程级
+会话池租用（复用已建立的连接）的请求延迟。
+
+用法:
+    python scripts/benchmarks/session_pool.py [--requests 200] [--concurrency 4] [--rtt-ms 10]
+
+需要系统可用的 openssl 命令生成临时证书。
+"""
+
+import argparse
+import asyncio
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.services.reverse.utils.session import (  # noqa: E402
+    ResettableSession,
+    SessionPool,
+)
+
+BODY = b'{"remainingTokens": 80}'
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: application/json\r\n"
+    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n"
+    b"\r\n" + BODY
+)
+
+
+def make_cert(workdir: Path) -> ssl.SSLContext:
+    cert, key = workdir / "cert.pem", workdir / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key), "-out", str(cert), "-days", "1",
+            "-subj", "/CN=localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    ctx.load_cert_chain(cert, key)
+    ctx.set_alpn_protocols(["http/1.1"])
+    return ctx
+
+
+async def handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    """极简 HTTP/1.1 keep-alive 服务"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            writer.write(RESPONSE)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_delay_proxy(target_port: int, rtt_ms: float):
+    """TCP 转发，每个方向各加半个往返延迟，模拟到上游的网络距离"""
+    half = rtt_ms / 2000.0
+
+    async def pipe(reader, writer):
+        try:
+            while data := await reader.read(65536):
+                if half:
+                    await asyncio.sleep(half)
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        up_reader, up_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(
+            pipe(client_reader, up_writer), pipe(up_reader, client_writer)
+        )
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def run(label: str, acquire, url: str, total: int, concurrency: int) -> dict:
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            async with acquire() as session:
+                response = await session.get(url, verify=False, timeout=10)
+                assert response.status_code == 200
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "label": label,
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "rps": total / elapsed,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=10.0)
+    parser.add_argument("--impersonate", default="chrome136")
+    args = parser.parse_args()
+
+    ctx = make_cert(Path(tempfile.mkdtemp()))
+    server = await asyncio.start_server(handle_http, "127.0.0.1", 0, ssl=ctx)
+    proxy = await start_delay_proxy(server.sockets[0].getsockname()[1], args.rtt_ms)
+    url = f"https://localhost:{proxy.sockets[0].getsockname()[1]}/rate-limits"
+
+    pool = SessionPool()
+    results = [
+        await run(
+            "per-request",
+            lambda: ResettableSession(impersonate=args.impersonate),
+            url,
+            args.requests,
+            args.concurrency,
+        ),
+        await run(
+            "pooled",
+            lambda: pool.acquire(impersonate=args.impersonate, proxy=""),
+            url,
+            args.requests,
+            args.concurrency,
+        ),
+    ]
+    stats = pool.stats()
+    await pool.close()
+    proxy.close()
+    server.close()
+
+    print(
+        f"requests={args.requests} concurrency={args.concurrency} rtt={args.rtt_ms}ms "
+        f"pool_created={stats['created']} pool_reused={stats['reused']}"
+    )
+    print(f"{'session':>12} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'req/s':>9}")
+    for r in results:
+        print(
+            f"{r['label']:>12} {r['mean']:>9.2f} {r['p50']:>9.2f} "
+            f"{r['p95']:>9.2f} {r['rps']:>9.1f}"
+        )
+    old, new = results
+    print(f"{'speedup':>12} {old['mean'] / new['mean']:>8.1f}x {'':>9} {'':>9} {new['rps'] / old['rps']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+"""
+SQLStorage 用量写入基准
+
+对比全行 upsert（state 路径，含 JSON 序列化与 data_hash）与用量快速路径
+（窄 UPDATE：PostgreSQL 走 UNNEST，其他方言走 executemany）。
+
+用法:
+    python scripts/benchmarks/sql_usage_update.py [--url URL] [--size 5000] [--updates 2000]
+
+默认使用临时 SQLite 文件作为本地替身；传入 postgresql+asyncpg:// 或
+mysql+aiomysql:// 地址可测试对应方言。基准 Token 以本次运行唯一的前缀增量写入
+tokens 表，结束时只删除这些 Token，表中已有数据不受影响（仍建议使用测试库）。
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.core.storage import SQLStorage  # noqa: E402
+
+
+def build_tokens(size: int) -> list:
+    now = int(time.time() * 1000)
+    run_id = uuid.uuid4().hex[:12]
+    return [
+        {
+            "token": f"bench-{run_id}-{i:06d}-" + "x" * 35,
+            "status": "active",
+            "quota": 80,
+            "created_at": now,
+            "use_count": 0,
+            "fail_count": 0,
+            "tags": [],
+            "note": "",
+        }
+        for i in range(size)
+    ]
+
+
+def build_updates(tokens: list, count: int, kind: str) -> list:
+    now = int(time.time() * 1000)
+    updates = []
+    for token in random.sample(tokens, count):
+        item = dict(token)
+        item["quota"] = random.randint(1, 79)
+        item["use_count"] = random.randint(1, 100)
+        item["last_used_at"] = now
+        item["pool_name"] = "ssoBasic"
+        item["_update_kind"] = kind
+        updates.append(item)
+    return updates
+
+
+def bench_rows(storage: SQLStorage, updates: list) -> tuple:
+    """仅统计行构建（序列化）开销"""
+    start = time.perf_counter()
+    for item in updates:
+        storage._token_to_row(item, "ssoBasic")
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    for item in updates:
+        storage._token_to_usage_row(item)
+    narrow = time.perf_counter() - start
+    return full * 1000, narrow * 1000
+
+
+async def bench_write(storage: SQLStorage, updates: list) -> float:
+    start = time.perf_counter()
+    await storage.save_tokens_delta(updates)
+    return (time.perf_counter() - start) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="")
+    parser.add_argument("--size", type=int, default=5_000)
+    parser.add_argument("--updates", type=int, default=2_000)
+    args = parser.parse_args()
+
+    url = args.url
+    if not url:
+        db_path = Path(tempfile.mkdtemp()) / "bench.db"
+        url = f"sqlite+aiosqlite:///{db_path}"
+
+    storage = SQLStorage(url)
+    tokens = build_tokens(args.size)
+    try:
+        # 增量写入（save_tokens 是全量替换，会删除表中其他 Token）
+        await storage.save_tokens_delta(
+            [{**token, "pool_name": "ssoBasic"} for token in tokens]
+        )
+
+        full_rows, narrow_rows = bench_rows(
+            storage, build_updates(tokens, args.updates, "usage")
+        )
+        try:
+            full_ms = await bench_write(
+                storage, build_updates(tokens, args.updates, "state")
+            )
+            full_text = f"{full_ms:>10.1f} ms"
+        except Exception as e:
+            full_ms = None
+            full_text = f"{'n/a':>13} ({type(e).__name__})"
+        narrow_ms = await bench_write(
+            storage, build_updates(tokens, args.updates, "usage")
+        )
+
+        print(f"dialect={storage.dialect} tokens={args.size} updates={args.updates}")
+        print(f"{'':>14} {'rows':>10} {'write':>13}")
+        print(f"{'full upsert':>14} {full_rows:>7.1f} ms {full_text}")
+        print(f"{'usage update':>14} {narrow_rows:>7.1f} ms {narrow_ms:>10.1f} ms")
+        if full_ms:
+            print(f"{'speedup':>14} {full_rows / narrow_rows:>9.1f}x {full_ms / narrow_ms:>12.1f}x")
+    finally:
+        await storage.save_tokens_delta([], [token["token"] for token in tokens])
+        await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
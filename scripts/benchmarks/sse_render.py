@@ -0,0 +1,128 @@
+"""
+SSE chunk 渲染基准
+
+对比旧版 _sse（每块构建完整 dict -> orjson.dumps -> decode -> f-string，再由
+StreamingResponse 编码回 bytes）与预渲染模板（前缀/后缀字节每个响应只渲染一次，
+每块只拼接 JSON 转义后的 content）：
+- 单块渲染耗时
+- 回放 fixtures/app_chat_stream.jsonl 时 StreamProcessor.process 的吞吐
+
+用法:
+    python scripts/benchmarks/sse_render.py [--repeat 200] [--fixture PATH]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import orjson
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.core.config import _load_defaults, config  # noqa: E402
+from app.services.grok.services.chat import StreamProcessor  # noqa: E402
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "app_chat_stream.jsonl"
+SAMPLE_TOKENS = [" the", " congestion", " window", "\n\n", ' "quoted"', " 拥塞窗口"]
+
+
+class LegacyStreamProcessor(StreamProcessor):
+    """旧版 _sse，末尾 encode 对应 StreamingResponse 对 str 块的编码"""
+
+    def _sse(self, content: str = "", role: str = None, finish: str = None) -> bytes:
+        delta = {}
+        if role:
+            delta["role"] = role
+            delta["content"] = ""
+        elif content:
+            delta["content"] = content
+
+        chunk = {
+            "id": self.response_id or f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+            "system_fingerprint": self.fingerprint,
+            "choices": [
+                {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish}
+            ],
+        }
+        return f"data: {orjson.dumps(chunk).decode()}\n\n".encode()
+
+
+def bench_render(repeat: int) -> list:
+    """交替计时、多轮取最小值，返回各实现的单块纳秒"""
+    procs = []
+    for cls in (LegacyStreamProcessor, StreamProcessor):
+        proc = cls("grok-4", "", show_think=True)
+        proc.response_id = "3f1c9a52-7d4e-4b8a-9c61-2e5f0d8b7a14"
+        proc.fingerprint = "Gx3kP9qL2vR8sT1wY5zB7cD4fH6jK0mN"
+        procs.append(proc)
+
+    rounds = 1000
+    best = [float("inf")] * len(procs)
+    for _ in range(repeat):
+        for i, proc in enumerate(procs):
+            sse = proc._sse
+            start = time.perf_counter_ns()
+            for _ in range(rounds):
+                for token in SAMPLE_TOKENS:
+                    sse(token)
+            elapsed = time.perf_counter_ns() - start
+            best[i] = min(best[i], elapsed / (rounds * len(SAMPLE_TOKENS)))
+    return best
+
+
+async def _replay(lines: list):
+    for line in lines:
+        yield line
+
+
+async def bench_stream(lines: list, repeat: int) -> list:
+    """返回各实现的 (chunks/s, MB/s)"""
+    results = []
+    best = {}
+    for _ in range(max(1, repeat // 10)):
+        for cls in (LegacyStreamProcessor, StreamProcessor):
+            chunks = size = 0
+            start = time.perf_counter_ns()
+            async for chunk in cls("grok-4", "", show_think=True).process(_replay(lines)):
+                chunks += 1
+                size += len(chunk)
+            elapsed = (time.perf_counter_ns() - start) / 1e9
+            prev = best.get(cls)
+            if prev is None or elapsed < prev[0]:
+                best[cls] = (elapsed, chunks, size)
+    for cls in (LegacyStreamProcessor, StreamProcessor):
+        elapsed, chunks, size = best[cls]
+        results.append((chunks / elapsed, size / elapsed / 1e6))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+    # 仅使用默认配置，不连接存储
+    config._config = _load_defaults()
+
+    legacy, template = bench_render(max(1, args.repeat // 10))
+    print(f"{'stage':>16} {'legacy':>12} {'template':>12} {'speedup':>8}")
+    print(f"{'_sse ns/chunk':>16} {legacy:>12.0f} {template:>12.0f} {legacy / template:>7.2f}x")
+
+    lines = [line for line in args.fixture.read_bytes().split(b"\n") if line]
+    (legacy_cps, legacy_mbs), (tpl_cps, tpl_mbs) = asyncio.run(
+        bench_stream(lines, args.repeat)
+    )
+    print(f"{'stream chunks/s':>16} {legacy_cps:>12.0f} {tpl_cps:>12.0f} {tpl_cps / legacy_cps:>7.2f}x")
+    print(f"{'stream MB/s':>16} {legacy_mbs:>12.1f} {tpl_mbs:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+BaseStorage.save_tokens_delta 合并基准
+
+对比旧版逐条线性查找与按池建索引的 merge_token_delta，
+默认 20k Token、5k 更新、200 删除。
+
+用法:
+    python scripts/benchmarks/storage_delta_merge.py [--size 20000] [--updates 5000]
+"""
+
+import argparse
+import copy
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.core.storage import merge_token_delta  # noqa: E402
+
+
+def legacy_merge(existing: dict, updated: list, deleted: list) -> dict:
+    """旧版实现: 每条更新线性扫描所在池"""
+    deleted_set = set(deleted or [])
+    if deleted_set:
+        for pool_name, tokens in list(existing.items()):
+            filtered = []
+            for item in tokens:
+                token_str = item if isinstance(item, str) else item.get("token")
+                if token_str and token_str in deleted_set:
+                    continue
+                filtered.append(item)
+            existing[pool_name] = filtered
+
+    for item in updated or []:
+        pool_name = item.get("pool_name")
+        token_str = item.get("token")
+        pool_list = existing.setdefault(pool_name, [])
+        normalized = {
+            k: v for k, v in item.items() if k not in ("pool_name", "_update_kind")
+        }
+        replaced = False
+        for idx, current in enumerate(pool_list):
+            if isinstance(current, str):
+                if current == token_str:
+                    pool_list[idx] = normalized
+                    replaced = True
+                    break
+            elif isinstance(current, dict) and current.get("token") == token_str:
+                pool_list[idx] = normalized
+                replaced = True
+                break
+        if not replaced:
+            pool_list.append(normalized)
+    return existing
+
+
+def build(size: int, updates: int, deletes: int):
+    pools = {"ssoBasic": [], "ssoSuper": []}
+    names = []
+    for i in range(size):
+        pool_name = "ssoSuper" if i % 4 == 0 else "ssoBasic"
+        token = f"token-{i:06d}"
+        pools[pool_name].append({"token": token, "quota": random.randint(0, 80)})
+        names.append((pool_name, token))
+
+    updated = [
+        {"pool_name": pool_name, "token": token, "quota": 1, "_update_kind": "usage"}
+        for pool_name, token in random.sample(names, updates)
+    ]
+    # 少量新增 Token
+    updated += [
+        {"pool_name": "ssoBasic", "token": f"new-{i:06d}", "quota": 80}
+        for i in range(updates // 50)
+    ]
+    deleted = [token for _, token in random.sample(names, deletes)]
+    return pools, updated, deleted
+
+
+def bench(fn, pools, updated, deleted) -> tuple:
+    data = copy.deepcopy(pools)
+    start = time.perf_counter()
+    fn(data, updated, deleted)
+    return (time.perf_counter() - start) * 1000, data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=20_000)
+    parser.add_argument("--updates", type=int, default=5_000)
+    parser.add_argument("--deletes", type=int, default=200)
+    args = parser.parse_args()
+
+    pools, updated, deleted = build(args.size, args.updates, args.deletes)
+    legacy_ms, legacy_data = bench(legacy_merge, pools, updated, deleted)
+    indexed_ms, indexed_data = bench(merge_token_delta, pools, updated, deleted)
+    assert legacy_data == indexed_data, "合并结果不一致"
+
+    print(f"tokens={args.size} updates={len(updated)} deletes={args.deletes}")
+    print(f"legacy   {legacy_ms:>10.1f} ms")
+    print(f"indexed  {indexed_ms:>10.1f} ms")
+    print(f"speedup  {legacy_ms / indexed_ms:>10.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+app-chat 流式行解析微基准
+
+对比旧版逐行处理（_normalize_line 解码/strip -> orjson.loads(str) -> 全量 .get 链）
+与 bytes 帧解析（_parse_frame 直接解析 bytes，纯 token 帧只读取 token/isThinking/
+responseId）的单行 CPU 耗时，并给出 StreamProcessor.process 的端到端单行耗时。
+
+fixtures/app_chat_stream.jsonl 按 Grok app-chat NDJSON 帧格式整理（userResponse、
+llmInfo、思考/正文 token、工具卡片、生图进度、cardAttachment、modelResponse），
+以 aiter_lines() 产出的 bytes 行回放。
+
+用法:
+    python scripts/benchmarks/stream_parse.py [--repeat 200] [--fixture PATH]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import orjson
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.core.config import _load_defaults, config  # noqa: E402
+from app.services.grok.services.chat import StreamProcessor  # noqa: E402
+from app.services.grok.utils import process as proc_base  # noqa: E402
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fixtures" / "app_chat_stream.jsonl"
+
+
+def load_lines(path: Path) -> list:
+    return [line for line in path.read_bytes().split(b"\n") if line]
+
+
+def legacy_parse(line):
+    """旧版: 解码 + strip + 前缀检查，str 解析，再逐字段 .get"""
+    line = proc_base._normalize_line(line)
+    if not line:
+        return None
+    try:
+        data = orjson.loads(line)
+    except orjson.JSONDecodeError:
+        return None
+    resp = data.get("result", {}).get("response", {})
+    is_thinking = bool(resp.get("isThinking"))
+    resp.get("llmInfo")
+    resp.get("responseId")
+    resp.get("rolloutId")
+    if resp.get("streamingImageGenerationResponse"):
+        return resp
+    if resp.get("modelResponse"):
+        return resp
+    if resp.get("cardAttachment"):
+        return resp
+    return resp.get("token"), is_thinking
+
+
+def fast_parse(line):
+    """新版: bytes 直接解析，纯 token 帧走快速路径"""
+    resp = proc_base._parse_frame(line)
+    if resp is None:
+        return None
+    if proc_base._is_token_frame(resp):
+        resp.get("responseId")
+        return resp["token"], resp.get("isThinking")
+    resp.get("llmInfo")
+    resp.get("rolloutId")
+    resp.get("responseId")
+    return resp
+
+
+def bench(fns: list, lines: list, repeat: int) -> list:
+    """交替计时、多轮取最小值（降低噪声干扰），返回各实现的单行纳秒"""
+    best = [float("inf")] * len(fns)
+    for _ in range(max(1, repeat // 10)):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter_ns()
+            for _ in range(10):
+                for line in lines:
+                    fn(line)
+            best[i] = min(best[i], (time.perf_counter_ns() - start) / (10 * len(lines)))
+    return best
+
+
+async def _replay(lines: list):
+    for line in lines:
+        yield line
+
+
+async def bench_process(lines: list, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat // 10)):
+        start = time.perf_counter_ns()
+        processor = StreamProcessor("grok-4", "", show_think=True)
+        async for _ in processor.process(_replay(lines)):
+            pass
+        best = min(best, (time.perf_counter_ns() - start) / len(lines))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE)
+    args = parser.parse_args()
+    # 仅使用默认配置，不连接存储
+    config._config = _load_defaults()
+
+    lines = load_lines(args.fixture)
+    token_lines = [
+        line
+        for line in lines
+        if proc_base._is_token_frame(proc_base._parse_frame(line) or {})
+    ]
+    rich_lines = [line for line in lines if line not in token_lines]
+    print(
+        f"fixture: {args.fixture.name} ({len(lines)} lines, "
+        f"{len(token_lines)} token frames)"
+    )
+
+    print(f"{'frames':>8} {'legacy ns':>10} {'fast ns':>10} {'speedup':>8}")
+    for name, subset in (("token", token_lines), ("rich", rich_lines), ("all", lines)):
+        legacy, fast = bench([legacy_parse, fast_parse], subset, args.repeat)
+        print(f"{name:>8} {legacy:>10.0f} {fast:>10.0f} {legacy / fast:>7.2f}x")
+
+    process_ns = asyncio.run(bench_process(lines, args.repeat))
+    print(f"StreamProcessor.process end-to-end: {process_ns:.0f} ns/line")
+
+
+if __name__ == "__main__":
+    main()
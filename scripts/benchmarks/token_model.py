@@ -0,0 +1,97 @@
+"""
+Token 运行时模型基准
+
+对比 pydantic 模型（TokenRecord，即旧版 TokenInfo）与 __slots__ 版 TokenInfo
+的加载耗时（dict -> 对象）、序列化耗时（对象 -> dict）与每个 Token 的内存占用。
+
+用法:
+    python scripts/benchmarks/token_model.py [--size 50000]
+"""
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.services.token.models import TokenInfo, TokenRecord  # noqa: E402
+
+
+def build_payloads(size: int) -> list:
+    now = int(time.time() * 1000)
+    payloads = []
+    for i in range(size):
+        quota = random.randint(0, 80)
+        payloads.append(
+            {
+                "token": f"token-{i:06d}-" + "x" * 48,
+                "status": "active" if quota else "cooling",
+                "quota": quota,
+                "created_at": now - random.randint(0, 10**9),
+                "last_used_at": now - random.randint(0, 10**6),
+                "use_count": random.randint(0, 1000),
+                "fail_count": 0,
+                "last_fail_at": None,
+                "last_fail_reason": None,
+                "last_sync_at": now,
+                "tags": ["nsfw"] if i % 5 == 0 else [],
+                "note": "",
+                "last_asset_clear_at": None,
+            }
+        )
+    return payloads
+
+
+def measure(cls, payloads: list, dump):
+    gc.collect()
+    start = time.perf_counter()
+    objs = [cls(**data) for data in payloads]
+    load_sec = time.perf_counter() - start
+    del objs
+
+    gc.collect()
+    tracemalloc.start()
+    objs = [cls(**data) for data in payloads]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for obj in objs:
+        dump(obj)
+    dump_sec = time.perf_counter() - start
+    return load_sec, dump_sec, current / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=50_000)
+    args = parser.parse_args()
+
+    payloads = build_payloads(args.size)
+    results = {
+        "pydantic": measure(TokenRecord, payloads, lambda o: o.model_dump()),
+        "slots": measure(TokenInfo, payloads, lambda o: o.to_dict()),
+    }
+
+    print(f"tokens: {args.size}")
+    print(f"{'model':>10} {'load ms':>10} {'dump ms':>10} {'bytes/token':>12}")
+    for name, (load_sec, dump_sec, per_token) in results.items():
+        print(
+            f"{name:>10} {load_sec * 1000:>10.1f} {dump_sec * 1000:>10.1f} "
+            f"{per_token:>12.0f}"
+        )
+    old, new = results["pydantic"], results["slots"]
+    print(
+        f"{'speedup':>10} {old[0] / new[0]:>9.1f}x {old[1] / new[1]:>9.1f}x "
+        f"{old[2] / new[2]:>11.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+工具卡片解析微基准
+
+模拟 heavy / agent 模型的长响应（大量 web_search / search_images / chatroom_send
+工具卡片与 grok:render 卡片），对比:
+- 单卡片: 旧版 extract_tool_text（内联模式字符串的 re.search / re.sub）与
+  预编译模式注册表 + 单次扫描解析
+- 整段过滤: 旧版 CollectProcessor._filter_content（逐标签 re.sub + 旧解析）与
+  当前实现（流式标签过滤 + 新解析）
+
+用法:
+    python scripts/benchmarks/tool_card_parse.py [--cards 200] [--repeat 50]
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import orjson
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.core.config import _load_defaults, config  # noqa: E402
+from app.services.grok.services.chat import CollectProcessor  # noqa: E402
+from app.services.grok.utils.tool_card import extract_tool_text  # noqa: E402
+
+FILTER_TAGS = ["xaiartifact", "xai:tool_usage_card", "grok:render"]
+
+
+def legacy_extract_tool_text(raw: str, rollout_id: str = "") -> str:
+    """旧版实现"""
+    if not raw:
+        return ""
+    name_match = re.search(r"<xai:tool_name>(.*?)</xai:tool_name>", raw, flags=re.DOTALL)
+    args_match = re.search(r"<xai:tool_args>(.*?)</xai:tool_args>", raw, flags=re.DOTALL)
+
+    name = name_match.group(1) if name_match else ""
+    if name:
+        name = re.sub(r"<!\[CDATA\[(.*?)\]\]>", r"\1", name, flags=re.DOTALL).strip()
+
+    args = args_match.group(1) if args_match else ""
+    if args:
+        args = re.sub(r"<!\[CDATA\[(.*?)\]\]>", r"\1", args, flags=re.DOTALL).strip()
+
+    payload = None
+    if args:
+        try:
+            payload = orjson.loads(args)
+        except orjson.JSONDecodeError:
+            payload = None
+
+    label = name
+    text = args
+    prefix = f"[{rollout_id}]" if rollout_id else ""
+
+    if name == "web_search":
+        label = f"{prefix}[WebSearch]"
+        if isinstance(payload, dict):
+            text = payload.get("query") or payload.get("q") or ""
+    elif name == "search_images":
+        label = f"{prefix}[SearchImage]"
+        if isinstance(payload, dict):
+            text = (
+                payload.get("image_description")
+                or payload.get("description")
+                or payload.get("query")
+                or ""
+            )
+    elif name == "chatroom_send":
+        label = f"{prefix}[AgentThink]"
+        if isinstance(payload, dict):
+            text = payload.get("message") or ""
+
+    if label and text:
+        return f"{label} {text}".strip()
+    if label:
+        return label
+    if text:
+        return text
+    return re.sub(r"<[^>]+>", "", raw, flags=re.DOTALL).strip()
+
+
+def legacy_filter_content(content: str) -> str:
+    """旧版 CollectProcessor._filter_content"""
+    result = content
+    rollout_id = ""
+    rollout_match = re.search(r"<rolloutId>(.*?)</rolloutId>", result, flags=re.DOTALL)
+    if rollout_match:
+        rollout_id = rollout_match.group(1).strip()
+
+    result = re.sub(
+        r"<xai:tool_usage_card[^>]*>.*?</xai:tool_usage_card>",
+        lambda match: (
+            f"{legacy_extract_tool_text(match.group(0), rollout_id)}\n"
+            if legacy_extract_tool_text(match.group(0), rollout_id)
+            else ""
+        ),
+        result,
+        flags=re.DOTALL,
+    )
+    for tag in FILTER_TAGS:
+        if tag == "xai:tool_usage_card":
+            continue
+        pattern = rf"<{re.escape(tag)}[^>]*>.*?</{re.escape(tag)}>|<{re.escape(tag)}[^>]*/>"
+        result = re.sub(pattern, "", result, flags=re.DOTALL)
+    return result
+
+
+def make_card(i: int) -> str:
+    kind = i % 4
+    if kind == 0:
+        name, args = "web_search", {"query": f"site:arxiv.org congestion control {i}", "num_results": 10}
+    elif kind == 1:
+        name, args = "search_images", {"image_description": f"diagram of TCP window {i}", "number_of_images": 4}
+    elif kind == 2:
+        name, args = "chatroom_send", {"message": f"Agent {i % 3} checks the BBR paper section {i}", "to": "leader"}
+    else:
+        name, args = "browse_page", {"url": f"https://example.com/{i}", "instructions": "summarize"}
+    args_text = orjson.dumps(args).decode()
+    if i % 2:
+        args_text = f"<![CDATA[{args_text}]]>"
+    return (
+        f"<xai:tool_usage_card><xai:tool_usage_card_id>{i:08x}-card</xai:tool_usage_card_id>"
+        f"<xai:tool_name>{name}</xai:tool_name><xai:tool_args>{args_text}</xai:tool_args>"
+        f"</xai:tool_usage_card>"
+    )
+
+
+def make_response(cards: int) -> str:
+    random.seed(cards)
+    parts = ["<rolloutId>7</rolloutId>"]
+    for i in range(cards):
+        parts.append(f"Step {i}: looking into the next source.\n")
+        parts.append(make_card(i))
+        if i % 10 == 0:
+            parts.append(f'<grok:render card_id="c{i}" card_type="citation_card"><argument name="citation_id">{i}</argument></grok:render>')
+    parts.append("\nFinal answer text.\n")
+    return "".join(parts)
+
+
+def bench(fns: list, arg_sets: list, repeat: int) -> list:
+    """交替计时、多轮取最小值，返回各实现的单次微秒"""
+    best = [float("inf")] * len(fns)
+    for _ in range(repeat):
+        for i, fn in enumerate(fns):
+            start = time.perf_counter_ns()
+            for args in arg_sets:
+                fn(*args)
+            best[i] = min(best[i], (time.perf_counter_ns() - start) / len(arg_sets) / 1e3)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    # 仅使用默认配置，不连接存储
+    config._config = _load_defaults()
+    config._config.setdefault("app", {})["filter_tags"] = FILTER_TAGS
+
+    cards = [(make_card(i), "7") for i in range(args.cards)]
+    for raw, rid in cards:
+        assert legacy_extract_tool_text(raw, rid) == extract_tool_text(raw, rid)
+
+    print(f"{'stage':>20} {'legacy us':>10} {'new us':>10} {'speedup':>8}")
+    legacy, new = bench([legacy_extract_tool_text, extract_tool_text], cards, args.repeat)
+    print(f"{'per card':>20} {legacy:>10.2f} {new:>10.2f} {legacy / new:>7.2f}x")
+
+    processor = CollectProcessor("grok-4-heavy", "")
+    for count in (args.cards // 4, args.cards):
+        content = make_response(count)
+        legacy, new = bench(
+            [legacy_filter_content, processor._filter_content],
+            [(content,)],
+            args.repeat,
+        )
+        label = f"response {count} cards"
+        print(f"{label:>20} {legacy:>10.1f} {new:>10.1f} {legacy / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+
+class _CookieHandler(BaseHTTPRequestHandler):
+    """/set 下发 Cookie，其余路径回显请求携带的 Cookie"""
+
+    def do_GET(self):
+        self.send_response(200)
+        if self.path == "/set":
+            self.send_header("Set-Cookie", "sso=TOKEN_A; Path=/")
+            self.send_header("Set-Cookie", "__cf_bm=xyz; Path=/")
+        body = "; ".join(self.headers.get_all("Cookie") or []).encode()
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def cookie_server():
+    server = HTTPServer(("127.0.0.1", 0), _CookieHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
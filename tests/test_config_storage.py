@@ -0,0 +1,33 @@
+import asyncio
+
+import app.core.storage as storage_module
+from app.core.storage import LocalStorage
+from app.services.reverse.utils.proxy_pool import _parse_entries
+
+
+def test_weighted_pool_urls_survive_config_save(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "CONFIG_FILE", tmp_path / "config.toml")
+    config = {
+        "proxy": {
+            "base_proxy_url": "",
+            "pool_urls": ["http://a:1", {"url": "http://b:2", "weight": 3}],
+            "pool_open_sec": 30,
+        },
+        "app": {
+            "api_key": 'k"e\\y',
+            "enabled": True,
+            "headers": {"X-Token": "v", "with space": 1},
+        },
+    }
+
+    async def run():
+        storage = LocalStorage()
+        await storage.save_config(config)
+        return await storage.load_config()
+
+    loaded = asyncio.run(run())
+    assert loaded == config
+    assert _parse_entries(loaded["proxy"]["pool_urls"]) == [
+        ("http://a:1", 1.0),
+        ("http://b:2", 3.0),
+    ]
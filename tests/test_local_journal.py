@@ -0,0 +1,114 @@
+import asyncio
+import shutil
+
+import pytest
+
+import app.core.storage as storage_module
+from app.core.storage import LocalStorage
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "TOKEN_FILE", tmp_path / "token.json")
+    monkeypatch.setattr(
+        storage_module, "TOKEN_JOURNAL_FILE", tmp_path / "token.journal.jsonl"
+    )
+    return LocalStorage()
+
+
+def _token(token, quota=10):
+    return {"token": token, "quota": quota, "pool_name": "p", "_update_kind": "state"}
+
+
+def _quotas(data):
+    return {t["token"]: t["quota"] for t in data.get("p", [])}
+
+
+def test_journal_replays_onto_snapshot(storage):
+    async def run():
+        await storage.save_tokens({"p": [{"token": "a", "quota": 10}, {"token": "b", "quota": 10}]})
+        await storage.save_tokens_delta([_token("a", 5), _token("c", 7)], ["b"])
+        await storage.save_tokens_delta([_token("a", 3)])
+        return await storage.load_tokens()
+
+    assert _quotas(asyncio.run(run())) == {"a": 3, "c": 7}
+
+
+def test_journal_from_previous_generation_is_ignored(storage):
+    journal = storage_module.TOKEN_JOURNAL_FILE
+
+    async def run():
+        await storage.save_tokens({"p": [{"token": "a", "quota": 10}]})
+        await storage.save_tokens_delta([_token("a", 1), _token("stale", 1)])
+        stale = journal.read_bytes()
+
+        # 压缩生成新快照代号，旧日志作废
+        await storage.compact_tokens()
+        assert not journal.exists()
+        assert _quotas(await storage.load_tokens()) == {"a": 1, "stale": 1}
+
+        await storage.save_tokens({"p": [{"token": "a", "quota": 20}]})
+        # 旧代号的日志被恢复回来（如备份还原）时不能重放到新快照上
+        journal.write_bytes(stale)
+        assert _quotas(await storage.load_tokens()) == {"a": 20}
+
+        # 下一次追加重新开始日志，旧记录不会混入
+        await storage.save_tokens_delta([_token("a", 15)])
+        return await storage.load_tokens()
+
+    assert _quotas(asyncio.run(run())) == {"a": 15}
+
+
+def test_copied_snapshot_keeps_its_journal(storage, tmp_path):
+    token_file = storage_module.TOKEN_FILE
+
+    async def run():
+        await storage.save_tokens({"p": [{"token": "a", "quota": 10}]})
+        await storage.save_tokens_delta([_token("a", 4)])
+        # 复制快照（新 inode 与 mtime）不改变代号，日志仍然有效
+        backup = tmp_path / "backup.json"
+        shutil.copy(token_file, backup)
+        token_file.unlink()
+        shutil.copy(backup, token_file)
+        return await storage.load_tokens()
+
+    assert _quotas(asyncio.run(run())) == {"a": 4}
+
+
+def test_torn_tail_is_skipped_and_not_glued_to_next_record(storage):
+    journal = storage_module.TOKEN_JOURNAL_FILE
+
+    async def run():
+        await storage.save_tokens({"p": [{"token": "a", "quota": 10}]})
+        await storage.save_tokens_delta([_token("a", 8)])
+        version = await storage.token_version()
+
+        # 写入中途崩溃: 最后一条记录没有换行
+        with open(journal, "ab") as f:
+            f.write(b'{"op": "upsert", "pool": "p", "token": {"token": "a", "quo')
+        assert _quotas(await storage.load_tokens()) == {"a": 8}
+        changes = await storage.load_token_changes(version)
+        assert changes is not None and not changes.upserts
+
+        await storage.save_tokens_delta([_token("b", 2)])
+        assert _quotas(await storage.load_tokens()) == {"a": 8, "b": 2}
+
+        changes = await storage.load_token_changes(version)
+        assert [data["token"] for _, data in changes.upserts] == ["b"]
+
+    asyncio.run(run())
+
+
+def test_token_changes_require_full_reload_after_new_generation(storage):
+    async def run():
+        await storage.save_tokens({"p": [{"token": "a", "quota": 10}]})
+        version = await storage.token_version()
+        await storage.save_tokens_delta([_token("a", 9)])
+
+        changes = await storage.load_token_changes(version)
+        assert [data["quota"] for _, data in changes.upserts] == [9]
+
+        await storage.compact_tokens()
+        assert await storage.load_token_changes(changes.version) is None
+
+    asyncio.run(run())
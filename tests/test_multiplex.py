@@ -0,0 +1,26 @@
+import asyncio
+
+from app.services.reverse.utils.multiplex import Http2Multiplexer
+
+
+def test_concurrent_streams_do_not_share_cookies(cookie_server):
+    async def run():
+        mux = Http2Multiplexer()
+        try:
+            lease_a = mux.acquire("chrome136", "")
+            lease_b = mux.acquire("chrome136", "")
+            assert mux.stats()["connections"] == 1
+            await lease_a.get(f"{cookie_server}/set", headers={"Cookie": "sso=TOKEN_A"})
+            response = await lease_b.get(
+                f"{cookie_server}/echo", headers={"Cookie": "sso=TOKEN_B"}
+            )
+            await lease_a.close()
+            await lease_b.close()
+            return response.text
+        finally:
+            await mux.close()
+
+    sent = asyncio.run(run())
+    assert "TOKEN_B" in sent
+    assert "TOKEN_A" not in sent
+    assert "__cf_bm" not in sent
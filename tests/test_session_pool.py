@@ -0,0 +1,25 @@
+import asyncio
+
+from app.services.reverse.utils.session import SessionPool
+
+
+def test_lease_does_not_see_previous_lease_cookies(cookie_server):
+    async def run():
+        pool = SessionPool()
+        try:
+            async with pool.acquire("chrome136", "") as lease:
+                await lease.get(f"{cookie_server}/set", headers={"Cookie": "sso=TOKEN_A"})
+
+            async with pool.acquire("chrome136", "") as lease:
+                response = await lease.get(
+                    f"{cookie_server}/echo", headers={"Cookie": "sso=TOKEN_B"}
+                )
+            assert pool.stats()["reused"] == 1
+            return response.text
+        finally:
+            await pool.close()
+
+    sent = asyncio.run(run())
+    assert "TOKEN_B" in sent
+    assert "TOKEN_A" not in sent
+    assert "__cf_bm" not in sent
@@ -0,0 +1,68 @@
+from app.services.grok.utils.tag_filter import TagFilter, get_tag_automaton
+
+TAGS = ("xai:tool_usage_card", "grok:render", "t")
+
+TEXTS = [
+    "plain text without tags",
+    "a<t>b</t>c",
+    "before<xai:tool_usage_card id=\"1\"><x>inner</x></xai:tool_usage_card>after",
+    "x<grok:render type=\"a>b\"/>y<t/>z",
+    "lt < gt > <tx>not</tx> <u>keep</u> <t",
+    "a<t>b<t>c</t>d</t>e",
+    "<t>unclosed until the end",
+    "line\n<t>one</t><t>two</t>\nend",
+    "close </t> before open <t>x</t>",
+]
+
+
+def _replace(tag, raw):
+    return f"[{tag}:{len(raw)}]" if tag == "grok:render" else ""
+
+
+def _feed_chunks(text, cuts, replace=None, **kwargs):
+    tf = TagFilter(get_tag_automaton(TAGS), replace, **kwargs)
+    out = []
+    start = 0
+    for cut in list(cuts) + [len(text)]:
+        out.append(tf.feed(text[start:cut]))
+        start = cut
+    out.append(tf.finish())
+    return "".join(out)
+
+
+def test_output_independent_of_chunk_boundaries():
+    for replace in (None, _replace):
+        for text in TEXTS:
+            expected = TagFilter(get_tag_automaton(TAGS), replace).filter(text)
+            for cut in range(len(text) + 1):
+                assert _feed_chunks(text, [cut], replace) == expected, (text, cut)
+            assert _feed_chunks(text, range(1, len(text)), replace) == expected, text
+
+
+def test_blocks_removed_and_replaced():
+    tf = TagFilter(get_tag_automaton(TAGS), _replace)
+    assert tf.filter("a<t>b</t>c") == "ac"
+    assert tf.filter("x<grok:render/>") == "x\n[grok:render:14]"
+    assert tf.filter("<t") == "<t"
+
+
+def test_self_closing_tag_removes_only_itself():
+    # 旧正则会从 <t x/> 一直删到 </t>，连同 "b" 一起删除
+    assert TagFilter(get_tag_automaton(TAGS)).filter("a<t x/>b<t>c</t>d") == "abd"
+
+
+def test_max_block_releases_unclosed_block():
+    tf = TagFilter(get_tag_automaton(TAGS), max_block=16)
+    assert tf.feed("a<t>") == "a"
+    released = tf.feed("x" * 20)
+    assert released == "<t>" + "x" * 20
+    # 放行后回到文本模式，之后的块照常过滤
+    assert tf.feed("</t>b<t>c</t>d") == "</t>bd"
+    assert tf.finish() == ""
+
+
+def test_max_block_caps_unterminated_open_tag():
+    tf = TagFilter(get_tag_automaton(TAGS), max_block=16)
+    out = [tf.feed("<t " + "a" * 10) for _ in range(5)]
+    assert "".join(out) + tf.finish() == "".join("<t " + "a" * 10 for _ in range(5))
+    assert len(tf._raw) == 0
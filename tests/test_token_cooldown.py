@@ -0,0 +1,43 @@
+import time
+
+from app.core.storage import TokenChanges
+from app.services.token.manager import TokenManager
+from app.services.token.models import TokenInfo, TokenStatus
+from app.services.token.pool import TokenPool
+
+
+def _manager_with(tokens) -> TokenManager:
+    manager = TokenManager()
+    pool = TokenPool("ssoBasic")
+    for token in tokens:
+        pool.add(token)
+    manager.pools = {"ssoBasic": pool}
+    manager._rebuild_token_index()
+    manager._rebuild_cooldowns()
+    return manager
+
+
+def test_defer_due_cooldowns_moves_due_entries_forward():
+    cooling = TokenInfo(token="cool", quota=0, status=TokenStatus.COOLING)
+    manager = _manager_with([cooling, TokenInfo(token="active", quota=10)])
+    now = time.time()
+    assert manager.next_cooldown_due() <= now
+
+    assert manager.defer_due_cooldowns(300) == 1
+    assert manager.next_cooldown_due() >= now + 300
+    # 不再有到期条目，非持锁 worker 不会立刻再次唤醒
+    assert manager.defer_due_cooldowns(300) == 0
+
+
+def test_applied_refresh_reschedules_from_new_sync_time():
+    cooling = TokenInfo(token="cool", quota=0, status=TokenStatus.COOLING)
+    manager = _manager_with([cooling])
+    manager.defer_due_cooldowns(300)
+
+    # 持锁 worker 刷新后仍在冷却，同步时间更新
+    synced_at = int(time.time() * 1000)
+    data = {**cooling.to_dict(), "last_sync_at": synced_at}
+    manager._apply_changes(TokenChanges(version=1, upserts=[("ssoBasic", data)]))
+
+    interval = manager._refresh_interval_hours("ssoBasic") * 3600
+    assert abs(manager.next_cooldown_due() - (synced_at / 1000 + interval)) < 1
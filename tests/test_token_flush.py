@@ -0,0 +1,133 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import app.services.token.flush as flush_module
+from app.services.token.flush import TokenFlushEngine
+
+
+class RecordingStorage:
+    """记录每次写入；fail_next 次写入抛错"""
+
+    def __init__(self, fail_next: int = 0):
+        self.fail_next = fail_next
+        self.saves = []
+
+    @asynccontextmanager
+    async def acquire_lock(self, name, timeout=10):
+        yield
+
+    async def save_tokens_delta(self, updated, deleted=None):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("save failed")
+        self.saves.append(
+            ({u["token"]: u["_update_kind"] for u in updated}, sorted(deleted or []))
+        )
+
+
+def _payload(token_key, pool_name, change_kind, fields=None):
+    return {"token": token_key, "pool_name": pool_name, "_update_kind": change_kind}
+
+
+def _engine(monkeypatch, storage, batch_size=None) -> TokenFlushEngine:
+    monkeypatch.setattr(flush_module, "get_storage", lambda: storage)
+    monkeypatch.setattr(flush_module, "FLUSH_BACKOFF_BASE_SEC", 0.01)
+    if batch_size is not None:
+        monkeypatch.setattr(flush_module, "DEFAULT_FLUSH_BATCH_SIZE", batch_size)
+    return TokenFlushEngine(_payload)
+
+
+def test_marks_coalesce_and_state_wins(monkeypatch):
+    storage = RecordingStorage()
+
+    async def run():
+        engine = _engine(monkeypatch, storage)
+        seqs = [
+            engine.mark("a", "p", "usage"),
+            engine.mark("a", "p", "state"),
+            engine.mark("a", "p", "usage"),
+            engine.mark("b", "p", "usage"),
+            engine.mark_delete("c"),
+        ]
+        assert seqs == sorted(seqs) and len(set(seqs)) == len(seqs)
+        assert engine.pending == 3
+
+        assert await engine.flush(timeout=2)
+        assert storage.saves == [({"a": "state", "b": "usage"}, ["c"])]
+        assert engine._durable_seq == seqs[-1]
+        await engine.close()
+
+    asyncio.run(run())
+
+
+def test_durable_watermark_stops_below_oldest_pending(monkeypatch):
+    storage = RecordingStorage()
+
+    async def run():
+        engine = _engine(monkeypatch, storage, batch_size=1)
+        seq_a = engine.mark("a", "p", "state")
+        seq_b = engine.mark("b", "p", "state")
+        engine.mark("c", "p", "state")
+
+        await engine._flush_batch()
+        assert storage.saves[-1][0] == {"a": "state"}
+        assert engine._durable_seq == seq_a
+
+        # a 再次变更时保留其新序号，b 仍是最早未落盘的变更
+        engine.mark("a", "p", "usage")
+        storage.fail_next = 1
+        await engine._flush_batch()
+        assert engine._durable_seq == seq_a
+
+        await engine._flush_batch()
+        assert storage.saves[-1][0] == {"c": "state"}
+        # b 写入失败后放回队列，水位不能越过它
+        assert engine._durable_seq == seq_b - 1
+
+        await engine._flush_batch()
+        await engine._flush_batch()
+        assert {k for save, _ in storage.saves for k in save} == {"a", "b", "c"}
+        assert engine.pending == 0
+        assert engine._durable_seq == engine._seq
+        await engine.close()
+
+    asyncio.run(run())
+
+
+def test_failed_save_is_retried(monkeypatch):
+    storage = RecordingStorage(fail_next=2)
+
+    async def run():
+        engine = _engine(monkeypatch, storage)
+        engine.mark("a", "p", "usage")
+        engine.mark_delete("b")
+
+        assert await engine.flush(timeout=2)
+        assert storage.saves == [({"a": "usage"}, ["b"])]
+        stats = engine.stats()
+        assert stats["failures"] == 2
+        assert stats["consecutive_failures"] == 0
+        assert stats["pending"] == 0
+        assert stats["last_error"] is None
+        await engine.close()
+
+    asyncio.run(run())
+
+
+def test_changes_during_failed_save_merge_on_retry(monkeypatch):
+    storage = RecordingStorage(fail_next=1)
+
+    async def run():
+        engine = _engine(monkeypatch, storage)
+        engine.mark("a", "p", "usage")
+        await engine._flush_batch()
+        assert engine.pending == 1
+
+        # 失败期间的新变更与放回的变更合并，state 优先
+        engine.mark("a", "p", "state")
+        engine.mark_delete("b")
+        assert await engine.flush(timeout=2)
+        assert storage.saves == [({"a": "state"}, ["b"])]
+        await engine.close()
+
+    asyncio.run(run())
@@ -0,0 +1,82 @@
+import random
+
+from app.services.token.models import TokenInfo, TokenStatus
+from app.services.token.pool import TokenPool
+
+
+def _check_index(pool: TokenPool):
+    """额度桶索引与全量扫描结果一致"""
+    available = {t.token: t for t in pool if t.is_available()}
+    assert set(pool._bucket_pos) == set(available)
+    assert set(pool._available_pos) == set(available)
+    assert pool._quota_keys == sorted({t.quota for t in available.values()})
+    for quota, bucket in pool._buckets.items():
+        assert bucket
+        for idx, token in enumerate(bucket):
+            assert token.quota == quota
+            assert pool._bucket_pos[token.token] == (quota, idx)
+    for idx, token in enumerate(pool._available):
+        assert pool._available_pos[token.token] == idx
+
+
+def test_select_prefers_highest_quota_bucket():
+    pool = TokenPool("ssoBasic")
+    for i, quota in enumerate([10, 80, 80, 40, 0]):
+        pool.add(TokenInfo(token=f"t{i}", quota=quota))
+    pool.add(TokenInfo(token="cooling", quota=90, status=TokenStatus.COOLING))
+
+    assert pool.available_count() == 4
+    assert pool.select().token in {"t1", "t2"}
+    # 整桶被排除时回退到下一档额度
+    assert pool.select(exclude={"t1", "t2"}).token == "t3"
+    assert pool.select(exclude={"t0", "t1", "t2", "t3"}) is None
+    _check_index(pool)
+
+
+def test_index_follows_quota_status_and_removal():
+    pool = TokenPool("ssoBasic")
+    tokens = [TokenInfo(token=f"t{i}", quota=50) for i in range(5)]
+    for token in tokens:
+        pool.add(token)
+
+    tokens[0].quota = 70
+    assert pool.select().token == "t0"
+    tokens[0].status = TokenStatus.EXPIRED
+    assert pool.select().token != "t0"
+    tokens[1].consume()
+    assert pool._bucket_pos["t1"][0] == 49
+
+    assert pool.remove("t2")
+    assert not pool.remove("t2")
+    assert pool.get("t2") is None
+    # 替换同名 Token: 旧对象脱离池，不再影响索引
+    replacement = TokenInfo(token="t3", quota=5)
+    pool.add(replacement)
+    tokens[3].quota = 99
+    assert pool._bucket_pos["t3"] == (5, 0)
+    _check_index(pool)
+
+
+def test_random_operations_keep_index_consistent():
+    rng = random.Random(1)
+    pool = TokenPool("ssoBasic")
+    for step in range(2000):
+        name = f"t{rng.randrange(40)}"
+        op = rng.random()
+        token = pool.get(name)
+        if token is None or op < 0.2:
+            pool.add(TokenInfo(token=name, quota=rng.randrange(0, 6)))
+        elif op < 0.35:
+            pool.remove(name)
+        elif op < 0.7:
+            token.quota = rng.randrange(0, 6)
+        else:
+            token.status = rng.choice(list(TokenStatus))
+        if step % 50 == 0:
+            _check_index(pool)
+            selected = pool.select()
+            if selected is None:
+                assert pool.available_count() == 0
+            else:
+                assert selected.quota == max(t.quota for t in pool if t.is_available())
+    _check_index(pool)
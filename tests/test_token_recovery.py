@@ -0,0 +1,76 @@
+import asyncio
+
+from app.services.token.manager import DEFAULT_REFRESH_BATCH_SIZE, TokenManager
+from app.services.token.models import TokenInfo, TokenStatus
+from app.services.token.pool import TokenPool
+
+
+def _cooling_manager(count: int) -> TokenManager:
+    manager = TokenManager()
+    pool = TokenPool("ssoBasic")
+    for i in range(count):
+        pool.add(TokenInfo(token=f"t{i}", quota=0, status=TokenStatus.COOLING))
+    manager.pools = {"ssoBasic": pool}
+    manager._rebuild_token_index()
+    manager._rebuild_cooldowns()
+    return manager
+
+
+def test_waiter_sees_token_recovered_in_first_batch():
+    async def run():
+        manager = _cooling_manager(DEFAULT_REFRESH_BATCH_SIZE + 1)
+        manager.request_recovery = lambda: None
+
+        async def no_flush(timeout=None):
+            return True
+
+        async def fake_refresh(pool_name, token_info, usage_service):
+            if token_info.token == "t0":
+                token_info.update_quota(10)
+                return {"recovered": True, "expired": False}
+            return {"recovered": False, "expired": False}
+
+        manager.flush = no_flush
+        manager._refresh_token = fake_refresh
+
+        waiter = asyncio.create_task(
+            manager.wait_for_recovery(["ssoBasic"], timeout_ms=500)
+        )
+        await asyncio.sleep(0)
+        refresh = asyncio.create_task(
+            manager._refresh_tokens(list(manager._token_index.values()))
+        )
+        # 第一批恢复后立即唤醒，不等批次间延迟（1s）与最终落盘
+        assert await asyncio.wait_for(waiter, 0.5) == "t0"
+        assert not refresh.done()
+        refresh.cancel()
+
+    asyncio.run(run())
+
+
+def test_notify_between_select_and_wait_is_not_lost():
+    async def run():
+        manager = _cooling_manager(1)
+        manager.request_recovery = lambda: None
+        token = manager._token_index["t0"][1]
+        original = manager.select_token
+        calls = 0
+
+        async def select_then_recover(pool_names, exclude=None):
+            nonlocal calls
+            calls += 1
+            result = await original(pool_names, exclude)
+            if calls == 1:
+                # 选择返回后、进入 wait() 之前恢复并通知
+                token.update_quota(5)
+                await manager._notify_token_available()
+            return result
+
+        manager.select_token = select_then_recover
+        result = await asyncio.wait_for(
+            manager.wait_for_recovery(["ssoBasic"], timeout_ms=200), 1
+        )
+        assert result == "t0"
+        assert calls == 2
+
+    asyncio.run(run())
@@ -0,0 +1,145 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import app.services.token.flush as flush_module
+import app.services.token.manager as manager_module
+from app.core.storage import TOKEN_USAGE_FIELDS
+from app.services.token.manager import TokenManager
+from app.services.token.models import EffortType, TokenInfo, TokenStatus
+from app.services.token.pool import TokenPool
+
+
+class FakeSharedStorage:
+    """按 RedisStorage 的写入语义（Lua 原子扣减、字段级更新）模拟共享 Hash"""
+
+    def __init__(self, tokens):
+        self.hashes = {t.token: t.to_dict() for t in tokens}
+
+    @asynccontextmanager
+    async def acquire_lock(self, name, timeout=10):
+        yield
+
+    async def consume_token(self, pool_name, token, cost):
+        data = self.hashes.get(token)
+        if data is None:
+            return None
+        actual = min(cost, data["quota"])
+        data["quota"] -= actual
+        data["use_count"] += actual
+        data["status"] = TokenStatus.COOLING if data["quota"] == 0 else TokenStatus.ACTIVE
+        return {
+            "quota": data["quota"],
+            "status": data["status"],
+            "consumed": actual,
+            "use_count": data["use_count"],
+        }
+
+    async def update_token_fields(self, pool_name, token, fields, increments=None):
+        data = self.hashes.get(token)
+        if data is None:
+            return None
+        for key, delta in (increments or {}).items():
+            data[key] += delta
+        data.update(fields)
+        return {
+            "quota": data["quota"],
+            "status": data["status"],
+            "use_count": data["use_count"],
+        }
+
+    async def save_tokens_delta(self, updated, deleted=None):
+        for item in updated:
+            data = self.hashes.get(item["token"])
+            kind = item.get("_update_kind")
+            if kind == "usage":
+                data.update({k: item[k] for k in TOKEN_USAGE_FIELDS if k in item})
+            elif kind == "fields":
+                data.update(
+                    {
+                        k: v
+                        for k, v in item.items()
+                        if k not in ("token", "pool_name", "_update_kind")
+                    }
+                )
+            else:
+                self.hashes[item["token"]] = {
+                    k: v for k, v in item.items() if k not in ("pool_name", "_update_kind")
+                }
+
+
+def _worker(shared: FakeSharedStorage) -> TokenManager:
+    manager = TokenManager()
+    pool = TokenPool("ssoBasic")
+    for data in shared.hashes.values():
+        pool.add(TokenInfo(**data))
+    manager.pools = {"ssoBasic": pool}
+    manager._rebuild_token_index()
+    manager._shared = shared
+    return manager
+
+
+def test_non_consume_writes_do_not_roll_back_shared_counters(monkeypatch):
+    shared = FakeSharedStorage([TokenInfo(token="t", quota=50)])
+    monkeypatch.setattr(flush_module, "get_storage", lambda: shared)
+
+    class FakeUsageService:
+        async def get(self, token):
+            return {"remainingTokens": 30}
+
+    monkeypatch.setattr(manager_module, "UsageService", FakeUsageService)
+
+    async def run():
+        worker_a = _worker(shared)
+        worker_b = _worker(shared)
+
+        # A 仍缓存 quota=50 时，B 原子扣减到 40
+        for _ in range(10):
+            assert await worker_b.consume("t", EffortType.LOW)
+        assert worker_a._token_index["t"][1].quota == 50
+
+        await worker_a.record_fail("t", 401, "auth")
+        await worker_a.add_tag("t", "nsfw")
+        await worker_a.mark_asset_clear("t")
+        assert await worker_a.flush(timeout=5)
+
+        data = shared.hashes["t"]
+        assert data["quota"] == 40
+        assert data["use_count"] == 10
+        assert data["status"] == TokenStatus.ACTIVE
+        assert data["fail_count"] == 1
+        assert data["tags"] == ["nsfw"]
+        assert data["last_asset_clear_at"] is not None
+
+        # 同步用量: 配额以上游为准，use_count 原子累加而非回写 A 的本地值
+        assert await worker_a.sync_usage("t")
+        assert data["quota"] == 30
+        assert data["use_count"] == 11
+        assert data["fail_count"] == 0
+        assert worker_a._token_index["t"][1].use_count == 11
+
+        await worker_a.close(timeout=5)
+        await worker_b.close(timeout=5)
+
+    asyncio.run(run())
+
+
+def test_state_change_from_record_fail_is_written(monkeypatch):
+    shared = FakeSharedStorage([TokenInfo(token="t", quota=50, fail_count=4)])
+    monkeypatch.setattr(flush_module, "get_storage", lambda: shared)
+
+    async def run():
+        worker_a = _worker(shared)
+        worker_b = _worker(shared)
+        await worker_b.consume("t", EffortType.HIGH)
+
+        await worker_a.record_fail("t", 401, "auth")
+        assert await worker_a.flush(timeout=5)
+
+        data = shared.hashes["t"]
+        assert data["status"] == TokenStatus.EXPIRED
+        assert data["quota"] == 46
+        assert data["use_count"] == 4
+        await worker_a.close(timeout=5)
+        await worker_b.close(timeout=5)
+
+    asyncio.run(run())